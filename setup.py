@@ -32,9 +32,13 @@ setup(
             'remarkable_backup=unremarkable.__main__:remarkable_backup',    # <- backup to local
             'remarkable_ls=unremarkable.__main__:remarkable_ls', # . list files on backup
             'remarkable_export_annotated=unremarkable.__main__:remarkable_export_annotated',
+            'remarkable_thumbnails=unremarkable.__main__:remarkable_thumbnails',
+            'remarkable_grep=unremarkable.__main__:remarkable_grep',
+            'remarkable_strokes=unremarkable.__main__:remarkable_strokes',
             'remarkable_read_rm=unremarkable.__main__:remarkable_read_rm',
             'remarkable_restart=unremarkable.__main__:remarkable_restart',
             'remarkable_help=unremarkable.__main__:remarkable_help',
+            'remarkabled=unremarkable.__main__:remarkabled',
             'not_in_remarkable=unremarkable.__main__:not_in_remarkable'
         ],
     },
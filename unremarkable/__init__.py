@@ -1,8 +1,39 @@
 """ python access to unremarkable functions
+
+names are resolved on first access so console entry points, which import
+unremarkable.__main__, only load reportlab, pypdf, numpy or pybtex when used
 """
-from .unremarkable import upload_pdf, restart_xochitl
-from .unremarkable import backup_tablet as remarkable_backup
-from .unremarkable import build_file_graph as remarkable_ls
-from .annotations import read_rm, export_annotated_pdf, get_annotated, add_authors, \
-    remarkable_name
-from .pdf import pdf_mod, get_pdfs
+_LAZY = {
+    'upload_pdf': ('unremarkable', 'upload_pdf'),
+    'restart_xochitl': ('unremarkable', 'restart_xochitl'),
+    'remarkable_backup': ('unremarkable', 'backup_tablet'),
+    'remarkable_ls': ('unremarkable', 'build_file_graph'),
+    'read_rm': ('annotations', 'read_rm'),
+    'export_annotated_pdf': ('annotations', 'export_annotated_pdf'),
+    'get_annotated': ('annotations', 'get_annotated'),
+    'add_authors': ('annotations', 'add_authors'),
+    'remarkable_name': ('annotations', 'remarkable_name'),
+    'pdf_mod': ('pdf', 'pdf_mod'),
+    'get_pdfs': ('pdf', 'get_pdfs'),
+    'contact_sheet': ('raster', 'contact_sheet'),
+    'render_page_png': ('raster', 'render_page_png'),
+    'remarkable_grep': ('search', 'search'),
+    'export_strokes': ('strokes', 'export_strokes'),
+    'profile': ('profiling', 'profile'),
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        module, attr = _LAZY[name]
+        # __import__ rather than importlib so -X importtime sees the import
+        value = getattr(__import__(module, globals(), None, [attr], 1), attr)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
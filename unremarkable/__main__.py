@@ -1,18 +1,22 @@
 """
 console entry points for unremarkable handling of reMarkable files
 
+heavy dependencies (reportlab, pypdf, numpy, pybtex, rmscene) are imported inside the
+entry points that need them, after argument parsing, to keep startup of
+remarkable_ls, remarkable_restart, remarkable_help ... fast
 """
 from typing import Union, Optional, Any
 import argparse
+import functools
 import os
+import sys
 import os.path as osp
 import pprint
+from contextlib import nullcontext
 
 from .unremarkable import backup_tablet, upload_pdf, build_file_graph, \
     _is_host_reachable, _get_xochitl, restart_xochitl, get_remote_files
-from .annotations import export_annotated_pdf
-from .pdf import pdf_mod, get_page_sizes
-from . import rmscene
+from .profiling import profile
 
 _A="\033[0m"
 _G="\033[34m"
@@ -23,6 +27,39 @@ _M="\033[35m"
 ##
 # console entry points
 #
+FORWARDED = set()   # entry points remarkabled runs for clients
+
+def _forwarded(entry):
+    """ run entry point in remarkabled if it is running, else in this process """
+    FORWARDED.add(entry.__name__)
+    @functools.wraps(entry)
+    def _entry():
+        from .daemon import forward
+        code = forward(entry.__name__, sys.argv[1:])
+        if code is None:
+            return entry()
+        return code
+    return _entry
+
+
+def _add_profile_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--profile', type=str, nargs='?', const='unremarkable_trace.json',
+                        default=None, help='write chrome trace json of stage timings')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='with --profile, also dump cProfile stats to <profile>.prof')
+    parser.add_argument('--metrics', type=str, default=None,
+                        help='run metrics: .prom OpenMetrics textfile, .jsonl appended, or folder')
+
+
+def _profiled(args: argparse.Namespace, job: str):
+    """ profile context if --profile or --metrics was passed"""
+    if args.profile is None and args.metrics is None:
+        return nullcontext()
+    return profile(args.profile, cprofile=args.cprofile, verbose=args.profile is not None,
+                   metrics=args.metrics, job=job)
+
+
+@_forwarded
 def remarkable_backup():
     """console entry point to backup remarkable hierarchy
     Args
@@ -30,14 +67,19 @@ def remarkable_backup():
             if folder == "?"    searches for existing backup and only syncs if one found
     backup is done with incremental `rsync -avzhP --update`
     archive, verbose, compress, human-readable, partial, progress, newer files only
+        --profile   (str [None]) write chrome trace of stage timings
+        --metrics   (str [None]) bytes, files, stage times, failures: .prom | .jsonl | folder
     """
     parser = argparse.ArgumentParser(description='Backup tablet')
     parser.add_argument('folder', type=str, nargs='?', default=None,
                         help='backup dir: ? recursive search | None from stored ~/.xochitl | "."')
+    _add_profile_args(parser)
     args = parser.parse_args()
-    backup_tablet(args.folder)
+    with _profiled(args, 'backup'):
+        backup_tablet(args.folder)
 
 
+@_forwarded
 def pdf_to_remarkable():
     """console entry point upload pdf to remarkable
     Args
@@ -45,6 +87,7 @@ def pdf_to_remarkable():
         parent  (str ['']) destination folder visible name
         --name  (str [None]) visible name, if None: pdfbasename.replace("_"," ")  
         --no_restart_xochitl      default restart_xochitls xochitl service to show upload, disable
+        --metrics (str [None]) run metrics: .prom | .jsonl | folder
     """
     parser = argparse.ArgumentParser(description='Upload pdf')
     parser.add_argument('pdf', type=str, help='valid .pdf file or "*"')
@@ -56,9 +99,11 @@ def pdf_to_remarkable():
                         help='disable restart_xochitl of xochitl service')
     parser.add_argument('-f', '--force', action='store_true',
                         help='force upload even if name exists')
+    _add_profile_args(parser)
     # Parse arguments
     args = parser.parse_args()
-    upload_pdf(args.pdf, args.parent, args.name, args.restart_xochitl, args.force)
+    with _profiled(args, 'upload'):
+        upload_pdf(args.pdf, args.parent, args.name, args.restart_xochitl, args.force)
 
 
 def _asint(val: Any, msg: str = "") -> int:
@@ -113,7 +158,7 @@ def _get_bib_file(pdfname: str, bibname: Optional[str] = None) -> Optional[str]:
         bibname = f'{osp.splitext(pdfname)[0]}.bib'
         # print(f"resolving bib name to {bibname}: exists? {osp.isfile(bibname)}")
     if bibname[0] != ".":
-        __bib = ".".join([osp.dirname(bibname), osp.basename(bibname)])
+        __bib = osp.join(osp.dirname(bibname), f".{osp.basename(bibname)}")
         if osp.isfile(bibname):
             # print(f"renaming  bib to {__bib}")
             os.rename(bibname, __bib)
@@ -121,6 +166,45 @@ def _get_bib_file(pdfname: str, bibname: Optional[str] = None) -> Optional[str]:
     # print(f"is file {osp.isfile(bibname)}")
     return bibname if osp.isfile(bibname) else None
 
+def _bib_index_entry(pdfname: str, bibname: str, cite: Optional[str] = None) -> str:
+    """ single entry bibtex from indexed bib, by cite or best match to pdf name"""
+    assert osp.isfile(bibname), f"bib file not found {bibname}"
+    from .bibindex import BibIndex
+    index = BibIndex(bibname, verbose=True)
+    if cite is not None:
+        key = index.find(cite)
+        assert key is not None, f"'{cite}' not found in {bibname}"
+    else:
+        found = index.match(osp.splitext(osp.basename(pdfname))[0])
+        assert found is not None, f"no entry matching {pdfname} in {bibname}, use -c"
+        key = found[0]
+        print(f"using '{key}': {index.get(key).get('title')}")
+    return index.bibtex(key)
+
+
+def _is_batch(pdfname: str) -> bool:
+    """ folder or glob pattern"""
+    return osp.isdir(pdfname) or any(c in pdfname for c in '*?[')
+
+
+def _pdf_batch(args: argparse.Namespace, require_bib: bool, **kwargs) -> None:
+    """ pdfmeta / pdfbib over folder or glob, per pdf .bib files take precedence over bib arg"""
+    assert args.name is None, "-n --name is not valid on folders or globs"
+    from .pdf import pdf_mod_batch, _glob_pdfs
+    pdfs = _glob_pdfs(osp.expanduser(args.pdf))
+    bibs = {pdf: _get_bib_file(pdf) for pdf in pdfs}
+    bibs = {pdf: bib for pdf, bib in bibs.items() if bib is not None}
+    pdf_mod_batch(pdfs, bib_db=args.bib, bibs=bibs, workers=args.workers,
+                  skip_unchanged=not args.force, require_bib=require_bib, **kwargs)
+
+
+def _add_batch_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='folder or glob: number of processes, default cpu count')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='folder or glob: rewrite pdfs whose metadata already matches')
+
+
 def _resolve_pdf(pdfname: str) -> str:
     pdf, ext = osp.splitext(pdfname)
     if not osp.isfile(pdfname) and ext.lower() != '.pdf':
@@ -128,6 +212,7 @@ def _resolve_pdf(pdfname: str) -> str:
     return f'{pdf}{ext}'
 
 
+@_forwarded
 def pdf_bibtex():
     """ add bibtex to metadata, required <file>.pdf and <file>.bib
     Args
@@ -138,30 +223,51 @@ def pdf_bibtex():
         -n --name       (str) rename pdf: default overwrites
         -p --pages      (int | list | str) keep pages e.g. -a 5 7 11 | -a -4 | -a 13-17 
         -u --url        (str)
+        -c --cite       (str) citation key, doi or title of the entry in a multi entry bib
         renames  filename.bib to .filename.bib
+    large bib, or with -c, e.g. pdfbib paper.pdf library.bib -c vaswani2017
+        library.bib is indexed in ~/.cache/unremarkable/bib and not renamed,
+        without -c the entry whose citation key or title best matches the pdf name is used
+    folder or glob, e.g. pdfbib papers/ library.bib | pdfbib "papers/*.pdf"
+        pdfs processed in parallel, each pdf uses <pdf>.bib or the library.bib entry
+        whose citation key or title matches its file name; pdfs without bib are skipped
+        -w --workers    (int [None]) processes
+        -f --force      rewrite pdfs whose metadata already matches
     """
     parser = argparse.ArgumentParser(description='Add bib to pdf')
-    parser.add_argument('pdf', type=str, help='valid .pdf file')
+    parser.add_argument('pdf', type=str, help='valid .pdf file, folder or glob')
     parser.add_argument('bib', type=str, nargs='?', help='valid .bib file', default=None)
     parser.add_argument('-n', '--name', type=str, help='create new file with name -n', default=None)
     parser.add_argument('-p', '--pages', nargs='+', default=None,
                         help='page: eg. 2, pages: eg. 1 2 3 or pagerange: eg. 1- or 1-4')
     parser.add_argument('-k', '--keys', nargs='+', default=None, help="delete keys")
     parser.add_argument('-u', '--url', type=str, help='add url', default=None)
+    parser.add_argument('-c', '--cite', type=str, default=None,
+                        help='citation key, doi or title of entry in multi entry bib')
+    _add_batch_args(parser)
     args = parser.parse_args()
 
+    pages = _parse_pages(args.pages)
+    kwargs = {'url': args.url} if args.url else {}
+    if _is_batch(args.pdf):
+        _pdf_batch(args, True, delete_keys=args.keys, custom_pages=pages, **kwargs)
+        return
+
     pdf = _resolve_pdf(args.pdf)
     assert osp.isfile(pdf), f"pdf file not found {pdf}"
 
+    from .pdf import _use_index
+    if args.bib is not None and (args.cite or _use_index(args.bib)):
+        bib = _bib_index_entry(pdf, args.bib, args.cite)
+    else:
+        bib = _get_bib_file(pdf, args.bib)
+        assert bib is not None, f"bib file not found {args.bib}, use pdf_metadata for custom keys"
 
-    bib = _get_bib_file(pdf, args.bib)
-    assert osp.isfile(bib), f"bib file not found {args.bib}, use pdf_metadata for custom keys"
-
-    pages = _parse_pages(args.pages)
-    kwargs = {'url': args.url} if args.url else {}
+    from .pdf import pdf_mod
     pdf_mod(pdf, args.name, bibtex=bib, delete_keys=args.keys, custom_pages=pages, **kwargs)
 
 
+@_forwarded
 def pdf_page_sizes():
     """
     Args
@@ -171,8 +277,10 @@ def pdf_page_sizes():
     parser.add_argument('pdf', type=str, help='valid .pdf file')
     args = parser.parse_args()
     pdf = _resolve_pdf(args.pdf)
+    from .pdf import get_page_sizes
     get_page_sizes(pdf, verbose=True)
 
+@_forwarded
 def pdf_metadata():
     """ add metadata to pdf
     Args
@@ -187,9 +295,13 @@ def pdf_metadata():
         -u --url        (str)
         -y --year       (int)
         -s --size       (list | str) resize pages e.g. -s 443 678 | -s common | -s mean | -s A4 
+    folder or glob, e.g. pdfmeta papers/ -u https://... | pdfmeta "papers/*.pdf" library.bib
+        pdfs processed in parallel, bib as in pdfbib, pdfs without bib are still modified
+        -w --workers    (int [None]) processes
+        -f --force      rewrite pdfs whose metadata already matches
     """
     parser = argparse.ArgumentParser(description='Add metadata pdf')
-    parser.add_argument('pdf', type=str, help='valid .pdf file')
+    parser.add_argument('pdf', type=str, help='valid .pdf file, folder or glob')
     parser.add_argument('bib', type=str, nargs='?', help='valid .bib file', default=None)
     parser.add_argument('-a', '--author', type=str, nargs='+', help='add authtors', default=None)
     parser.add_argument('-b')
@@ -203,8 +315,15 @@ def pdf_metadata():
     parser.add_argument('-s', '--size', nargs='+', default=None,
                         help='resize pages to tuple | presets | most common size | mean size \
                             eg. 412 612 | A4 | common | mean')
+    _add_batch_args(parser)
 
     args = parser.parse_args()
+    if _is_batch(args.pdf):
+        kwargs = {'url': args.url} if args.url else {}
+        _pdf_batch(args, False, author=args.author, title=args.title, year=args.year,
+                   custom_pages=_parse_pages(args.pages), delete_keys=args.keys,
+                   size=_parse_size(args.size), **kwargs)
+        return
     pdf = _resolve_pdf(args.pdf)
     bib = _get_bib_file(pdf, args.bib)
     pages = _parse_pages(args.pages)
@@ -214,9 +333,11 @@ def pdf_metadata():
 
     if any((_pages, args.keys, args.title, args.pages, args.author, args.year, bib, args.size,
             kwargs)):
+        from .pdf import pdf_mod
         pdf_mod(pdf, args.name, bibtex=bib, author=args.author, title=args.title,
                 year=args.year, custom_pages=pages, delete_keys=args.keys, size=size, **kwargs)
 
+@_forwarded
 def not_in_remarkable():
     """ outputs remote files in folder
     """
@@ -228,6 +349,7 @@ def not_in_remarkable():
     out = get_remote_files(files)
     print(f"files not uploaded: {[osp.basename(o) for o in out['nonexist']]}")
 
+@_forwarded
 def remarkable_ls():
     """console entry point to print remarkable file graph from local backup
     Args
@@ -247,12 +369,14 @@ def remarkable_ls():
         pprint.pprint(graph)
 
 
+@_forwarded
 def remarkable_restart():
     """ restart remarkable service
     """
     restart_xochitl()
 
 
+@_forwarded
 def remarkable_export_annotated():
     """ console entry point merging pdf and rmscene
     Args
@@ -261,6 +385,12 @@ def remarkable_export_annotated():
         folder   (str ['.']) output folder
         out_name (str [None]) if None -> visible_name.replace(" ", "_")+".pdf"
         xochitl  (str [None]) if None, reads ~/.xochitl for local bakcupd folder
+        --crop -c   (float [12]) crop annotated pages to annotated region + margin
+        --stream -s copy pdf, append annotated pages as incremental update, constant memory
+        --no_cache  rerender every page, default reuses overlays of unchanged pages
+        --profile   (str [None]) write chrome trace of stage timings, default name if no arg
+        --cprofile  dump cProfile stats next to trace
+        --metrics   (str [None]) run metrics: .prom | .jsonl | folder
     """
     parser = argparse.ArgumentParser(description='PDF merged with annotations')
     parser.add_argument('file', type=str,
@@ -273,23 +403,144 @@ def remarkable_export_annotated():
                         help='name of merged pdf, default: visible_name + "_annotated.pdf"')
     parser.add_argument('xochitl', type=str, nargs='?', default=None,
                         help='xochitl directory if None reads from ~/.xochitl')
+    parser.add_argument('-c', '--crop', type=float, nargs='?', const=12., default=False,
+                        help='crop annotated pages to annotated region, optional margin')
+    parser.add_argument('-s', '--stream', action='store_true',
+                        help='append annotated pages to a copy of the pdf, for large pdfs')
+    parser.add_argument('--no_cache', action='store_true',
+                        help='rerender every page, ignore cached overlays')
+    _add_profile_args(parser)
+    args = parser.parse_args()
+    page = True if args.page is None else args.page
+    from .annotations import export_annotated_pdf
+    with _profiled(args, 'export'):
+        export_annotated_pdf(args.file, page, args.folder, args.out_name, args.xochitl,
+                             crop=args.crop, stream=args.stream, cache=not args.no_cache)
+
+
+@_forwarded
+def remarkable_thumbnails():
+    """ console entry point, contact sheet of annotated pages, numpy rasterizer
+    Args
+        file     (str) uuid in xochitl or visibleName
+        out_name (str [None]) if None -> visible_name.replace(" ", "_")+"_thumbs.png"
+        --dpi -d        (float [18]) thumbnail resolution
+        --cols -c       (int [6]) thumbnails per row
+        --annotated -a  only pages with .rm files
+        --xochitl -x    (str [None]) if None, reads ~/.xochitl
+        --profile   (str [None]) write chrome trace of stage timings
+        --metrics   (str [None]) run metrics: .prom | .jsonl | folder
+    """
+    parser = argparse.ArgumentParser(description='Thumbnails of annotated pages')
+    parser.add_argument('file', type=str, help='uuid in xochitl or visibleName')
+    parser.add_argument('out_name', type=str, nargs='?', default=None,
+                        help='name of png, default: visible_name + "_thumbs.png"')
+    parser.add_argument('-d', '--dpi', type=float, default=18, help='thumbnail resolution')
+    parser.add_argument('-c', '--cols', type=int, default=6, help='thumbnails per row')
+    parser.add_argument('-a', '--annotated', action='store_true',
+                        help='only annotated pages')
+    parser.add_argument('-x', '--xochitl', type=str, default=None,
+                        help='xochitl directory if None reads from ~/.xochitl')
+    _add_profile_args(parser)
+    args = parser.parse_args()
+    from .raster import contact_sheet
+    with _profiled(args, 'thumbnails'):
+        contact_sheet(args.file, args.dpi, args.cols, args.out_name, args.xochitl,
+                      annotated_only=args.annotated)
+
+
+@_forwarded
+def remarkable_grep():
+    """ console entry point, search typed text and highlights on backup
+    index in ~/.cache/unremarkable/search, updated for changed .rm files before searching
+    Args
+        query   (str) words, "exact phrase", prefix*, AND OR NOT
+        --kind -k       (str [None]) highlight | typed, default both
+        --limit -n      (int [50]) max results
+        --xochitl -x    (str [None]) if None, reads ~/.xochitl
+        --verbose -v    print index updates
+    """
+    parser = argparse.ArgumentParser(description='search typed text and highlights')
+    parser.add_argument('query', type=str, nargs='+', help='fts5 query')
+    parser.add_argument('-k', '--kind', type=str, default=None, choices=('highlight', 'typed'))
+    parser.add_argument('-n', '--limit', type=int, default=50, help='max results')
+    parser.add_argument('-x', '--xochitl', type=str, default=None,
+                        help='xochitl directory if None reads from ~/.xochitl')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print index updates')
     args = parser.parse_args()
-    page = True if args.page is None else page
-    export_annotated_pdf(args.file, page, args.folder, args.out_name, args.xochitl)
+    from .search import search, update_index
+    if args.verbose:
+        update_index(args.xochitl, verbose=True)
+    results = search(' '.join(args.query), args.xochitl, args.kind, args.limit,
+                     update=not args.verbose, marks=(_R, _A))
+    for res in results:
+        snippet = ' '.join(res['snippet'].split())
+        print(f"{_B}{res['name']}{_A} p.{res['page']} {_G}{res['kind']}{_A}  {snippet}")
+
+
+@_forwarded
+def remarkable_strokes():
+    """ console entry point, columnar stroke dataset of the backup, one file per document
+    only documents changed since the last export are rewritten
+    Args
+        folder  (str) dataset folder
+        --format -f     (str [npz]) npz | parquet, parquet requires pyarrow
+        --xochitl -x    (str [None]) if None, reads ~/.xochitl
+        --verbose -v    print documents written
+        --metrics       (str [None]) run metrics: .prom | .jsonl | folder
+    """
+    parser = argparse.ArgumentParser(description='export every stroke as columnar tables')
+    parser.add_argument('folder', type=str, help='dataset folder')
+    parser.add_argument('-f', '--format', type=str, default='npz', choices=('npz', 'parquet'))
+    parser.add_argument('-x', '--xochitl', type=str, default=None,
+                        help='xochitl directory if None reads from ~/.xochitl')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print documents written')
+    _add_profile_args(parser)
+    args = parser.parse_args()
+    from .strokes import export_strokes
+    with _profiled(args, 'strokes'):
+        out = export_strokes(args.folder, args.xochitl, args.format, args.verbose)
+    print(f"{_B}{args.folder}{_A} {out['written']} documents written, {out['removed']} removed, "
+          f"{out['unchanged']} unchanged")
 
 
+@_forwarded
 def remarkable_read_rm():
     """console entry point to read rm files v.6"""
     parser = argparse.ArgumentParser(prog="rmscene")
     parser.add_argument("file", type=argparse.FileType("rb"), help="filename to read")
     args = parser.parse_args()
 
+    from . import rmscene
     result = rmscene.read_blocks(args.file)
     for el in result:
         print()
         pprint.pprint(el)
 
 
+def remarkabled():
+    """ console entry point, warm daemon serving the other entry points on a unix socket
+    console scripts forward to it while it runs, UNREMARKABLE_NO_DAEMON=1 disables
+    Args
+        --stop      stop running daemon
+        --status    print whether a daemon is running
+        --no_ssh    do not open an ssh master connection to the tablet
+    """
+    parser = argparse.ArgumentParser(description='warm daemon for unremarkable commands')
+    parser.add_argument('--stop', action='store_true', help='stop running daemon')
+    parser.add_argument('--status', action='store_true', help='is a daemon running')
+    parser.add_argument('--no_ssh', action='store_true', help='no ssh master connection')
+    args = parser.parse_args()
+    from .daemon import serve, stop, is_running, socket_path
+    if args.stop:
+        print(f"remarkabled {'stopped' if stop() else 'not running'}")
+    elif args.status:
+        print(f"remarkabled {'running on ' + socket_path() if is_running() else 'not running'}")
+    else:
+        serve(ssh=not args.no_ssh)
+
+
+@_forwarded
 def remarkable_help():
     """console entry point for info"""
     ip = '10.11.99.1'
@@ -333,9 +584,11 @@ def remarkable_help():
         -u --url        (str)
         -y --year       (int)
         -s --size       (str | list) resize pages to -s int int | -s A4 | -s mean | -s common
+        pdf as folder or glob, e.g. "papers/*.pdf": parallel, skips unchanged
+        -w --workers    (int) processes | -f --force rewrite unchanged
     $ {_B}pdfsizes <pdf> {_G}# print page sizes of pdf{_A}#
     $ {_B}remarkable_restart  {_G}# restart xochitl service to view upload changes{_A}   
-    $ {_B}remarkable_backup {_A}[folder] # folder in (existing_dir, ? )
+    $ {_B}remarkable_backup {_A}[folder] [--profile trace.json] [--metrics run.prom] # folder in (existing_dir, ? )
         {_G}# back up reMarkable local,  folder name stored to ~/.xochitl file{_A}
         # if no folder passed: 1. reads '~/.xochitl' 2: searches for 'xochitl/' under curred pwd
     {_Y}from remarkable backup{_A}
@@ -343,13 +596,39 @@ def remarkable_help():
         {_G}# list folder and file (names, uuid) on reMarkable BACKUP{_A}
         Args        folder (str)   if no dir: 1. cat '~/.xochitl' 2: find . -type d -name 'xochitl/'
         Optional    --dir_type -d   NO ARGS  list folders only | deault folders and files
-    $ {_B}remarkable_export_annotated{_A} <filename> [page] [folder] [name] [xochitl]
-        {_G}# export annotated pdf from reMarkable BACKUP; only version 6 .rm; lines, no text/ WIP{_A}
+    $ {_B}remarkable_export_annotated{_A} <filename> [page] [folder] [name] [xochitl] [--profile trace.json --cprofile]
+        {_G}# export annotated pdf from reMarkable BACKUP; only version 6 .rm; lines and text highlights{_A}
         Args        filename    uuid or suficiently unique partial visible name
         Optional    page        int,tuple selected page or pages only | default all
                     folder      local folder | default current
                     name        output name | default visibleName
                     xochitl     backup folder | default cat ~/.xochitl
+                    --crop -c   [margin] crop annotated pages to annotated region
+                    --stream -s copy pdf, append annotated pages, for very large pdfs
+                    --no_cache  rerender all pages | default reuse unchanged page overlays
+                    --profile   write chrome trace of stage timings, --cprofile adds .prof
+                    --metrics   run metrics .prom | .jsonl | folder, also on backup, upload, strokes
+    $ {_B}remarkable_thumbnails{_A} <filename> [name] [-d dpi] [-c cols] [-a] [-x xochitl]
+        {_G}# png contact sheet of document pages with annotations, no pdf content{_A}
+        Args        filename    uuid or suficiently unique partial visible name
+        Optional    name        output name | default visibleName_thumbs.png
+                    --dpi -d    thumbnail resolution | default 18
+                    --cols -c   thumbnails per row | default 6
+                    --annotated -a  NO ARGS only annotated pages
+    $ {_B}remarkable_grep{_A} <query> [-k highlight|typed] [-n limit] [-x xochitl]
+        {_G}# search typed text and highlighted pdf text on reMarkable BACKUP, sqlite fts5 index{_A}
+        Args        query       words, "exact phrase", prefix*, AND OR NOT
+        Optional    --kind -k   highlight | typed | default both
+                    --limit -n  max results | default 50
+    $ {_B}remarkable_strokes{_A} <folder> [-f npz|parquet] [-x xochitl]
+        {_G}# every stroke on reMarkable BACKUP as point and stroke tables, one file per document{_A}
+        Args        folder      dataset folder, only changed documents are rewritten
+        Optional    --format -f npz | parquet (requires pyarrow) | default npz
+    $ {_B}remarkabled{_A} [--stop] [--status] [--no_ssh]
+        {_G}# warm daemon: commands above forward to it over a unix socket while it runs{_A}
+        {_G}# keeps imports, parsed backup files and an ssh connection to reMarkable open{_A}
+        Optional    --stop      stop running daemon
+                    UNREMARKABLE_NO_DAEMON=1  environment, run commands in process
 {_Y}python{_A}
     {_M}>>> {_B}from unremarkable import remarkable_name, get_annotated{_A}
     {_M}>>> {_B}remarkable_name({_A}<partial visbilbe name or uuid>{_B}){_A} -> tuple(uuid, visible name)
@@ -4,8 +4,9 @@ all local functions on or from backup except
 add_authors() on backup, optional upload to pdf
 
 """
-from typing import  Union, Optional, BinaryIO
+from typing import  Union, Optional, BinaryIO, Any
 import time
+import io
 import os
 import os.path as osp
 import json
@@ -20,9 +21,12 @@ from reportlab.graphics import renderPDF
 import pypdf
 
 # .rm version 6 api
-from .rmscene import SceneLineItemBlock, Line, read_blocks
+from .rmscene import SceneLineItemBlock, SceneGlyphItemBlock, Pen, PenColor, read_blocks
 from .unremarkable import restart_xochitl, _is_uuid, _find_folder, _get_xochitl, _rsync_up
 from .pdf import get_pdf_info
+from .profiling import span, count
+from .spatial import transform_bboxes, union_bbox, is_blank
+from .strokes import StrokeBatch, page_batch
 
 ##
 # .rm annotation binary files
@@ -34,27 +38,32 @@ def read_rm(data: Union[str, BinaryIO]) -> list:
     return [e for e in read_blocks(data)]
 
 def read_lines(blocks: list) -> tuple:
-    """ reads 
+    """ reads SceneLineItemBlocks to a StrokeBatch, concatenated points and per stroke arrays
+    returns lines, minmax ((xmin, xmax), (ymin, ymax)) or None
+        lines[i] is a read_line_rm() like dict, with 'bbox' (x0, y0, x1, y1)
     """
-    lines = []
-    _x = []
-    _y = []
-    for i, block in enumerate(blocks):
-        if isinstance(block, SceneLineItemBlock):
-            if isinstance(block.item.value, Line):
-                line = read_line_rm(block)
-                lines.append(line)
-                assert (line['x'] and line['y']), f"line {i} has no members! {line}"
-                _x += line['x']
-                _y += line['y']
-            elif block.item.value is not None:
-                raise ValueError(f'SceneLineItemBlock()[{i}].item().value {type(block.item.value)}')
-                # print(f'SceneLineItemBlock()[{i}].item().value class : {type(block.item.value)}')
-    if lines  and _x and _y:
-        minmax = (min(_x), max(_x)), (min(_y), max(_y))
-    else:
-        minmax = None
-    return lines, minmax
+    lines = StrokeBatch.from_blocks(blocks)
+    return lines, lines.minmax()
+
+def read_highlights(blocks: list) -> list:
+    """ highlighted pdf text, SceneGlyphItemBlocks to list of dicts
+        {'text': str, 'color': PenColor, 'rects': [(x, y, w, h), ...]} in .rm coordinates
+    """
+    out = []
+    for block in blocks:
+        if isinstance(block, SceneGlyphItemBlock) and block.item.value is not None:
+            glyph = block.item.value
+            if glyph.rectangles:
+                out.append({'text': glyph.text, 'color': glyph.color,
+                            'rects': [(r.x, r.y, r.w, r.h) for r in glyph.rectangles]})
+    return out
+
+def _glyph_blocks(rm: str) -> list:
+    """ visible SceneGlyphItemBlocks of .rm, other blocks are skipped undecoded """
+    from .scenediff import block_index, decode_block
+    index, data = block_index(rm)
+    return [decode_block(data, entry) for entry in index.values()
+            if entry.block_type == SceneGlyphItemBlock.BLOCK_TYPE and entry.visible]
 
 def read_line_rm(line: SceneLineItemBlock):
     """
@@ -349,17 +358,26 @@ def get_annotation_data(content: dict, annot: Union[str,int]) -> tuple:
     data = {k:v for k,v in content.items() if k != 'pages'}
     data['rm'] = annot
 
-    blocks = read_rm(annot)
-    lines, data['limits'] = read_lines(blocks)
+    # lines from block bytes, only highlight blocks are decoded to scene items
+    with span('read_lines', rm=osp.basename(annot)):
+        lines = page_batch(annot)
+        data['limits'] = lines.minmax()
+    count('rm_bytes', osp.getsize(annot))
+    with span('read_blocks'):
+        data['highlights'] = read_highlights(_glyph_blocks(annot))
+    count('points', lines.num_points)
     if lines:
+        data['bboxes'] = lines.bboxes
         data['annotation_width'] = data['limits'][0][1] - data['limits'][0][0]
         data['annotation_height'] = data['limits'][1][1] - data['limits'][1][0]
 
     # assuming that rm is annot over pdf
     if osp.isfile(content['uuid']):
-        pdfinfo = get_pdf_info(content['uuid'])
-        data['pdf_width'] = pdfinfo['width']
-        data['pdf_height'] = pdfinfo['height']
+        if 'pdf_width' not in content: # export resolves sizes once per document
+            with span('get_pdf_info'):
+                pdfinfo = get_pdf_info(content['uuid'])
+            data['pdf_width'] = pdfinfo['width']
+            data['pdf_height'] = pdfinfo['height']
         data['number'] = number
     return data, lines
 
@@ -486,7 +504,10 @@ def export_annotated_pdf(filename: str,
                          page: Union[int, tuple, bool] = True,
                          out_folder: str = ".",
                          out_name: Optional[str] = None,
-                         xochitl: Optional[str] = None) -> None:
+                         xochitl: Optional[str] = None,
+                         crop: Union[bool, float] = False,
+                         stream: bool = False,
+                         cache: bool = True) -> None:
     """ export merged pdf file from backup
     Args
         filename    (str) uuid in xochitl directory, or visible name
@@ -500,6 +521,12 @@ def export_annotated_pdf(filename: str,
             False:   query pages
         out_name    (str [None]) if None : visible name with _annotated_pagen.
         xochitl     (str) root folder, if None look for stored backups
+        crop        (bool, float [False]) crop annotated pages to annotated region
+            float: margin in points, True: 12 points
+        stream      (bool [False]) copy pdf and append annotated pages as incremental update
+            memory independent of page count, all pages are kept
+        cache       (bool [True]) reuse overlays of pages whose .rm and layout are unchanged
+            ~/.cache/unremarkable/overlays, prints hit rate
 
         1,2,3,4
         name': 'God of Carnage Full',
@@ -538,7 +565,20 @@ get_pdf_info('/home/z/data/reMarkable/xochitl/885a692b-e657-43f3-a6f3-0bc62594f4
   'zoom_mode': 'bestFit'},
     """
     file_uuid, name, metadata, content, pdf = _gather_uuid_info(filename, xochitl)
-
+    with span('document', 'document', uuid=file_uuid, visible_name=name):
+        _export_annotated_pdf(name, content, pdf, page, out_folder, out_name, crop, stream,
+                              cache)
+
+
+def _export_annotated_pdf(name: str,
+                          content: str,
+                          pdf: str,
+                          page: Union[int, tuple, bool],
+                          out_folder: str,
+                          out_name: Optional[str],
+                          crop: Union[bool, float] = False,
+                          stream: bool = False,
+                          cache: bool = True) -> None:
     # resolve output_name
     if out_name is None:
         out_name = name.replace(' ', '_')
@@ -549,7 +589,8 @@ get_pdf_info('/home/z/data/reMarkable/xochitl/885a692b-e657-43f3-a6f3-0bc62594f4
     out_name = osp.join(out_folder, "_annotated".join(osp.splitext(out_name)))
     assert osp.isdir(out_folder), f"cannot export file to nonexistent folder {out_folder}"
 
-    out = read_content(content)
+    with span('read_content'):
+        out = read_content(content)
 
     # get pages to export_ make sure that annotations exist
     if page is True:
@@ -561,6 +602,8 @@ get_pdf_info('/home/z/data/reMarkable/xochitl/885a692b-e657-43f3-a6f3-0bc62594f4
             _pages = re.sub(r'[\,\)\]]', "", re.sub(r'[\(\[\ ]', "_", str(page)))
             out_name = _pages.join(osp.splitext(out_name))
 
+    with span('is_blank'):
+        out['pages'] = [p for p in out['pages'] if not is_blank(p['rm'])]
     numbers = [out['pages'][i]['number'] for i in range(len(out['pages']))]
     if page is False or not set(page) & set(numbers):
         _msg = "" if page is False else f"no annotations on pages {page}, "
@@ -569,43 +612,284 @@ get_pdf_info('/home/z/data/reMarkable/xochitl/885a692b-e657-43f3-a6f3-0bc62594f4
         return None
 
     if osp.isfile(pdf):
-        _info = get_pdf_info(pdf)
+        with span('get_pdf_info'):
+            _info = get_pdf_info(pdf)
+        count('pdf_bytes_in', osp.getsize(pdf))
         out['pdf_width'], out['pdf_height']  = _info['width'], _info['height']
     else:
         out['pdf_width'], out['pdf_height'] = A4
 
     #xoff = y_offset = (2572.666 - rm_height)/2 = 38.158
-    scale_x, scale_y, scale, center_x, center_y = get_xform(out)
+    with span('get_xform'):
+        scale_x, scale_y, scale, center_x, center_y = get_xform(out)
+    xform = (center_x, scale_x, center_y, scale_y, out['pdf_height'])
+    _, tempname = mkstemp(suffix=".pdf")
+    overlays = None
+    if cache:
+        from .overlaycache import OverlayCache
+        overlays = OverlayCache()
+    if stream and osp.isfile(pdf):
+        if page != tuple(range(out['pageCount'])):
+            print(f"stream export keeps every page of the pdf, only pages {page} annotated")
+        with span('write'):
+            written = _export_incremental(out, pdf, [n for n in numbers if n in page],
+                                          out_name, xform, tempname, crop, overlays)
+        if written:
+            count('pdf_bytes_out', osp.getsize(out_name))
+            count('documents_exported')
+            print(f"Saved merged pdf to <{out_name}>, incremental update of original")
+            if overlays is not None:
+                print(overlays.report())
+            return None
+        print("pdf cannot be updated incrementally, writing all pages")
 
     mainpdf = None
     if osp.isfile(pdf):
         mainpdf = pypdf.PdfReader(pdf)
     pdf_writer = pypdf.PdfWriter()
-    _, tempname = mkstemp(suffix=".pdf")
 
     for i, p in enumerate(page):
         mainpage = mainpdf.pages[p] if mainpdf is not None else None
+        highlights = []
 
         if p in numbers:
-            data, lines = get_annotation_data(out, p)
-            if data['limits'] is None:
-                print(f"page {p} has no lines?")
-                continue
-            shifted = shift_lines(lines, center_x, scale_x, center_y, scale_y, out['pdf_height'])
-            draw_annotation(out, lines, shifted, out_name=tempname)
-            overlay = pypdf.PdfReader(tempname).pages[0]
-            if mainpdf is None:
-                mainpage = overlay
-            else:
-                mainpage.merge_page(overlay)
+            with span('page', 'page', page=p):
+                overlay, highlights, bbox = _page_annotations(out, p, xform, tempname,
+                                                              cache=overlays)
+                if overlay is None and not highlights:
+                    print(f"page {p} has no lines?")
+                    continue
+                if overlay is not None:
+                    with span('merge_page'):
+                        if mainpdf is None:
+                            mainpage = overlay
+                        else:
+                            mainpage.merge_page(overlay)
+                if crop is not False and mainpage is not None:
+                    _crop_page(mainpage, bbox, 12 if crop is True else crop)
         if mainpage is not None:
             pdf_writer.add_page(mainpage)
-
-    with open(out_name, 'wb') as fi:
-        pdf_writer.write(fi)
+            for annotation in highlights:
+                pdf_writer.add_annotation(len(pdf_writer.pages) - 1, annotation)
+
+    with span('write'):
+        with open(out_name, 'wb') as fi:
+            pdf_writer.write(fi)
+    count('pdf_bytes_out', osp.getsize(out_name))
+    count('documents_exported')
     print(f"Saved merged pdf to <{out_name}>")
+    if overlays is not None:
+        print(overlays.report())
+
+
+def _page_annotations(out: dict,
+                      page: int,
+                      xform: tuple,
+                      tempname: str,
+                      cache: Optional[Any] = None) -> tuple:
+    """ annotations of one page
+    Args
+        out         (dict) read_content() with pdf_width, pdf_height
+        xform       (tuple) center_x, scale_x, center_y, scale_y, pdf_height
+        tempname    (str) reportlab overlay file, overwritten
+        cache       (OverlayCache [None]) reuse overlay if .rm and page layout unchanged
+    returns overlay page or None, /Highlight annotations, annotated bbox or None
+    """
+    rm = None
+    if cache is not None:
+        rm = next(p['rm'] for p in out['pages'] if p['number'] == page)
+        entry = cache.get(out, rm)
+        if entry is not None:
+            overlay = None
+            if entry['overlay'] is not None:
+                overlay = pypdf.PdfReader(io.BytesIO(entry['overlay'])).pages[0]
+            highlights = []
+            if entry['highlights']:
+                highlights = highlight_annotations(entry['highlights'], *xform)
+                count('highlights', len(highlights))
+            return overlay, highlights, entry['bbox']
+
+    data, lines = get_annotation_data(out, page)
+    overlay = None
+    bboxes = np.zeros((0, 4))
+    if lines:
+        drawn = lines.drop_tools()
+        with span('shift_lines'):
+            shifted = shift_lines(drawn, *xform)
+        with span('draw_annotation'):
+            draw_annotation(out, drawn, shifted, out_name=tempname)
+        count('pages_rendered')
+        overlay = pypdf.PdfReader(tempname).pages[0]
+        bboxes = transform_bboxes(data['bboxes'], *xform)
+    highlights = []
+    if data['highlights']:
+        highlights = highlight_annotations(data['highlights'], *xform)
+        count('highlights', len(highlights))
+        bboxes = np.concatenate([bboxes, [h['/Rect'] for h in highlights]])
+    bbox = union_bbox(bboxes)
+    if cache is not None:
+        overlay_bytes = None
+        if lines:
+            with open(tempname, 'rb') as _fi:
+                overlay_bytes = _fi.read()
+        cache.put(out, rm, overlay_bytes, data['highlights'], bbox)
+    return overlay, highlights, bbox
 
 
+##
+# streaming export, original pdf bytes are copied, annotated pages replaced in an
+# incremental update: memory and time depend on annotated pages, not on page count
+#
+_INHERITED = ('/Resources', '/MediaBox', '/CropBox', '/Rotate')
+
+def _export_incremental(out: dict,
+                        pdf: str,
+                        numbers: list,
+                        out_name: str,
+                        xform: tuple,
+                        tempname: str,
+                        crop: Union[bool, float] = False,
+                        cache: Optional[Any] = None) -> bool:
+    """ out_name: pdf + incremental update section holding, per annotated page
+        page dictionary replacing the original, same object number
+        overlay as form xobject, content streams wrapping original contents in q Q
+        highlight annotations
+    returns False if pdf cannot be updated incrementally, nothing written
+    """
+    from pypdf.generic import ArrayObject, IndirectObject, NameObject
+    from .incremental import append_objects, next_object_number
+    from .pagetree import page_refs
+    # reader on an open file is lazy, only the annotated pages are resolved; from a path
+    # pypdf reads the whole file into memory
+    with open(pdf, 'rb') as _fi:
+        reader = pypdf.PdfReader(_fi)
+        if reader.is_encrypted:
+            return False
+        refs = page_refs(pdf)
+        first = next_object_number(reader)
+        appended, replaced = [], []
+
+        def _add(obj) -> IndirectObject:
+            appended.append((first + len(appended), 0, obj))
+            return IndirectObject(appended[-1][0], 0, None)
+
+        for p in sorted(set(numbers)):
+            if p >= len(refs):
+                continue
+            with span('page', 'page', page=p):
+                overlay, highlights, bbox = _page_annotations(out, p, xform, tempname,
+                                                              cache=cache)
+                if overlay is None and not highlights:
+                    continue
+                num, gen = refs[p]
+                page = _page_copy(reader.get_object(IndirectObject(num, gen, reader)))
+                if overlay is not None:
+                    name = _overlay_resource(page, _add(_overlay_form(overlay, _add)))
+                    contents = []
+                    if '/Contents' in page:
+                        contents = page.raw_get('/Contents')
+                        contents = list(contents.get_object()) \
+                            if isinstance(contents.get_object(), ArrayObject) else [contents]
+                    page[NameObject('/Contents')] = ArrayObject(
+                        [_add(_content_stream(b'q\n'))] + contents +
+                        [_add(_content_stream(b'\nQ\nq %s Do Q\n' % name.encode()))])
+                if highlights:
+                    annots = ArrayObject(page['/Annots']) if '/Annots' in page else ArrayObject()
+                    for annotation in highlights:
+                        annotation[NameObject('/P')] = IndirectObject(num, gen, None)
+                        annots.append(_add(annotation))
+                    page[NameObject('/Annots')] = annots
+                if crop is not False:
+                    _crop_page(page, bbox, 12 if crop is True else crop)
+                replaced.append((num, gen, page))
+        if not replaced:
+            return False
+        return append_objects(pdf, replaced + appended, out_path=out_name, reader=reader)
+
+
+def _page_copy(page) -> pypdf.PageObject:
+    """ shallow copy of page dictionary with inherited attributes resolved from parents"""
+    out = pypdf.PageObject()
+    out.update(page)
+    node = page
+    while '/Parent' in node and not all(k in out for k in _INHERITED):
+        node = node['/Parent'].get_object()
+        for key in _INHERITED:
+            if key not in out and key in node:
+                out[pypdf.generic.NameObject(key)] = node.raw_get(key)
+    return out
+
+
+def _overlay_resource(page: pypdf.PageObject, form) -> str:
+    """ add form to a copy of page /Resources /XObject, returns its unused name """
+    from pypdf.generic import DictionaryObject, NameObject
+    resources = DictionaryObject(page['/Resources']) if '/Resources' in page \
+        else DictionaryObject()
+    xobjects = DictionaryObject(resources['/XObject']) if '/XObject' in resources \
+        else DictionaryObject()
+    name, i = '/UnremarkableOverlay', 0
+    while name in xobjects:
+        i += 1
+        name = f'/UnremarkableOverlay{i}'
+    xobjects[NameObject(name)] = form
+    resources[NameObject('/XObject')] = xobjects
+    page[NameObject('/Resources')] = resources
+    return name
+
+
+def _overlay_form(overlay: pypdf.PageObject, add) -> Any:
+    """ reportlab overlay page as form xobject, indirect resources copied through add()"""
+    from pypdf.generic import NameObject, ArrayObject, FloatObject
+    form = _content_stream(overlay.get_contents().get_data(), compress=False)
+    form[NameObject('/Type')] = NameObject('/XObject')
+    form[NameObject('/Subtype')] = NameObject('/Form')
+    form[NameObject('/BBox')] = ArrayObject(FloatObject(float(v)) for v in overlay.mediabox)
+    if '/Resources' in overlay:
+        form[NameObject('/Resources')] = _direct(overlay['/Resources'], add)
+    return form.flate_encode()
+
+
+def _content_stream(data: bytes, compress: bool = False) -> Any:
+    from pypdf.generic import DecodedStreamObject
+    out = DecodedStreamObject()
+    out.set_data(data)
+    return out.flate_encode() if compress else out
+
+
+def _direct(obj, add) -> Any:
+    """ copy of object from another pdf: references resolved, streams added with add()"""
+    from pypdf.generic import IndirectObject, DictionaryObject, ArrayObject, StreamObject, \
+        NameObject
+    if isinstance(obj, IndirectObject):
+        obj = obj.get_object()
+        if isinstance(obj, StreamObject):
+            stream = _content_stream(obj.get_data())
+            for key, value in obj.items():
+                if key not in ('/Length', '/Filter', '/DecodeParms'):
+                    stream[NameObject(key)] = _direct(value, add)
+            return add(stream.flate_encode())
+    if isinstance(obj, DictionaryObject):
+        out = DictionaryObject()
+        for key, value in obj.items():
+            out[NameObject(key)] = _direct(value, add)
+        return out
+    if isinstance(obj, ArrayObject):
+        return ArrayObject(_direct(value, add) for value in obj)
+    return obj
+
+
+def _crop_page(page: pypdf.PageObject, bbox: Optional[tuple], margin: float = 12) -> None:
+    """ set page crop box to bbox + margin, within media box"""
+    if bbox is None:
+        return
+    box = page.mediabox
+    x0 = max(float(box.left), bbox[0] - margin)
+    y0 = max(float(box.bottom), bbox[1] - margin)
+    x1 = min(float(box.right), bbox[2] + margin)
+    y1 = min(float(box.top), bbox[3] + margin)
+    if x1 > x0 and y1 > y0:
+        page.cropbox = pypdf.generic.RectangleObject((x0, y0, x1, y1))
+
 
 ###
 # export single page process
@@ -679,54 +963,119 @@ def get_xform(data: dict) -> tuple:
     return scale_x, scale_y, scale, center_x, center_y
 
 
-def shift_lines(lines: list,
+def shift_lines(lines: Union[StrokeBatch, list],
                 center_x: float,
                 scale_x: float,
                 center_y: float,
                 scale_y: float,
-                pdf_height: float) -> list:
-    """ transforms lines by input transform 
+                pdf_height: float) -> Union[np.ndarray, list]:
+    """ transforms lines by input transform, all points in one operation
+    Args
+        lines   (StrokeBatch | list) read_lines() output, or read_line_rm() dicts
+    returns StrokeBatch: (P, 2) pdf points, stroke i is rows lines.offsets[i]:lines.offsets[i+1]
+            list: [(n, 2)] pdf points per line, as before StrokeBatch
     """
     # scale = data['customZoomScale'] | 1/data['customZoomScale'] or 1A
-    shifted_lines  = []
-    for i, line in enumerate(lines):
-        # recenter then scale to pdf
-        x = (np.array(line['x']) + center_x) * scale_x
-        y = (np.array(line['y']) + center_y) * scale_y
-        # flip y
-        y = pdf_height - y
-        # x /= scale
-        # y /= scale
-        shifted_lines.append(np.stack((x,y)).T)
-    return shifted_lines
+    if isinstance(lines, StrokeBatch):
+        return lines.transform(center_x, scale_x, center_y, scale_y, pdf_height)
+    lines = StrokeBatch.from_lines(lines)
+    return lines.split(lines.transform(center_x, scale_x, center_y, scale_y, pdf_height))
+
+
+def line_style(line: dict) -> Optional[tuple]:
+    """ (color, width, opacity, cap) used to draw a line, None for ERASER
+        color   reportlab color, width in pdf points, opacity None or float
+        cap     0 butt | 1 round, also used as line join
+    Eraser is not really an eraser but a white marker! , ignored here
+    """
+    if line['tool'].name == "ERASER":
+        return None
+    color = colors.__dict__[line['color'].name.lower().replace("_overlap", "")]
+    line_width = line['thickness_scale']
+    opacity = None
+    if "HIGHLIGHTER" in line['tool'].name:
+        opacity = 0.4
+        line_width *= 2
+    line_cap = 0
+    if "MARKER" in line['tool'].name:
+        line_cap = 1
+
+    _tools = ('FINELINER_1', 'PENCIL_1', 'MECHANICAL_PENCIL_1', 'BALLPOINT_1',
+              'FINELINER_2', 'PENCIL_2', 'MECHANICAL_PENCIL_2', 'BALLPOINT_2')
+    if line['tool'].name in _tools:
+        line_width /= 3
+    return color, line_width, opacity, line_cap
+
+
+def line_styles(lines: StrokeBatch) -> tuple:
+    """ line_style() of every stroke, evaluated once per (tool, color)
+    returns styles [(color, width factor, opacity, cap) | None], index (N,), widths (N,)
+        stroke i is drawn with styles[index[i]] and widths[i], None for ERASER
+    """
+    if not len(lines):
+        return [], np.zeros(0, dtype=np.int64), np.zeros(0)
+    pairs, index = np.unique(np.stack((lines.tool, lines.color), axis=1), axis=0,
+                             return_inverse=True)
+    index = index.reshape(-1)
+    styles = [line_style({'tool': Pen(tool), 'color': PenColor(color), 'thickness_scale': 1.})
+              for tool, color in pairs.tolist()]
+    factors = np.array([0. if style is None else style[1] for style in styles])
+    return styles, index, lines.thickness_scale * factors[index]
+
+
+def highlight_annotations(highlights: list,
+                          center_x: float,
+                          scale_x: float,
+                          center_y: float,
+                          scale_y: float,
+                          pdf_height: float) -> list:
+    """ read_highlights() to pdf /Highlight annotations, one per GlyphRange
+    one QuadPoints quad per rectangle, highlighted text in /Contents
+    no appearance stream, viewers draw highlights from QuadPoints and /C
+    """
+    from pypdf.annotations import Highlight
+    from pypdf.generic import ArrayObject, FloatObject, NameObject, TextStringObject
+    out = []
+    for highlight in highlights:
+        rects = np.array([(x, y, x + w, y + h) for x, y, w, h in highlight['rects']])
+        boxes = transform_bboxes(rects, center_x, scale_x, center_y, scale_y, pdf_height)
+        quads = ArrayObject()
+        for x0, y0, x1, y1 in boxes.tolist():
+            # upper left, upper right, lower left, lower right
+            quads.extend(FloatObject(round(v, 3)) for v in (x0, y1, x1, y1, x0, y0, x1, y0))
+        color = colors.__dict__.get(highlight['color'].name.lower().replace("_overlap", ""),
+                                    colors.yellow)
+        annotation = Highlight(rect=union_bbox(boxes), quad_points=quads,
+                               highlight_color=color.hexval()[2:], printing=True)
+        annotation[NameObject('/Contents')] = TextStringObject(highlight['text'])
+        out.append(annotation)
+    return out
 
 
 def draw_annotation(data: dict,
-                    lines: list,
-                    shifted_lines: list,
+                    lines: Union[StrokeBatch, list],
+                    shifted: Union[np.ndarray, list],
                     out_name: str = 'annot.pdf') -> None:
     """ only lines are drawn
+    Args
+        lines   (StrokeBatch | list) read_lines() output, or read_line_rm() dicts
+        shifted (ndarray | list) (P, 2) or [(n, 2)] shift_lines() output
     Eraser is not really an eraser but a white marker! , ignored here
     """
+    if not isinstance(lines, StrokeBatch):
+        lines = StrokeBatch.from_lines(lines)
+    if not isinstance(shifted, np.ndarray):
+        shifted = np.concatenate([np.zeros((0, 2))] + [np.asarray(xy) for xy in shifted])
     d = Drawing(data['pdf_width'], data['pdf_height'])
-    for i, line in enumerate(lines):
-        if line['tool'].name == "ERASER":
+    styles, index, widths = line_styles(lines)
+    # one conversion to python floats, polylines slice it
+    coords = shifted.reshape(-1).tolist()
+    offsets = (2 * lines.offsets).tolist()
+    for i, style in enumerate(styles[j] for j in index.tolist()):
+        if style is None:
             continue
-        color = colors.__dict__[line['color'].name.lower().replace("_overlap", "")]
-        line_width = line['thickness_scale']
-        opacity = None
-        if "HIGHLIGHTER" in line['tool'].name:
-            opacity = 0.4
-            line_width *= 2
-        line_join = line_cap = 0
-        if "MARKER" in line['tool'].name:
-            line_join = line_cap= 1
-
-        _tools = ('FINELINER_1', 'PENCIL_1', 'MECHANICAL_PENCIL_1', 'BALLPOINT_1',
-                  'FINELINER_2', 'PENCIL_2', 'MECHANICAL_PENCIL_2', 'BALLPOINT_2')
-        if line['tool'].name in _tools:
-            line_width /= 3
-        d.add(PolyLine(shifted_lines[i].reshape(-1).tolist(), strokeWidth=line_width,
+        color, _, opacity, line_cap = style
+        d.add(PolyLine(coords[offsets[i]:offsets[i + 1]], strokeWidth=float(widths[i]),
                        strokeColor=color, strokeOpacity=opacity,
-                       strokeLineJoin=line_join, strokeLineCap=line_cap))
+                       strokeLineJoin=line_cap, strokeLineCap=line_cap))
     renderPDF.drawToFile(d, out_name)
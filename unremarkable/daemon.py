@@ -0,0 +1,264 @@
+"""@xvdp
+remarkabled: warm process running console entry points for clients on a unix socket
+
+    $ remarkabled &                 # serve until Ctrl-C or remarkabled --stop
+    $ remarkable_ls                 # forwarded to the daemon when it is running
+
+a warm daemon keeps
+    heavy imports loaded: pypdf, reportlab, numpy, rmscene
+    parsed .metadata json and .rm pages, keyed by file mtime and size
+    an ssh ControlMaster connection to the tablet, ssh and rsync skip the handshake
+clients that find no daemon run in process, as before
+UNREMARKABLE_NO_DAEMON=1 never forwards, REMARKABLED_SOCKET overrides the socket path
+
+protocol, one request per connection, json lines
+    -> {'entry': 'remarkable_ls', 'argv': [...], 'cwd': str, 'env': {...}}
+    <- {'out': str} | {'err': str} ... {'exit': int}
+requests run one at a time: sys.argv, cwd, environment and stdout are process wide
+stdin is not forwarded
+"""
+from typing import Optional
+from contextlib import redirect_stdout, redirect_stderr
+import os
+import os.path as osp
+import sys
+import json
+import socket
+import socketserver
+import subprocess as sp
+import threading
+import traceback
+from .unremarkable import get_cache_dir, get_host_user_path, ssh_control_path, \
+    _is_host_reachable
+
+DISABLE = 'UNREMARKABLE_NO_DAEMON'
+SOCKET = 'REMARKABLED_SOCKET'
+_ENV = ('HOME', 'PATH', 'XDG_CACHE_HOME')   # client environment applied per request
+_STOP = '__stop__'
+_RUNNING = False                            # True while the daemon runs an entry point
+
+
+def socket_path() -> str:
+    """ $REMARKABLED_SOCKET or ~/.cache/unremarkable/remarkabled.sock """
+    return os.environ.get(SOCKET) or get_cache_dir('remarkabled.sock')
+
+
+##
+# client
+#
+def forward(entry: str, argv: list) -> Optional[int]:
+    """ run console entry point in remarkabled, output streamed to stdout, stderr
+    Args
+        entry   (str) name of function in unremarkable.__main__
+        argv    (list) sys.argv[1:]
+    returns exit code, None if no daemon is running: caller runs entry in process
+    """
+    if _RUNNING or os.environ.get(DISABLE, '') not in ('', '0'):
+        return None
+    conn = _connect()
+    if conn is None:
+        return None
+    request = {'entry': entry, 'argv': argv, 'cwd': os.getcwd(),
+               'env': {k: os.environ[k] for k in _ENV if k in os.environ}}
+    with conn:
+        conn.sendall(json.dumps(request).encode('utf8') + b'\n')
+        return _receive(conn.makefile('r', encoding='utf8'))
+
+
+def _connect(path: Optional[str] = None, timeout: float = 0.5) -> Optional[socket.socket]:
+    """ connected socket or None: no socket file, stale socket or daemon not answering """
+    path = path or socket_path()
+    if not osp.exists(path):
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(timeout)
+    try:
+        conn.connect(path)
+    except OSError:
+        conn.close()
+        return None
+    conn.settimeout(None)   # exports and backups take as long as they take
+    return conn
+
+
+def _receive(reader) -> int:
+    for line in reader:
+        frame = json.loads(line)
+        if 'out' in frame:
+            sys.stdout.write(frame['out'])
+            sys.stdout.flush()
+        elif 'err' in frame:
+            sys.stderr.write(frame['err'])
+            sys.stderr.flush()
+        elif 'exit' in frame:
+            return frame['exit']
+    print("remarkabled closed the connection", file=sys.stderr)
+    return 1
+
+
+def stop() -> bool:
+    """ ask running daemon to exit, False if none answered """
+    conn = _connect()
+    if conn is None:
+        return False
+    with conn:
+        conn.sendall(json.dumps({'entry': _STOP}).encode('utf8') + b'\n')
+        _receive(conn.makefile('r', encoding='utf8'))
+    return True
+
+
+def is_running(path: Optional[str] = None) -> bool:
+    conn = _connect(path)
+    if conn is None:
+        return False
+    conn.close()
+    return True
+
+
+##
+# server
+#
+class _Frames:
+    """ text stream sending each write as a json line frame """
+    def __init__(self, wfile, key: str) -> None:
+        self.wfile = wfile
+        self.key = key
+
+    def write(self, text: str) -> int:
+        if text:
+            self.wfile.write(json.dumps({self.key: text}).encode('utf8') + b'\n')
+        return len(text)
+
+    def flush(self) -> None:
+        self.wfile.flush()
+
+    def isatty(self) -> bool:
+        return False
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        request = json.loads(self.rfile.readline() or b'{}')
+        entry = request.get('entry')
+        if entry == _STOP:
+            self._exit(0)
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        out, err = _Frames(self.wfile, 'out'), _Frames(self.wfile, 'err')
+        try:
+            with redirect_stdout(out), redirect_stderr(err):
+                code = run_entry(entry, request.get('argv', []), request.get('cwd'),
+                                 request.get('env', {}))
+            self._exit(code)
+        except (BrokenPipeError, ConnectionResetError):
+            pass    # client went away
+
+    def _exit(self, code: int) -> None:
+        self.wfile.write(json.dumps({'exit': code}).encode('utf8') + b'\n')
+
+
+def run_entry(entry: str, argv: list, cwd: Optional[str] = None, env: Optional[dict] = None
+              ) -> int:
+    """ call console entry point of unremarkable.__main__ as if run from cwd with argv
+    returns exit code: SystemExit code, 1 on exception, else 0
+    """
+    global _RUNNING
+    from . import __main__ as main
+    func = getattr(main, entry, None) if entry in main.FORWARDED else None
+    if func is None:
+        print(f"remarkabled: unknown entry point {entry}", file=sys.stderr)
+        return 2
+    saved = sys.argv, os.getcwd(), {k: os.environ.get(k) for k in _ENV}
+    _RUNNING = True
+    try:
+        sys.argv = [entry] + list(argv)
+        if cwd is not None:
+            os.chdir(cwd)
+        for key in _ENV:
+            if key in (env or {}):
+                os.environ[key] = env[key]
+        result = func()
+        return result if isinstance(result, int) and not isinstance(result, bool) else 0
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception:   # pylint: disable=broad-except
+        traceback.print_exc()
+        return 1
+    finally:
+        _RUNNING = False
+        sys.argv = saved[0]
+        os.chdir(saved[1])
+        for key, value in saved[2].items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        sys.stdout.flush()
+
+
+def make_server(path: Optional[str] = None) -> socketserver.UnixStreamServer:
+    """ bound server, requests handled one at a time, socket readable by user only """
+    path = path or socket_path()
+    if osp.exists(path):
+        assert not is_running(path), f"remarkabled already running on {path}"
+        os.remove(path)     # stale, previous daemon was killed
+    os.makedirs(osp.dirname(path), exist_ok=True)
+    umask = os.umask(0o177)
+    try:
+        server = socketserver.UnixStreamServer(path, _Handler)
+    finally:
+        os.umask(umask)
+    return server
+
+
+def serve(path: Optional[str] = None, ssh: bool = True, verbose: bool = True) -> None:
+    """ run daemon until stop() or KeyboardInterrupt
+    Args
+        path    (str [None]) socket, None: socket_path()
+        ssh     (bool [True]) open ssh ControlMaster to the tablet if it is reachable
+    """
+    path = path or socket_path()
+    server = make_server(path)
+    master = _open_master() if ssh else None
+    _warm()
+    if verbose:
+        print(f"remarkabled listening on {path}"
+              + (f", ssh master {master}" if master else ""))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if osp.exists(path):
+            os.remove(path)
+        if master:
+            _close_master(master)
+        if verbose:
+            print("remarkabled stopped")
+
+
+def _warm() -> None:
+    """ import what exports and searches need, once """
+    # pylint: disable=import-outside-toplevel, unused-import
+    from . import annotations, raster, search, strokes, pdf
+
+
+def _open_master(**kwargs) -> Optional[str]:
+    """ persistent ssh connection, ssh_control_path() of host, None if unreachable """
+    host, user, _ = get_host_user_path(**kwargs)
+    if not _is_host_reachable(host, packets=1):
+        return None
+    path = ssh_control_path(host, user)
+    os.makedirs(osp.dirname(path), exist_ok=True)
+    cmd = ['ssh', '-M', '-N', '-f', '-o', 'ControlPersist=yes', '-o', f'ControlPath={path}',
+           '-o', 'ServerAliveInterval=30', f'{user}@{host}']
+    if sp.run(cmd, stdout=sp.DEVNULL, stderr=sp.DEVNULL, check=False).returncode:
+        return None
+    return path
+
+
+def _close_master(path: str, **kwargs) -> None:
+    host, user, _ = get_host_user_path(**kwargs)
+    sp.run(['ssh', '-O', 'exit', '-o', f'ControlPath={path}', f'{user}@{host}'],
+           stdout=sp.DEVNULL, stderr=sp.DEVNULL, check=False)
@@ -0,0 +1,204 @@
+"""@xvdp
+pdf incremental updates: append new or replaced objects instead of rewriting the pdf
+
+    <original pdf bytes, untouched>
+    <size> 0 obj << /Title ... >> endobj        new Info, or replaced pages, overlays ...
+    xref | xref stream      new section, /Prev points to the previous one
+    trailer << /Size /Root /Info /Prev /ID >>
+    startxref
+    %%EOF
+
+cost is independent of pdf size
+    append_info()       used by pdf_mod() when metadata keys are only added
+    append_objects()    used by export_annotated_pdf(stream=True) to add overlays to pages
+encrypted pdfs are not handled, append_info() returns False and pdf_mod() rewrites
+"""
+from typing import Optional
+import io
+import os
+import os.path as osp
+import shutil
+import tempfile
+from pypdf import PdfReader
+from pypdf.generic import DictionaryObject, NameObject, NumberObject, ArrayObject, \
+    IndirectObject, PdfObject, create_string_object
+
+
+def append_info(pdf: str,
+                metadata: dict,
+                out_path: Optional[str] = None,
+                reader: Optional[PdfReader] = None,
+                xref_stream: Optional[bool] = None) -> bool:
+    """ append incremental update section with new Info dictionary
+    Args
+        pdf         (str) pdf file
+        metadata    (dict) complete Info, {'/Title': str, ...}, replaces existing
+        out_path    (str [None]) if None update in place, else copy then update
+        reader      (PdfReader [None]) open reader on pdf, avoids reparsing trailer
+        xref_stream (bool [None]) None: same kind as last section, True | False: force
+    returns False if pdf cannot be updated incrementally, nothing is written
+    """
+    if reader is None:
+        reader = PdfReader(pdf)
+    info_num = next_object_number(reader)
+    return append_objects(pdf, [(info_num, 0, info_dict(metadata))], out_path, reader,
+                          xref_stream, info=info_num)
+
+
+def append_objects(pdf: str,
+                   objects: list,
+                   out_path: Optional[str] = None,
+                   reader: Optional[PdfReader] = None,
+                   xref_stream: Optional[bool] = None,
+                   info: Optional[int] = None) -> bool:
+    """ append incremental update section with new or replaced objects
+    Args
+        pdf         (str) pdf file
+        objects     (list) [(object number, generation, pypdf object)], existing numbers
+            replace objects, new numbers start at next_object_number(reader)
+        out_path    (str [None]) if None update in place, else copy then update
+        reader      (PdfReader [None]) open reader on pdf
+        xref_stream (bool [None]) None: same kind as last section, True | False: force
+        info        (int [None]) object number of new Info dictionary
+    returns False if pdf cannot be updated incrementally, nothing is written
+    """
+    if reader is None:
+        reader = PdfReader(pdf)
+    if reader.is_encrypted or '/Root' not in reader.trailer:
+        return False
+    with open(pdf, 'rb') as _fi:
+        prev = _last_startxref(_fi)
+        if prev is None:
+            return False
+        _fi.seek(prev)
+        is_stream = not _fi.read(4).startswith(b'xref')
+        end = _fi.seek(0, os.SEEK_END)
+    if xref_stream is None:
+        xref_stream = is_stream
+    update = _update_section(reader.trailer, objects, prev, end, xref_stream, info)
+
+    if out_path is None or osp.abspath(out_path) == osp.abspath(pdf):
+        _append(pdf, update, end)
+    else:
+        fd, tmp = tempfile.mkstemp(suffix='.pdf', prefix='.',
+                                   dir=osp.dirname(osp.abspath(out_path)))
+        os.close(fd)
+        try:
+            shutil.copyfile(pdf, tmp)
+            _append(tmp, update, end)
+            os.replace(tmp, out_path)
+        finally:
+            if osp.isfile(tmp):
+                os.remove(tmp)
+    return True
+
+
+def next_object_number(reader: PdfReader) -> int:
+    """ first object number free for appended objects """
+    return int(reader.trailer['/Size'])
+
+
+def _append(pdf: str, update: bytes, end: int) -> None:
+    """ single write, on failure truncate back to original size """
+    with open(pdf, 'r+b') as _fi:
+        _fi.seek(end)
+        try:
+            _fi.write(update)
+        except BaseException:
+            _fi.truncate(end)
+            raise
+
+
+def _last_startxref(fi: io.BufferedReader, tail: int = 2048) -> Optional[int]:
+    size = fi.seek(0, os.SEEK_END)
+    fi.seek(max(0, size - tail))
+    data = fi.read()
+    pos = data.rfind(b'startxref')
+    if pos < 0:
+        return None
+    try:
+        return int(data[pos + 9:].split()[0])
+    except (ValueError, IndexError):
+        return None
+
+
+def _serialize(obj) -> bytes:
+    stream = io.BytesIO()
+    obj.write_to_stream(stream)
+    return stream.getvalue()
+
+
+def info_dict(metadata: dict) -> DictionaryObject:
+    """ Info dictionary, pdf objects kept, other values as pdf strings """
+    info = DictionaryObject()
+    for key, value in metadata.items():
+        key = key if key.startswith('/') else f'/{key}'
+        # values read from the pdf keep their type, e.g. /Trapped /False
+        info[NameObject(key)] = (value if isinstance(value, PdfObject)
+                                 else create_string_object(str(value)))
+    return info
+
+
+def _subsections(entries: list) -> list:
+    """ [(first number, [(num, offset, gen), ...])] runs of consecutive object numbers """
+    out = []
+    for entry in sorted(entries):
+        if out and entry[0] == out[-1][0] + len(out[-1][1]):
+            out[-1][1].append(entry)
+        else:
+            out.append((entry[0], [entry]))
+    return out
+
+
+def _update_section(trailer: DictionaryObject,
+                    objects: list,
+                    prev: int,
+                    end: int,
+                    xref_stream: bool,
+                    info: Optional[int] = None) -> bytes:
+    """ objects, xref and trailer bytes to append at offset end"""
+    out = b'\n'
+    entries = []
+    for num, gen, obj in objects:
+        entries.append((num, end + len(out), gen))
+        out += b'%d %d obj\n' % (num, gen) + _serialize(obj) + b'\nendobj\n'
+    size = max([int(trailer['/Size'])] + [num + 1 for num, _, _ in objects])
+
+    new_trailer = DictionaryObject()
+    new_trailer[NameObject('/Root')] = trailer.raw_get('/Root')
+    if info is not None:
+        new_trailer[NameObject('/Info')] = IndirectObject(info, 0, None)
+    elif '/Info' in trailer:
+        new_trailer[NameObject('/Info')] = trailer.raw_get('/Info')
+    new_trailer[NameObject('/Prev')] = NumberObject(prev)
+    if '/ID' in trailer:
+        new_trailer[NameObject('/ID')] = trailer['/ID']
+
+    xref_offset = end + len(out)
+    if not xref_stream:
+        new_trailer[NameObject('/Size')] = NumberObject(size)
+        out += b'xref\n'
+        for first, run in _subsections(entries):
+            out += b'%d %d\n' % (first, len(run))
+            out += b''.join(b'%010d %05d n \n' % (offset, gen) for _, offset, gen in run)
+        out += b'trailer\n' + _serialize(new_trailer) + b'\n'
+    else:
+        # xref stream is an object itself: /Index [first count ...], /W [type offset generation]
+        xref_num = size
+        entries.append((xref_num, xref_offset, 0))
+        width = max(4, (xref_offset.bit_length() + 7) // 8)
+        index, rows = ArrayObject(), b''
+        for first, run in _subsections(entries):
+            index += [NumberObject(first), NumberObject(len(run))]
+            rows += b''.join(b'\x01' + offset.to_bytes(width, 'big') + gen.to_bytes(2, 'big')
+                             for _, offset, gen in run)
+        new_trailer[NameObject('/Size')] = NumberObject(xref_num + 1)
+        new_trailer[NameObject('/Type')] = NameObject('/XRef')
+        new_trailer[NameObject('/Index')] = index
+        new_trailer[NameObject('/W')] = ArrayObject([NumberObject(1), NumberObject(width),
+                                                     NumberObject(2)])
+        new_trailer[NameObject('/Length')] = NumberObject(len(rows))
+        out += b'%d 0 obj\n' % xref_num + _serialize(new_trailer)
+        out += b'\nstream\n' + rows + b'\nendstream\nendobj\n'
+    out += b'startxref\n%d\n%%%%EOF\n' % xref_offset
+    return out
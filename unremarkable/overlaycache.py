@@ -0,0 +1,116 @@
+"""@xvdp
+rendered page overlays cached between exports
+
+one pickle per (document uuid, page id) under ~/.cache/unremarkable/overlays/<uuid>/
+    {'key', 'overlay': reportlab pdf bytes | None, 'highlights': read_highlights(), 'bbox'}
+key: sha1 of the .rm bytes and the get_xform() inputs
+    zoomMode, orientation, customZoom*, pdf_width, pdf_height
+re-export parses and draws only pages whose .rm or page layout changed
+
+    cache = OverlayCache()
+    entry = cache.get(out, rm)      # None on miss
+    cache.put(out, rm, overlay_bytes, highlights, bbox)
+    cache.report()                  # 'overlay cache: 5/6 pages reused (83%)'
+"""
+from typing import Optional
+import os
+import os.path as osp
+import json
+import pickle
+import hashlib
+import tempfile
+from .unremarkable import get_cache_dir
+from .profiling import count
+
+_VERSION = 1
+_XFORM_INPUTS = ('zoomMode', 'orientation', 'customZoomCenterX', 'customZoomCenterY',
+                 'customZoomOrientation', 'customZoomPageHeight', 'customZoomPageWidth',
+                 'customZoomScale', 'pdf_width', 'pdf_height')
+
+
+def overlay_cache_dir(*names) -> str:
+    """ ~/.cache/unremarkable/overlays or $XDG_CACHE_HOME/unremarkable/overlays """
+    return get_cache_dir('overlays', *names)
+
+
+def overlay_key(out: dict, rm: str) -> str:
+    """ sha1 of .rm content and transform inputs of read_content() dict """
+    digest = hashlib.sha1()
+    with open(rm, 'rb') as _fi:
+        digest.update(_fi.read())
+    inputs = [_VERSION] + [out.get(k) for k in _XFORM_INPUTS]
+    digest.update(json.dumps(inputs, default=str).encode('utf8'))
+    return digest.hexdigest()
+
+
+class OverlayCache:
+    """ overlay pickles per .rm page, hit and miss counts of one export
+    Args
+        cache_dir   (str [None]) None: overlay_cache_dir()
+    """
+    def __init__(self, cache_dir: Optional[str] = None) -> None:
+        self.cache_dir = cache_dir or overlay_cache_dir()
+        self.hits = 0
+        self.misses = 0
+        self._keys = {}         # {rm: key} hashed by get(), reused by put()
+
+    def _file(self, rm: str) -> str:
+        """ <cache_dir>/<document uuid>/<page id>.pkl """
+        folder, name = osp.split(osp.splitext(osp.abspath(rm))[0])
+        return osp.join(self.cache_dir, osp.basename(folder), f"{name}.pkl")
+
+    def get(self, out: dict, rm: str) -> Optional[dict]:
+        """ cached entry if .rm and transform inputs unchanged, else None: render and put()
+        """
+        key = self._keys[rm] = overlay_key(out, rm)
+        entry = None
+        cache = self._file(rm)
+        if osp.isfile(cache):
+            try:
+                with open(cache, 'rb') as _fi:
+                    entry = pickle.load(_fi)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+                entry = None
+        if entry is not None and entry.get('key') == key:
+            self.hits += 1
+            count('overlay_cache_hits')
+            return entry
+        self.misses += 1
+        count('overlay_cache_misses')
+        return None
+
+    def put(self,
+            out: dict,
+            rm: str,
+            overlay: Optional[bytes],
+            highlights: list,
+            bbox: Optional[tuple]) -> None:
+        """ store rendered page, replaces previous entry of same page
+        Args
+            overlay     (bytes) reportlab overlay pdf, None if page has no lines
+            highlights  (list) read_highlights(), transformed again on reuse
+            bbox        (tuple) annotated region in pdf points, None if empty
+        """
+        key = self._keys.pop(rm, None) or overlay_key(out, rm)
+        entry = {'key': key, 'overlay': overlay, 'highlights': highlights, 'bbox': bbox}
+        _save(entry, self._file(rm))
+
+    def report(self) -> str:
+        """ 'overlay cache: hits/pages pages reused (rate%)' """
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0
+        return f"overlay cache: {self.hits}/{total} pages reused ({rate:.0f}%)"
+
+
+def _save(entry: dict, cache: str) -> None:
+    """ atomic write, unwritable cache only costs rerendering"""
+    tmp = None
+    try:
+        os.makedirs(osp.dirname(cache), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix='.pkl', prefix='.', dir=osp.dirname(cache))
+        with os.fdopen(fd, 'wb') as _fi:
+            pickle.dump(entry, _fi, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache)
+    except OSError:
+        if tmp is not None and osp.isfile(tmp):
+            os.remove(tmp)
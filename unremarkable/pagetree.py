@@ -0,0 +1,417 @@
+"""@xvdp
+minimal pdf structure reader for page counts and page boxes
+
+walks xref tables, xref streams and object streams, then the /Pages tree
+with inherited /MediaBox, reading only the objects it needs from a memory map
+unusual files (encrypted, broken xref, missing boxes) fall back to pypdf
+
+    >>> page_count('paper.pdf')
+    12
+    >>> page_boxes('paper.pdf')      # (N, 4) x0, y0, x1, y1 in points
+    array([[  0.,   0., 612., 792.], ...])
+    >>> page_refs('paper.pdf')       # (object number, generation) per page
+    [(4, 0), (7, 0), ...]
+"""
+from typing import Optional, Union, Any
+from collections import namedtuple
+import mmap
+import re
+import zlib
+import numpy as np
+
+
+class PdfScanError(Exception):
+    """ structure not handled by the scanner, use pypdf """
+
+
+_Ref = namedtuple('_Ref', ['num', 'gen'])
+
+_SPACE = re.compile(rb'(?:[ \t\n\r\f\x00]+|%[^\r\n]*)*')
+# token kinds are group indices, dict and array ends follow their starts
+_DICT, _DICT_END, _ARRAY, _ARRAY_END, _NAME, _REF, _NUMBER, _STRING, _HEX, _KEYWORD = \
+    range(1, 11)
+_TOKEN = re.compile(rb'(?:[ \t\n\r\f\x00]+|%[^\r\n]*)*(?:(<<)|(>>)|(\[)|(\])'
+                    rb'|(/[^ \t\n\r\f\x00()<>\[\]{}/%]*)'
+                    rb'|(\d+[ \t\n\r\f\x00]+\d+[ \t\n\r\f\x00]+R(?![^ \t\n\r\f\x00()<>\[\]{}/%]))'
+                    rb'|([+-]?(?:\d+\.?\d*|\.\d+))|(\()|(<[0-9A-Fa-f \t\n\r\f\x00]*>)'
+                    rb'|(true|false|null))')
+_OBJ = re.compile(rb'\s*(\d+)\s+(\d+)\s+obj')
+_XREF_ENTRY = re.compile(rb'(\d{10}) (\d{5}) ([nf])')
+_XREF_SUBSECTION = re.compile(rb'(\d+)\s+(\d+)[ \t]*\r?\n?')
+_SCAN_ERRORS = (PdfScanError, ValueError, KeyError, TypeError, IndexError, AttributeError,
+                OSError, zlib.error)
+
+
+def page_count(pdf: str) -> int:
+    """ number of pages, /Count of the page tree root """
+    try:
+        with open(pdf, 'rb') as _fi, _Scanner(_fi) as scanner:
+            return int(scanner.pages_root()['Count'])
+    except _SCAN_ERRORS:
+        return len(_pypdf_boxes(pdf))
+
+
+def page_boxes(pdf: str) -> np.ndarray:
+    """ (N, 4) float64 MediaBox per page, x0, y0, x1, y1 """
+    try:
+        with open(pdf, 'rb') as _fi, _Scanner(_fi) as scanner:
+            return scanner.page_boxes()
+    except _SCAN_ERRORS:
+        return _pypdf_boxes(pdf)
+
+
+def page_refs(pdf: str) -> list:
+    """ [(object number, generation)] per page, pages are read without loading the pdf """
+    try:
+        with open(pdf, 'rb') as _fi, _Scanner(_fi) as scanner:
+            return [tuple(ref) for ref in scanner.page_refs()]
+    except _SCAN_ERRORS:
+        from pypdf import PdfReader
+        with open(pdf, 'rb') as _fi:
+            return [(page.indirect_reference.idnum, page.indirect_reference.generation)
+                    for page in PdfReader(_fi).pages]
+
+
+def page_sizes(pdf: str) -> np.ndarray:
+    """ (N, 2) width, height per page """
+    boxes = page_boxes(pdf)
+    return boxes[:, 2:] - boxes[:, :2]
+
+
+def _pypdf_boxes(pdf: str) -> np.ndarray:
+    from pypdf import PdfReader
+    with open(pdf, 'rb') as _fi:
+        reader = PdfReader(_fi)
+        return np.array([[float(v) for v in page.mediabox] for page in reader.pages],
+                        dtype=np.float64).reshape(-1, 4)
+
+
+class _Scanner:
+    """ random access pdf object reader over a memory map """
+    def __init__(self, fi):
+        self.data = mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ)
+        self._sections = []     # newest first, xref tables: list, xref streams: dict
+        self._entries = {}      # num -> (1, offset, gen) | (2, objstm num, index) | None
+        self._objstms = {}
+        try:
+            self.trailer = self._read_xrefs()
+            if 'Encrypt' in self.trailer:
+                raise PdfScanError('encrypted')
+        except BaseException:
+            self.data.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.data.close()
+        return False
+
+    ##
+    # page tree
+    #
+    def pages_root(self) -> dict:
+        root = self.resolve(self.trailer['Root'])
+        return self.resolve(root['Pages'])
+
+    def walk_pages(self) -> list:
+        """ [(page ref, inherited MediaBox)] in page order """
+        root = self.pages_root()
+        pages = []
+        seen = set()
+        stack = [(root, None, None)]
+        while stack:
+            node, ref, box = stack.pop()
+            box = node.get('MediaBox', box)
+            kids = node.get('Kids')
+            if kids is not None and node.get('Type') != '/Page':
+                for kid in reversed(self.resolve(kids)):
+                    if not isinstance(kid, _Ref):
+                        raise PdfScanError('direct page tree node')
+                    if kid.num in seen:
+                        raise PdfScanError('page tree cycle')
+                    seen.add(kid.num)
+                    stack.append((self.resolve(kid), kid, box))
+            else:
+                pages.append((ref, box))
+        if len(pages) != int(self.resolve(root.get('Count', len(pages)))):
+            raise PdfScanError('page count mismatch')
+        return pages
+
+    def page_refs(self) -> list:
+        refs = [ref for ref, _ in self.walk_pages()]
+        if None in refs:
+            raise PdfScanError('page tree root is a page')
+        return refs
+
+    def page_boxes(self) -> np.ndarray:
+        boxes = []
+        for _, box in self.walk_pages():
+            if box is None:
+                raise PdfScanError('page without MediaBox')
+            boxes.append([float(self.resolve(v)) for v in self.resolve(box)])
+        boxes = np.array(boxes, dtype=np.float64).reshape(-1, 4)
+        # normalize x0 < x1, y0 < y1 like pypdf
+        return np.concatenate((np.minimum(boxes[:, :2], boxes[:, 2:]),
+                               np.maximum(boxes[:, :2], boxes[:, 2:])), axis=1)
+
+    ##
+    # objects
+    #
+    def resolve(self, obj: Any) -> Any:
+        """ follow references """
+        while isinstance(obj, _Ref):
+            obj = self.get_object(obj.num)
+        return obj
+
+    def get_object(self, num: int) -> Any:
+        entry = self._entry(num)
+        if entry is None:
+            return None
+        if entry[0] == 1:
+            obj, _ = self._read_indirect(entry[1], num)
+            return obj
+        offsets, data = self._objstm(entry[1])
+        obj, _ = _parse(data, offsets[num])
+        return obj
+
+    def _read_indirect(self, offset: int, num: Optional[int] = None) -> tuple:
+        """ (object, stream bytes or None) at offset"""
+        match = _OBJ.match(self.data, offset)
+        if match is None or (num is not None and int(match.group(1)) != num):
+            raise PdfScanError(f"no object {num} at {offset}")
+        obj, pos = _parse(self.data, match.end())
+        pos = _skip_ws(self.data, pos)
+        if not isinstance(obj, dict) or self.data[pos:pos + 6] != b'stream':
+            return obj, None
+        pos += 6
+        if self.data[pos:pos + 2] == b'\r\n':
+            pos += 2
+        elif self.data[pos:pos + 1] in (b'\n', b'\r'):
+            pos += 1
+        length = self.resolve(obj.get('Length'))
+        if not isinstance(length, int) or self.data[pos + length:pos + length + 20].find(
+                b'endstream') < 0:
+            length = self.data.find(b'endstream', pos) - pos
+            if length < 0:
+                raise PdfScanError('unterminated stream')
+        return obj, self.data[pos:pos + length]
+
+    def _objstm(self, num: int) -> tuple:
+        if num not in self._objstms:
+            obj, raw = self._read_indirect(self._entry(num)[1], num)
+            data = _decode(obj, raw)
+            first = int(obj['First'])
+            header = [int(v) for v in data[:first].split()]
+            offsets = {header[i]: first + header[i + 1] for i in range(0, 2 * int(obj['N']), 2)}
+            self._objstms[num] = (offsets, data)
+        return self._objstms[num]
+
+    ##
+    # cross reference
+    #
+    def _entry(self, num: int) -> Optional[tuple]:
+        if num not in self._entries:
+            entry = None
+            for section in self._sections:
+                if isinstance(section, dict):
+                    if num in section:
+                        entry = section[num]
+                        break
+                else:
+                    found, entry = self._table_entry(section, num)
+                    if found:
+                        break
+            self._entries[num] = entry
+        return self._entries[num]
+
+    def _table_entry(self, subsections: list, num: int) -> tuple:
+        """ (found, entry) entries are read lazily, 20 bytes each
+        free entries fall through to older sections, hybrid files list compressed objects as free
+        """
+        for start, count, pos in subsections:
+            if start <= num < start + count:
+                match = _XREF_ENTRY.match(self.data, pos + 20 * (num - start))
+                if match is None:
+                    raise PdfScanError('malformed xref table')
+                if match.group(3) == b'f':
+                    return False, None
+                return True, (1, int(match.group(1)), int(match.group(2)))
+        return False, None
+
+    def _read_xrefs(self) -> dict:
+        tail = self.data[max(0, len(self.data) - 2048):]
+        pos = tail.rfind(b'startxref')
+        if pos < 0:
+            raise PdfScanError('startxref not found')
+        offset = int(tail[pos + 9:].split()[0])
+        trailer = None
+        seen = set()
+        while offset is not None and offset not in seen:
+            seen.add(offset)
+            if self.data[offset:offset + 4] == b'xref':
+                section = self._read_table(offset)
+                if 'XRefStm' in section:     # hybrid file, stream entries follow table
+                    self._read_stream(int(section['XRefStm']))
+            else:
+                section = self._read_stream(offset)
+            if trailer is None:
+                trailer = section
+            offset = section.get('Prev')
+        if trailer is None or 'Root' not in trailer:
+            raise PdfScanError('no trailer')
+        return trailer
+
+    def _read_table(self, offset: int) -> dict:
+        subsections = []
+        pos = offset + 4
+        while True:
+            pos = _skip_ws(self.data, pos)
+            if self.data[pos:pos + 7] == b'trailer':
+                trailer, _ = _parse(self.data, pos + 7)
+                self._sections.append(subsections)
+                return trailer
+            header = _XREF_SUBSECTION.match(self.data, pos)
+            if header is None:
+                raise PdfScanError('malformed xref subsection')
+            start, count = int(header.group(1)), int(header.group(2))
+            pos = _skip_ws(self.data, header.end())
+            subsections.append((start, count, pos))
+            pos += 20 * count
+
+    def _read_stream(self, offset: int) -> dict:
+        obj, raw = self._read_indirect(offset)
+        if obj is None or obj.get('Type') != '/XRef' or raw is None:
+            raise PdfScanError('xref stream expected')
+        data = _decode(obj, raw)
+        widths = [int(w) for w in obj['W']]
+        index = [int(i) for i in obj.get('Index', [0, obj['Size']])]
+        entries = {}
+        pos = 0
+        for start, count in zip(index[::2], index[1::2]):
+            for num in range(start, start + count):
+                fields = []
+                for width in widths:
+                    fields.append(int.from_bytes(data[pos:pos + width], 'big'))
+                    pos += width
+                kind = fields[0] if widths[0] else 1
+                if kind in (1, 2): # 0 free, falls through to older sections
+                    entries[num] = (kind, fields[1], fields[2])
+        if pos > len(data):
+            raise PdfScanError('short xref stream')
+        self._sections.append(entries)
+        return obj
+
+
+##
+# object syntax
+#
+def _skip_ws(data: Union[bytes, mmap.mmap], pos: int) -> int:
+    """ past whitespace and % comments """
+    return _SPACE.match(data, pos).end()
+
+
+def _parse(data: Union[bytes, mmap.mmap], pos: int) -> tuple:
+    """ (object, end position), dicts have keys without '/', names keep '/', strings are bytes
+    one token regex and an explicit container stack, no recursion
+    """
+    stack = []
+    while True:
+        token = _TOKEN.match(data, pos)
+        if token is None:
+            raise PdfScanError(f"unexpected token at {pos}: {bytes(data[pos:pos + 16])}")
+        pos = token.end()
+        kind = token.lastindex
+        if kind in (_DICT, _ARRAY):
+            stack.append((kind, []))
+            continue
+        if kind in (_DICT_END, _ARRAY_END):
+            if not stack or stack[-1][0] != kind - 1:
+                raise PdfScanError(f"unbalanced {token.group(kind)} at {pos}")
+            items = stack.pop()[1]
+            if kind == _DICT_END:
+                value = {k[1:]: v for k, v in zip(items[::2], items[1::2])}
+            else:
+                value = items
+        elif kind == _NAME:
+            value = token.group(kind).decode('latin-1')
+        elif kind == _REF:
+            num, gen, _ = token.group(kind).split()
+            value = _Ref(int(num), int(gen))
+        elif kind == _NUMBER:
+            text = token.group(kind)
+            value = float(text) if b'.' in text else int(text)
+        elif kind == _STRING:
+            value, pos = _literal_string(data, pos - 1)
+        elif kind == _HEX:
+            value = bytes(token.group(kind)[1:-1])
+        else:
+            value = {b'true': True, b'false': False, b'null': None}[token.group(kind)]
+        if not stack:
+            return value, pos
+        stack[-1][1].append(value)
+
+
+def _literal_string(data: Union[bytes, mmap.mmap], pos: int) -> tuple:
+    """ balanced parentheses, escapes kept as is """
+    depth = 0
+    end = pos
+    while True:
+        char = data[end]
+        if char == 0x5C: # backslash
+            end += 2
+            continue
+        if char == 0x28:
+            depth += 1
+        elif char == 0x29:
+            depth -= 1
+            if not depth:
+                return bytes(data[pos + 1:end]), end + 1
+        end += 1
+
+
+def _decode(obj: dict, raw: bytes) -> bytes:
+    """ FlateDecode with optional PNG predictors, other filters are not handled"""
+    filters = obj.get('Filter', [])
+    filters = filters if isinstance(filters, list) else [filters]
+    params = obj.get('DecodeParms', {})
+    params = params[0] if isinstance(params, list) else params
+    data = bytes(raw)
+    for name in filters:
+        if name != '/FlateDecode':
+            raise PdfScanError(f"filter {name} not handled")
+        data = zlib.decompress(data)
+    if params and int(params.get('Predictor', 1)) >= 10:
+        data = _png_unpredict(data, int(params.get('Columns', 1)) *
+                              int(params.get('Colors', 1)) *
+                              int(params.get('BitsPerComponent', 8)) // 8)
+    return data
+
+
+def _png_unpredict(data: bytes, columns: int) -> bytes:
+    out = bytearray()
+    prev = bytearray(columns)
+    for start in range(0, len(data), columns + 1):
+        kind = data[start]
+        row = bytearray(data[start + 1:start + 1 + columns])
+        if kind == 1:
+            for i in range(1, len(row)):
+                row[i] = (row[i] + row[i - 1]) & 0xFF
+        elif kind == 2:
+            row = bytearray((a + b) & 0xFF for a, b in zip(row, prev))
+        elif kind == 3:
+            for i in range(len(row)):
+                left = row[i - 1] if i else 0
+                row[i] = (row[i] + ((left + prev[i]) >> 1)) & 0xFF
+        elif kind == 4:
+            for i in range(len(row)):
+                left = row[i - 1] if i else 0
+                upleft = prev[i - 1] if i else 0
+                p = left + prev[i] - upleft
+                pa, pb, pc = abs(p - left), abs(p - prev[i]), abs(p - upleft)
+                pred = left if pa <= pb and pa <= pc else prev[i] if pb <= pc else upleft
+                row[i] = (row[i] + pred) & 0xFF
+        out += row
+        prev = row
+    return bytes(out)
@@ -3,6 +3,7 @@ pdf utilities
 
 # .pdf utility functions:
     pdf_mod() # add metadata, bibtex, url, author ...modify page range
+        metadata only edits are appended as incremental update, see incremental.py
 
 # entry point to 
     __main__.pdf_bibtex / pdfbib
@@ -11,7 +12,7 @@ pdf utilities
 
 # non metadata & links preserving
     
-    split_pdf()     # create one pdf per page
+    split_pdf()     # one pdf per page, chunk or range, in a process pool
     rotate()        # rotate all pages in a pdf
     doublepage()    # joins pages side to side for 2 page view
     convert_page_size() # scale sizes
@@ -21,27 +22,39 @@ make_pdf()  Make pdf from multiple pdfs or img files, include metadata
         preserve pdfs internal links if existing
 .bib utilities
     reformat_bib() converts bib using "" to {}
+    bib_to_dict(), bibs_to_dict() large .bib files are read through bibindex.BibIndex
     
 """
 from typing import Optional, Union, Any, Tuple
 import os
 import os.path as osp
 import re
+import glob
+import time
+import tempfile
+from bisect import bisect_right
 from pprint import pprint
 import numpy as np
 import pypdf
 from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, NameObject, NumberObject
 from pybtex.database import parse_file, parse_string
 from PIL import Image
+from .incremental import append_info, info_dict
+from .pagetree import page_sizes
+from .bibindex import BibIndex
 
 FloatType = Union[float, np.float64]
+_BIB_INDEX_MIN_BYTES = 64 * 1024  # .bib files indexed in ~/.cache/unremarkable/bib
 
 
 def pdf_mod(in_path: Union[str, list, tuple],
             out_path: Optional[str] = None,
             custom_pages: Union[list, int, slice, None] = None,
             delete_keys: Union[tuple, bool, None] = None,
-            **kwargs) -> None:
+            skip_unchanged: bool = False,
+            incremental: bool = True,
+            **kwargs) -> bool:
     """
     Utility to adds metadata, including bibtex or any custom key,
         to delete selected pages or metadata keys, to join multiple pdfs
@@ -52,6 +65,11 @@ def pdf_mod(in_path: Union[str, list, tuple],
                         list    pages in list
                         slice   pages in range (0, None), 
     delete_keys     from pdf.metadata, True deletes all metadata.
+    skip_unchanged  if True and only metadata changes, do not rewrite if metadata matches
+    incremental     if True and metadata keys are only added, append Info as incremental update
+                        instead of rewriting the pdf; keys deleted or replaced, pages removed,
+                        resized or joined: rewrite, old values do not remain in the file
+    returns True if pdf was written
     kwargs:         All kwargs get added as pdf metadata
         author
         year
@@ -77,32 +95,154 @@ def pdf_mod(in_path: Union[str, list, tuple],
         if osp.splitext(out_path)[-1].lower() != ".pdf":
             out_path += ".pdf"
 
-    # clone first pdf
-    reader, writer = _clone(in_path)
+    # pdf read from open file is lazy, metadata only edits do not load the document
+    with open(in_path, 'rb') as _fi:
+        reader = PdfReader(_fi)
+        metadata = _parse_metadata(reader, **kwargs)
+        _delete_keys(metadata, delete_keys)
+        metadata_only = custom_pages is None and not join_paths and kwargs.get("size") is None
+        if metadata_only:
+            if skip_unchanged and _same_metadata(reader.metadata, metadata):
+                return False
+            if (incremental and _adds_only(reader.metadata, metadata)
+                    and append_info(in_path, metadata, out_path, reader)):
+                return True
+
+        # clone first pdf or copy selected pages in one pass
+        writer = PdfWriter()
+        pages = _select_pages(custom_pages, len(reader.pages))
+        if pages is None:
+            writer.clone_document_from_reader(reader)
+        else:
+            writer.append(reader, pages=pages, import_outline=True)
+            _copy_catalog(writer, reader, pages)
+        # replace cloned Info: deleted keys dropped, values read from the pdf keep their type
+        writer.metadata = {}
+        writer._info.get_object().update(info_dict(metadata))  # pylint: disable=protected-access
+
+        # join pdfs
+        for path in join_paths:
+            reader = PdfReader(path)
+            for page in reader.pages:
+                writer.add_page(page)
+
+        # resize pages
+        resize = kwargs.get("size", None)
+        if resize is not None:
+            newsize, vary = _get_resize_params(writer, resize)
+            _resize_pdf_pages(writer, newsize, vary)
+
+        writer.compress_identical_objects()
+        _atomic_write(writer, out_path)
+    return True
+
+
+def _same_metadata(current: Optional[dict], metadata: dict) -> bool:
+    current = {} if current is None else current
+    return {k: str(v) for k, v in current.items()} == {k: str(v) for k, v in metadata.items()}
+
+
+def _adds_only(current: Optional[dict], metadata: dict) -> bool:
+    """ True if every current key is kept with its value
+    an incremental update leaves the previous Info in the file bytes, deleted or replaced
+    values must be removed by a rewrite
+    """
+    current = {} if current is None else current
+    return all(k in metadata and str(metadata[k]) == str(v) for k, v in current.items())
 
-    # modify pages, metadata entries, keys
-    _remove_pages(writer, custom_pages)
-    metadata = _parse_metadata(reader, **kwargs)
-    _delete_keys(metadata, delete_keys)
-    writer.add_metadata(metadata)
 
+def _atomic_write(writer: PdfWriter, out_path: str) -> None:
+    """ write to temp file in destination folder, then rename over out_path
+    an interrupted write never leaves a truncated pdf
+    """
+    fd, tmp = tempfile.mkstemp(suffix='.pdf', prefix='.', dir=osp.dirname(osp.abspath(out_path)))
+    try:
+        with os.fdopen(fd, 'wb') as output_file:
+            writer.write(output_file)
+        os.replace(tmp, out_path)
+    except BaseException:
+        if osp.isfile(tmp):
+            os.remove(tmp)
+        raise
 
-    # join pdfs
-    for path in join_paths:
-        reader = PdfReader(path)
-        for page in reader.pages:
-            writer.add_page(page)
+##
+# batch pdf_mod over folders or globs, one process pool, bib database indexed once
+#
+def pdf_mod_batch(pdfs: Union[str, list, tuple],
+                  bib_db: Optional[str] = None,
+                  bibs: Optional[dict] = None,
+                  workers: Optional[int] = None,
+                  skip_unchanged: bool = True,
+                  require_bib: bool = False,
+                  bib_threshold: float = 0.85,
+                  **kwargs) -> dict:
+    """ pdf_mod() over many pdfs in a process pool, files are overwritten atomically
+    Args
+        pdfs        (str, list) folder, glob pattern e.g. "papers/*.pdf", or list of pdfs
+        bib_db      (str, list [None]) .bib files with many entries, indexed see BibIndex,
+                        entry matched to pdf file name by citation key, doi or title
+        bibs        (dict [None]) {pdf: .bib file or bibtex string}, precedes bib_db
+        workers     (int [None]) processes, None: os.cpu_count()
+        skip_unchanged  (bool [True]) do not rewrite pdfs whose metadata already matches
+        require_bib (bool [False]) skip pdfs without bib
+        bib_threshold   (float [0.85]) min title similarity of file name to bib_db entry
+    kwargs: passed to pdf_mod(), custom_pages, delete_keys, author, url ...
+    returns {'written': [], 'unchanged': [], 'skipped': [], 'failed': {pdf: error}}
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    _start = time.time()
+    pdfs = _glob_pdfs(pdfs)
+    bibs = dict(bibs or {})
+    if bib_db is not None:
+        index = BibIndex(bib_db)
+        unmatched = [pdf for pdf in pdfs if pdf not in bibs]
+        for pdf, key in index.match_pdfs(unmatched, threshold=bib_threshold).items():
+            bibs[pdf] = index.bibtex(key)
+
+    out = {'written': [], 'unchanged': [], 'skipped': [], 'failed': {}}
+    jobs = []
+    for pdf in pdfs:
+        if pdf in bibs:
+            jobs.append((pdf, dict(kwargs, bibtex=bibs[pdf], skip_unchanged=skip_unchanged)))
+        elif require_bib:
+            out['skipped'].append(pdf)
+        else:
+            jobs.append((pdf, dict(kwargs, skip_unchanged=skip_unchanged)))
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for pdf, result in zip([j[0] for j in jobs], pool.map(_pdf_mod_job, jobs)):
+                if isinstance(result, str):
+                    out['failed'][pdf] = result
+                else:
+                    out['written' if result else 'unchanged'].append(pdf)
+
+    _elapsed = time.time() - _start
+    print(f"{len(pdfs)} pdfs in {_elapsed:.2f}s ({len(pdfs)/max(_elapsed, 1e-6):.1f} files/sec): "
+          f"{len(out['written'])} written, {len(out['unchanged'])} unchanged, "
+          f"{len(out['skipped'])} without bib, {len(out['failed'])} failed")
+    for pdf, error in out['failed'].items():
+        print(f"  failed {pdf}: {error}")
+    return out
 
-    # resize pages
-    resize = kwargs.get("size", None)
-    if resize is not None:
-        newsize, vary = _get_resize_params(writer, resize)
-        _resize_pdf_pages(writer, newsize, vary)
 
-    writer.compress_identical_objects()
+def _pdf_mod_job(job: tuple) -> Union[bool, str]:
+    """ worker: True written, False unchanged, str error message"""
+    pdf, kwargs = job
+    try:
+        return pdf_mod(pdf, **kwargs)
+    except Exception as e: # pylint: disable=broad-except
+        return f"{type(e).__name__}: {e}"
+
+
+def _glob_pdfs(pdfs: Union[str, list, tuple]) -> list:
+    if isinstance(pdfs, str):
+        if osp.isdir(pdfs):
+            pdfs = get_pdfs(pdfs)
+        else:
+            pdfs = glob.glob(osp.expanduser(pdfs))
+    return sorted(p for p in pdfs if p.lower().endswith('.pdf') and osp.isfile(p))
 
-    with open(out_path, 'wb') as output_file:
-        writer.write(output_file)
 
 def _resize_pdf_pages(writer, size, checkall):
     """ """
@@ -140,29 +280,71 @@ def _clone(path: str) -> Tuple[PdfReader, PdfWriter]:
     return reader, writer
 
 
-def _remove_pages(writer: PdfWriter,
-                  pages: Union[None, int, list, tuple, slice] = None) -> None:
-    """remove pages not in list, from back to front
+def _select_pages(pages: Union[None, int, list, tuple, slice], num: int) -> Optional[list]:
+    """ sorted unique page indices to keep, None to keep all
+    int, list, tuple or slice, negative indices count from the end, out of range are ignored
+    resources are shared, outlines and links kept where they point to kept pages
     """
-    if pages is not None:
-        num = len(writer.pages)
-        if isinstance(pages, int):
-            pages = [pages]
-        elif isinstance(pages, tuple):
-            pages = list(pages)
-        elif isinstance(pages, slice):
-            pages = list(range(pages.start or 0, pages.stop or num))
-        # allow negative indexing
-        _num_pages = len(pages)
-        pages = [p%num for p in pages if p < num]
-        # only
-        if len(pages):
-            for i in range(num-1, -1, -1):
-                if i not in pages:
-                    writer.remove_page(i, clean=True)
-        elif _num_pages:
+    if pages is None:
+        return None
+    if isinstance(pages, int):
+        pages = [pages]
+    elif isinstance(pages, slice):
+        pages = range(*pages.indices(num))
+    _num_pages = len(pages)
+    pages = sorted({p % num for p in pages if -num <= p < num})
+    if not pages:
+        if _num_pages:
             print(f"Returning all pages, custom pages out of range(0, {num})")
             # should use warning logging, i know
+        return None
+    if len(pages) == num:
+        return None
+    return pages
+
+
+_CATALOG_KEYS = ('/AcroForm', '/ViewerPreferences', '/Lang', '/MarkInfo', '/PageMode')
+
+
+def _copy_catalog(writer: PdfWriter, reader: PdfReader, pages: list) -> None:
+    """ document level entries writer.append() does not carry over
+    /PageLabels are renumbered to the kept pages, labels of kept pages do not change
+    """
+    root = reader.trailer['/Root']
+    for key in _CATALOG_KEYS:
+        if key in root and key not in writer.root_object:
+            writer.root_object[NameObject(key)] = root.raw_get(key).clone(writer)
+    if '/PageLabels' not in root:
+        return
+    ranges = _label_ranges(root['/PageLabels'])
+    nums, previous = ArrayObject(), None
+    for new, old in enumerate(pages):
+        i = bisect_right([start for start, _ in ranges], old) - 1
+        if i < 0:
+            continue    # before first range, unlabeled
+        start, style = ranges[i]
+        if previous == (i, old - 1):
+            previous = (i, old)
+            continue    # same range, numbering continues
+        previous = (i, old)
+        label = DictionaryObject({NameObject(k): v for k, v in style.items() if k != '/St'})
+        label[NameObject('/St')] = NumberObject(int(style.get('/St', 1)) + old - start)
+        nums += [NumberObject(new), label]
+    if nums:
+        writer.root_object[NameObject('/PageLabels')] = DictionaryObject(
+            {NameObject('/Nums'): nums})
+
+
+def _label_ranges(tree: Any) -> list:
+    """ [(first page, label dict)] of a /PageLabels number tree, sorted """
+    tree = tree.get_object()
+    out = []
+    nums = tree.get('/Nums', [])
+    for i in range(0, len(nums) - 1, 2):
+        out.append((int(nums[i]), nums[i + 1].get_object()))
+    for kid in tree.get('/Kids', []):
+        out += _label_ranges(kid)
+    return sorted(out, key=lambda x: x[0])
 
 
 def _parse_bib(bib: str, bib_format: str = 'bibtex') -> Any:
@@ -200,6 +382,10 @@ def _get_name(names) -> str:
             out += " "
     return out
 
+def _use_index(bib: str) -> bool:
+    """ small .bib files parse faster than a cache lookup, large ones go through BibIndex"""
+    return osp.isfile(bib) and osp.getsize(bib) >= _BIB_INDEX_MIN_BYTES
+
 def bib_to_dict(in_bib: str, idx: Optional[int] = 0, bib_format: str = 'bibtex') -> Optional[dict]:
     """ return single bib 
     bib formats bibtex, yaml
@@ -207,6 +393,10 @@ def bib_to_dict(in_bib: str, idx: Optional[int] = 0, bib_format: str = 'bibtex')
     out = {}
     if idx is None:
         out = bibs_to_dict(in_bib, bib_format)
+    elif _use_index(in_bib):
+        index = BibIndex(in_bib, bib_format)
+        if idx < len(index):
+            out = dict(index.entries[index.records[idx]])
     else:
         bib = _parse_bib(in_bib, bib_format)
         if idx < len(bib.entries):
@@ -218,10 +408,14 @@ def bib_to_dict(in_bib: str, idx: Optional[int] = 0, bib_format: str = 'bibtex')
 def bibs_to_dict(in_bib: str, bib_format: str = 'bibtex', key: str = 'title') -> Optional[dict]:
     """ return all bibs as a dict of entries {<key arg>:{bib entries}}
     """
-    bib = _parse_bib(in_bib, bib_format)
+    if _use_index(in_bib):
+        entries = BibIndex(in_bib, bib_format).entries.items()
+    else:
+        entries = ((record, _bib_entry_to_dict(record, entry))
+                   for record, entry in _parse_bib(in_bib, bib_format).entries.items())
     out = {}
-    for record, entry in bib.entries.items():
-        _entry = _bib_entry_to_dict(record, entry)
+    for record, _entry in entries:
+        _entry = dict(_entry)
         item = record if key not in _entry else _entry[key]
         out[item.replace('{', '').replace('}','')] = _entry
     return out
@@ -374,18 +568,18 @@ def get_pdf_info(pdf: str, page: Optional[int] = None, verbose: bool = False) ->
     native pdfinfo is more complete
     """
     assert osp.isfile(pdf)
+    sizes = page_sizes(pdf)
+    num = len(sizes)
+    if page is None:
+        width, height = sizes[:, 0].tolist(), sizes[:, 1].tolist()
+        if len(set(height)) == 1 and len(set(width)) == 1:
+            height = height[0]
+            width = width[0]
+    else:
+        width, height = sizes[page % num].tolist()
+    # reader on open file only parses trailer and Info for metadata
     with open(pdf, 'rb') as _fi:
         red = PdfReader(_fi)
-        num = len(red.pages)
-        if page is None:
-            height = [p.mediabox.height for p in red.pages]
-            width = [p.mediabox.width for p in red.pages]
-            if len(set(height)) == 1 and len(set(width)) == 1:
-                height = height[0]
-                width = width[0]
-        else:
-            height = red.pages[page % num].mediabox.height
-            width = red.pages[page % num].mediabox.width
         metadata = dict(red.metadata) if red.metadata is not None else {}
     out = {'pages':num, 'width':width, 'height':height, **metadata}
     if verbose:
@@ -406,18 +600,88 @@ def get_pdfs(folder: str, key: Optional[str] = None) -> list:
     return pdfs
 
 
-def split_pdf(pdf: str, outname: Optional[str] = None) -> None:
-    """ saves one pdf per page
+def split_pdf(pdf: str,
+              outname: Optional[str] = None,
+              chunk: int = 1,
+              ranges: Optional[list] = None,
+              workers: Optional[int] = None,
+              dedup: bool = False) -> list:
+    """ saves one pdf per page, per chunk of pages or per range, in a process pool
+    Args
+        pdf     (str) pdf file
+        outname (str [None]) output prefix, default pdf name; <outname>_<page>[-<page>].pdf
+        chunk   (int [1]) pages per output pdf
+        ranges  (list [None]) overrides chunk, e.g. [(0, 10), (10, 12), [3, 7, 9]]
+                    tuples (start, stop) or slices are half open, lists are page numbers
+        workers (int [None]) processes, None: cpu count, 1: no pool
+        dedup   (bool [False]) compress identical objects in each output
+    each worker opens the source once, pages are read lazily
+    returns list of output files
     """
-    reader = PdfReader(pdf)
-    num = len(reader.pages)
+    _start = time.time()
+    with open(pdf, 'rb') as _fi:
+        num = len(PdfReader(_fi).pages)
     outname = osp.splitext(outname or pdf)[0]
-    outname = f"{outname}_%0{len(str(num))}d.pdf"
-    for i, page in enumerate(reader.pages):
-        writer = PdfWriter()
-        writer.add_page(page)
-        with open(outname%i, 'wb') as output_pdf:
-            writer.write(output_pdf)
+    _digits = len(str(num))
+
+    if ranges is None:
+        ranges = [list(range(i, min(i + chunk, num))) for i in range(0, num, chunk)]
+    else:
+        ranges = [list(range(*r.indices(num))) if isinstance(r, slice) else
+                  list(range(*r)) if isinstance(r, tuple) else list(r) for r in ranges]
+    jobs = []
+    for pages in ranges:
+        if not pages:
+            continue
+        name = f"{outname}_{pages[0]:0{_digits}d}"
+        if len(pages) > 1:
+            name += f"-{pages[-1]:0{_digits}d}"
+        jobs.append((pdf, pages, f"{name}.pdf", dedup))
+
+    if workers == 1 or len(jobs) == 1:
+        out = [_split_job(job) for job in jobs]
+        _close_split_readers()
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            _chunksize = max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))
+            out = list(pool.map(_split_job, jobs, chunksize=_chunksize))
+
+    _elapsed = time.time() - _start
+    _pages = sum(len(job[1]) for job in jobs)
+    _mb = sum(os.stat(f).st_size for f in out) / 2**20
+    print(f"split {_pages} pages into {len(out)} pdfs in {_elapsed:.2f}s "
+          f"({_pages/max(_elapsed, 1e-6):.1f} pages/sec, {_mb/max(_elapsed, 1e-6):.1f} MB/s)")
+    return out
+
+
+_SPLIT_READERS = {} # source pdf opened once per worker process
+
+
+def _split_reader(pdf: str) -> PdfReader:
+    key = (os.getpid(), pdf, os.stat(pdf).st_mtime_ns)
+    if key not in _SPLIT_READERS:
+        _SPLIT_READERS[key] = PdfReader(open(pdf, 'rb')) # pylint: disable=consider-using-with
+    return _SPLIT_READERS[key]
+
+
+def _close_split_readers() -> None:
+    for reader in _SPLIT_READERS.values():
+        reader.stream.close()
+    _SPLIT_READERS.clear()
+
+
+def _split_job(job: tuple) -> str:
+    pdf, pages, out_name, dedup = job
+    reader = _split_reader(pdf)
+    writer = PdfWriter()
+    for page in pages:
+        writer.add_page(reader.pages[page])
+    if dedup:
+        writer.compress_identical_objects()
+    with open(out_name, 'wb') as output_pdf:
+        writer.write(output_pdf)
+    return out_name
 
 
 # def _sizes(size, dpi: Optional[int] = None):
@@ -516,12 +780,13 @@ def get_page_sizes(pdf: Union[PdfReader, str], verbose: bool = False) -> dict:
         >>> get_page_sizes("mypdffile.pdf", verbose=Treu)
     """
     if isinstance(pdf, str):
-        pdf = PdfReader(pdf)
-    wh = np.stack([np.array(pdf.pages[i].mediabox[2:]) for i in range(len(pdf.pages))])
-    page_sizes = _page_size_stats(wh)
+        wh = page_sizes(pdf)
+    else:
+        wh = np.stack([np.array(pdf.pages[i].mediabox[2:]) for i in range(len(pdf.pages))])
+    stats = _page_size_stats(wh)
     if verbose:
-        pprint(page_sizes)
-    return page_sizes
+        pprint(stats)
+    return stats
 
 def _page_size_stats(wh) -> dict:
     """ returns {
@@ -564,8 +829,12 @@ def _page_size_stats(wh) -> dict:
         out['size_diff'] = np.abs(out['size']  - out['mean'])
     return out
 
-def _getmeanpage(reader: PdfReader) -> Tuple[FloatType, FloatType]:
-    w, h = np.stack([np.array(reader.pages[i].mediabox[2:]) for i in range(len(reader.pages))]).T
+def _getmeanpage(reader: Union[PdfReader, str]) -> Tuple[FloatType, FloatType]:
+    if isinstance(reader, str):
+        w, h = page_sizes(reader).T
+    else:
+        w, h = np.stack([np.array(reader.pages[i].mediabox[2:])
+                         for i in range(len(reader.pages))]).T
     if len(np.unique(w)) > 1:
         w_ = w[np.abs(w - w.mean()) < w.std()]
         w_mean = w_.mean() if len(np.unique(w_)) > 1 else w_[0]
@@ -591,7 +860,7 @@ def doublepage(input_path: str, suffix: str = '_2page', edge: int = 0) -> None:
     """
     reader = PdfReader(input_path)
     num = len(reader.pages)
-    w,h = _getmeanpage(reader)
+    w,h = _getmeanpage(input_path)
     if not edge:
         w_t = float(w)
         h_t = 0
@@ -658,6 +927,9 @@ def make_pdf(path: Union[str, tuple, list, None] = None,
                 list, tuple (with, height)
     kwargs
         url, author, year, bibtex, 
+        workers     (int [None]) processes decoding png, None: cpu count
+    images are placed at 100 dpi, jpegs embedded as is (DCTDecode),
+    other images decoded in a process pool and flate compressed in memory
     """
     exts = ['.pdf', '.jpg','.jpeg', '.png']
     paths = _get_files(path, sort_order, exts)
@@ -682,19 +954,17 @@ def make_pdf(path: Union[str, tuple, list, None] = None,
 
 
     writer = PdfWriter()
-    for i, path in enumerate(paths):
-        _tmppdf = None
-        if osp.splitext(path)[-1].lower() != '.pdf':
-            im = Image.open(path)
-            _tmppdf = "__".join([osp.splitext(path)[0], '.pdf'])
-            im.save(_tmppdf,'PDF', resolution=100)
-            path = _tmppdf
+    images = _encode_images([p for p in paths if osp.splitext(p)[-1].lower() != '.pdf'],
+                            kwargs.pop('workers', None))
+    for path in paths:
+        if path in images:
+            _add_image_page(writer, images[path])
+            _resize_pdf_page(writer.pages[-1], size)
+            continue
         reader = PdfReader(path)
         for _, page in enumerate(reader.pages):
             page = _resize_pdf_page(page, size)
             writer.add_page(page)
-        if _tmppdf:
-            os.remove(_tmppdf)
 
     metadata = _collect_metadata(metadata={}, **kwargs)
     if metadata:
@@ -702,6 +972,96 @@ def make_pdf(path: Union[str, tuple, list, None] = None,
     _write_pdf(writer, out_path)
 
 
+##
+# images as pdf pages without temporary files
+#
+_IMAGE_DPI = 100
+_COLORSPACES = {'L': '/DeviceGray', 'RGB': '/DeviceRGB', 'CMYK': '/DeviceCMYK'}
+
+
+def _encode_images(paths: list, workers: Optional[int] = None) -> dict:
+    """ {path: (width, height, mode, filter, data, decode)}
+    jpegs in L, RGB, CMYK are passed through, other images flate encoded in a process pool
+    """
+    out = {}
+    decode = []
+    for path in paths:
+        with Image.open(path) as im:
+            if im.format == 'JPEG' and im.mode in _COLORSPACES:
+                with open(path, 'rb') as _fi:
+                    data = _fi.read()
+                # adobe cmyk jpegs store inverted values
+                invert = im.mode == 'CMYK' and 'adobe' in im.info
+                out[path] = (*im.size, im.mode, '/DCTDecode', data, invert)
+            else:
+                decode.append(path)
+    if len(decode) > 1 and workers != 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            out.update(zip(decode, pool.map(_flate_image, decode)))
+    else:
+        out.update((path, _flate_image(path)) for path in decode)
+    return out
+
+
+def _flate_image(path: str) -> tuple:
+    """ decode image to L or RGB, transparency composited on white, zlib compress"""
+    import zlib
+    with Image.open(path) as im:
+        if im.mode in ('RGBA', 'LA', 'PA', 'P') or 'transparency' in im.info:
+            im = im.convert('RGBA')
+            background = Image.new('RGBA', im.size, (255, 255, 255, 255))
+            im = Image.alpha_composite(background, im)
+        if im.mode.startswith('I') or im.mode == 'F':
+            im = _to_8bit(im)
+        elif im.mode not in ('L', 'RGB'):
+            im = im.convert('L' if im.mode == '1' else 'RGB')
+        return (*im.size, im.mode, '/FlateDecode', zlib.compress(im.tobytes(), 6), False)
+
+
+def _to_8bit(im: Image.Image) -> Image.Image:
+    """ 16 bit, 32 bit int and float grayscale to L, rescaled, convert('L') clips at 255
+    I;16: 0-65535, I and F: 0-255 if max fits, F 0-1, else 16 bit range
+    """
+    values = np.asarray(im, dtype=np.float64)
+    peak = values.max(initial=0)
+    if im.mode.startswith('I;16') or peak > 255:
+        top = 65535.
+    elif im.mode == 'F' and peak <= 1:
+        top = 1.
+    else:
+        top = 255.
+    values = np.clip(np.round(values * (255. / top)), 0, 255).astype(np.uint8)
+    return Image.fromarray(values, 'L')
+
+
+def _add_image_page(writer: PdfWriter, image: tuple, dpi: float = _IMAGE_DPI) -> None:
+    """ blank page of image size at dpi with image XObject drawn over it"""
+    from pypdf.generic import StreamObject, DictionaryObject, ArrayObject, NameObject, \
+        NumberObject, DecodedStreamObject
+    width, height, mode, _filter, data, invert = image
+    xobject = StreamObject()
+    xobject.set_data(data)
+    xobject.update({NameObject('/Type'): NameObject('/XObject'),
+                    NameObject('/Subtype'): NameObject('/Image'),
+                    NameObject('/Width'): NumberObject(width),
+                    NameObject('/Height'): NumberObject(height),
+                    NameObject('/ColorSpace'): NameObject(_COLORSPACES[mode]),
+                    NameObject('/BitsPerComponent'): NumberObject(8),
+                    NameObject('/Filter'): NameObject(_filter)})
+    if invert:
+        xobject[NameObject('/Decode')] = ArrayObject([NumberObject(1), NumberObject(0)] * 4)
+
+    page_w, page_h = width * 72 / dpi, height * 72 / dpi
+    page = writer.add_blank_page(page_w, page_h)
+    content = DecodedStreamObject()
+    content.set_data(f"q {page_w:.4f} 0 0 {page_h:.4f} 0 0 cm /Im0 Do Q".encode())
+    page[NameObject('/Resources')] = DictionaryObject({
+        NameObject('/XObject'): DictionaryObject({
+            NameObject('/Im0'): writer._add_object(xobject)})}) # pylint: disable=protected-access
+    page[NameObject('/Contents')] = writer._add_object(content) # pylint: disable=protected-access
+
+
 def _resize_im(im, size):
     if size:
         _size = list(im.size)
@@ -0,0 +1,275 @@
+"""@xvdp
+stage level profiling for export and backup
+
+timed spans per stage, page and document, and byte / point counters
+written as chrome trace json ( chrome://tracing or https://ui.perfetto.dev )
+
+disabled by default, span() returns a shared null context and count() returns without
+recording anything; profile() enables both within its context
+    >>> from unremarkable.profiling import profile
+    >>> with profile('export_trace.json', cprofile=True):
+    ...     export_annotated_pdf('Topology')
+
+console
+    $ remarkable_export_annotated Topology --profile export_trace.json --cprofile
+
+per run metrics for cron jobs, stage seconds, counters, cache hit ratios and failures
+written as an OpenMetrics textfile (node exporter textfile collector) or appended as json lines
+    $ remarkable_backup --metrics /var/lib/node_exporter/textfile   # .../unremarkable_backup.prom
+    $ remarkable_export_annotated Topology --metrics runs.jsonl
+"""
+from typing import Optional, Iterator
+from contextlib import contextmanager, nullcontext
+import os
+import os.path as osp
+import re
+import json
+import time
+import threading
+
+_TRACER = None
+_NULL = nullcontext()
+
+
+class Tracer:
+    """ collects timed spans and counters as chrome trace events
+    Args
+        name    (str ['unremarkable']) process name shown in trace viewer
+    """
+    def __init__(self, name: str = 'unremarkable'):
+        self.name = name
+        self.events = []
+        self.counters = {}
+        self._t0 = time.perf_counter()
+        self._pid = os.getpid()
+
+    def _now(self) -> float:
+        """ microseconds since tracer start """
+        return (time.perf_counter() - self._t0) * 1e6
+
+    @contextmanager
+    def span(self, name: str, cat: str = 'stage', **args) -> Iterator[None]:
+        """ time a block, nested spans show as stacked slices """
+        start = self._now()
+        try:
+            yield
+        finally:
+            self.events.append({'name': name, 'cat': cat, 'ph': 'X', 'ts': start,
+                                'dur': self._now() - start, 'pid': self._pid,
+                                'tid': threading.get_ident(), 'args': args})
+
+    def count(self, name: str, value: float = 1) -> None:
+        """ accumulate counter, emits a counter event with running total """
+        self.counters[name] = self.counters.get(name, 0) + value
+        self.events.append({'name': name, 'cat': 'counter', 'ph': 'C', 'ts': self._now(),
+                            'pid': self._pid, 'args': {name: self.counters[name]}})
+
+    def summary(self) -> dict:
+        """ {span name: {'count': int, 'total_ms': float}, ..., 'counters': {...}} """
+        out = {}
+        for event in self.events:
+            if event['ph'] == 'X':
+                stage = out.setdefault(event['name'], {'count': 0, 'total_ms': 0.0})
+                stage['count'] += 1
+                stage['total_ms'] += event['dur'] / 1e3
+        out['counters'] = dict(self.counters)
+        return out
+
+    def to_chrome_trace(self, out_name: str) -> str:
+        """ write chrome trace event json, returns file name """
+        meta = [{'name': 'process_name', 'ph': 'M', 'pid': self._pid,
+                 'args': {'name': self.name}}]
+        with open(out_name, 'w', encoding='utf8') as _fi:
+            json.dump({'traceEvents': meta + self.events, 'displayTimeUnit': 'ms',
+                       'otherData': {'counters': self.counters}}, _fi)
+        return out_name
+
+
+##
+# run metrics
+#
+PREFIX = 'unremarkable'
+
+
+def run_metrics(tracer: Tracer, job: str, failed: bool = False) -> dict:
+    """ flat metrics of one profiled run
+    Args
+        tracer  (Tracer) finished tracer
+        job     (str) run label, e.g. 'backup', 'export'
+        failed  (bool [False]) run raised, added to the 'command_failures' counter
+    returns {'job', 'timestamp', 'duration_seconds', 'failures',
+             'stages': {name: {'calls', 'seconds'}}, 'counters': {}, 'cache_hit_ratio': {}}
+    cache_hit_ratio pairs '<cache>_hits' and '<cache>_misses' counters
+    """
+    summary = tracer.summary()
+    counters = summary.pop('counters')
+    total = summary.pop('total', {'total_ms': 0.0})
+    ratios = {}
+    for name in counters:
+        if name.endswith('_misses'):
+            cache = name[:-len('_misses')]
+            hits = counters.get(f"{cache}_hits", 0)
+            calls = hits + counters[name]
+            if calls:
+                ratios[cache] = hits / calls
+    # single source: failed commands and unreachable hosts, stages do not count their own
+    failures = int(failed) + counters.get('command_failures', 0)
+    return {'job': job, 'timestamp': time.time(), 'duration_seconds': total['total_ms'] / 1e3,
+            'failures': failures,
+            'stages': {name: {'calls': stage['count'], 'seconds': stage['total_ms'] / 1e3}
+                       for name, stage in summary.items()},
+            'counters': counters, 'cache_hit_ratio': ratios}
+
+
+def write_metrics(metrics: dict, out_name: str) -> str:
+    """ write run_metrics()
+    Args
+        metrics     (dict) from run_metrics()
+        out_name    (str) .jsonl: one line appended per run
+                          folder: <folder>/unremarkable_<job>.prom
+                          else OpenMetrics textfile, replaced atomically
+    returns file name
+    """
+    out_name = osp.abspath(osp.expanduser(out_name))
+    if osp.isdir(out_name):
+        out_name = osp.join(out_name, f"{PREFIX}_{_metric_name(metrics['job'])}.prom")
+    if out_name.lower().endswith('.jsonl'):
+        line = (json.dumps(metrics) + '\n').encode('utf8')
+        fd = os.open(out_name, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)     # single write, concurrent runs do not interleave lines
+        finally:
+            os.close(fd)
+        return out_name
+    # textfile collector may read at any time, never expose a partial file
+    tmp = f"{out_name}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf8') as _fi:
+        _fi.write(openmetrics(metrics))
+    os.replace(tmp, out_name)
+    return out_name
+
+
+def openmetrics(metrics: dict) -> str:
+    """ OpenMetrics text of run_metrics(), gauges of the last run labeled by job """
+    job = f'job="{_label(metrics["job"])}"'
+    lines = []
+
+    def _family(name, help_, samples):
+        name = f"{PREFIX}_{name}"
+        lines.extend([f"# HELP {name} {help_}", f"# TYPE {name} gauge"])
+        lines.extend(f"{name}{{{job}{labels}}} {_number(value)}" for labels, value in samples)
+
+    _family('run_timestamp_seconds', 'end of last run, unix time',
+            [('', metrics['timestamp'])])
+    _family('run_duration_seconds', 'wall time of last run', [('', metrics['duration_seconds'])])
+    _family('run_failures', 'failed commands and exceptions in last run',
+            [('', metrics['failures'])])
+    stages = sorted(metrics['stages'].items())
+    _family('stage_seconds', 'wall time per stage, nested stages overlap',
+            [(f',stage="{_label(name)}"', stage['seconds']) for name, stage in stages])
+    _family('stage_calls', 'times each stage ran',
+            [(f',stage="{_label(name)}"', stage['calls']) for name, stage in stages])
+    if metrics['cache_hit_ratio']:
+        _family('cache_hit_ratio', 'hits / lookups per cache',
+                [(f',cache="{_label(name)}"', value)
+                 for name, value in sorted(metrics['cache_hit_ratio'].items())])
+    for name, value in sorted(metrics['counters'].items()):
+        _family(_metric_name(name), f"{name} in last run", [('', value)])
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def _label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def get_tracer() -> Optional[Tracer]:
+    """ active tracer or None """
+    return _TRACER
+
+
+def span(name: str, cat: str = 'stage', **args):
+    """ timed context if profiling is enabled, else shared null context
+        >>> with span('read_blocks', page=3):
+        ...     blocks = read_rm(rm)
+    """
+    if _TRACER is None:
+        return _NULL
+    return _TRACER.span(name, cat, **args)
+
+
+def count(name: str, value: float = 1) -> None:
+    """ increment counter if profiling is enabled """
+    if _TRACER is not None:
+        _TRACER.count(name, value)
+
+
+@contextmanager
+def profile(out_name: Optional[str] = None,
+            cprofile: bool = False,
+            verbose: bool = True,
+            metrics: Optional[str] = None,
+            job: str = PREFIX) -> Iterator[Tracer]:
+    """ enable profiling within context
+    Args
+        out_name    (str [None]) chrome trace .json, if None trace is not written
+        cprofile    (bool [False]) also run cProfile, dump to <out_name>.prof
+        verbose     (bool [True]) print stage summary on exit
+        metrics     (str [None]) write_metrics() on exit, .prom, .jsonl or folder
+        job         (str ['unremarkable']) metrics job label
+    """
+    global _TRACER
+    previous = _TRACER
+    tracer = Tracer()
+    _TRACER = tracer
+    profiler = None
+    if cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    failed = False
+    try:
+        with tracer.span('total'):
+            yield tracer
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        _TRACER = previous
+        if out_name is not None:
+            out_name = osp.abspath(osp.expanduser(out_name))
+            if osp.splitext(out_name)[-1].lower() != '.json':
+                out_name += '.json'
+            tracer.to_chrome_trace(out_name)
+            if verbose:
+                print(f"Saved trace to <{out_name}>")
+            if profiler is not None:
+                _prof = f"{osp.splitext(out_name)[0]}.prof"
+                profiler.dump_stats(_prof)
+                if verbose:
+                    print(f"Saved cProfile stats to <{_prof}>")
+        if metrics is not None:
+            _metrics = write_metrics(run_metrics(tracer, job, failed), metrics)
+            if verbose:
+                print(f"Saved metrics to <{_metrics}>")
+        if verbose:
+            _print_summary(tracer.summary())
+
+
+def _print_summary(summary: dict) -> None:
+    counters = summary.pop('counters', {})
+    stages = sorted(summary.items(), key=lambda x: -x[1]['total_ms'])
+    for name, stage in stages:
+        print(f"  {name:<24} {stage['count']:>6} x {stage['total_ms']:>12.2f} ms")
+    for name, value in counters.items():
+        print(f"  {name:<24} {value:>12}")
@@ -0,0 +1,221 @@
+"""@xvdp
+numpy rasterizer for quick annotation previews
+
+draws SceneLineItemBlock strokes straight into an image buffer, no reportlab, no pdf
+    same transform as export_annotated_pdf: get_xform() and shift_lines()
+    same tool widths, colors and highlighter opacity: annotations.line_styles()
+pdf page content is not rendered, pages are white
+
+    >>> img = render_page_png('<xochitl>/<uuid>/<page uuid>.rm', dpi=50, out_name='page.png')
+    >>> contact_sheet('Topology', dpi=18, cols=8)   # whole document on one png
+"""
+from typing import Optional, Union
+from functools import lru_cache
+import os.path as osp
+import time
+import numpy as np
+
+from reportlab.lib.pagesizes import A4
+from .annotations import read_content, get_xform, shift_lines, \
+    line_styles, _gather_uuid_info
+from .pdf import get_pdf_info
+from .spatial import is_blank
+from .strokes import StrokeBatch, page_batch
+from .profiling import span, count
+
+_BACKGROUND = 255
+_GUTTER = 160
+
+
+def render_page(rm_path: str,
+                dpi: float = 36,
+                content: Optional[dict] = None,
+                pdf_size: Optional[tuple] = None) -> np.ndarray:
+    """ rasterize strokes of one .rm page -> ndarray (H, W, 3) uint8
+    Args
+        rm_path     (str) <xochitl>/<uuid>/<page uuid>.rm
+        dpi         (float [36]) 72 is 1 pixel per pdf point
+        content     (dict [None]) read_content() of the document, read if None
+        pdf_size    (tuple [None]) page (width, height) in points, read from pdf if None
+    """
+    folder = osp.dirname(osp.abspath(rm_path))
+    if content is None:
+        content = read_content(f"{folder}.content")
+    if pdf_size is None:
+        pdf_size = _pdf_page_size(f"{folder}.pdf", _page_number(content, rm_path))
+    data = dict(content, pdf_width=pdf_size[0], pdf_height=pdf_size[1])
+    with span('read_lines'):
+        lines = page_batch(rm_path)
+    with span('rasterize'):
+        return rasterize_lines(lines, data, dpi)
+
+
+def render_page_png(rm_path: str,
+                    dpi: float = 36,
+                    out_name: Optional[str] = None):
+    """ rasterize strokes of one .rm page -> PIL.Image, saved if out_name is passed
+    Args
+        rm_path     (str) <xochitl>/<uuid>/<page uuid>.rm
+        dpi         (float [36])
+        out_name    (str [None]) .png file name
+    """
+    from PIL import Image
+    img = Image.fromarray(render_page(rm_path, dpi))
+    if out_name is not None:
+        img.save(out_name)
+    return img
+
+
+def rasterize_lines(lines: Union[StrokeBatch, list], data: dict, dpi: float = 36) -> np.ndarray:
+    """ draw read_lines() output on white page of data['pdf_width'], data['pdf_height']
+    Args
+        lines   (StrokeBatch | list) output of read_lines(), or read_line_rm() dicts
+        data    (dict) read_content() with pdf_width and pdf_height
+        dpi     (float [36])
+    """
+    px = dpi / 72
+    width, height = float(data['pdf_width']), float(data['pdf_height'])
+    img = np.full((max(round(height * px), 1), max(round(width * px), 1), 3), _BACKGROUND,
+                  dtype=np.uint8)
+    if not isinstance(lines, StrokeBatch):
+        lines = StrokeBatch.from_lines(lines)
+    lines = lines.drop_tools()
+    if not lines:
+        return img
+    scale_x, scale_y, _, center_x, center_y = get_xform(data)
+    xy = shift_lines(lines, center_x, scale_x, center_y, scale_y, height)
+    # pdf points, y up -> pixels, y down
+    xy[:, 0] *= px
+    xy[:, 1] = (height - xy[:, 1]) * px
+    styles, index, widths = line_styles(lines)
+    rgbs = [None if style is None else np.array(style[0].rgb()) * 255 for style in styles]
+    radii = np.maximum(widths * px / 2, 0.5).tolist()
+    offsets = lines.offsets.tolist()
+    for i, j in enumerate(index.tolist()):
+        _draw_polyline(img, xy[offsets[i]:offsets[i + 1]], radii[i], rgbs[j], styles[j][2])
+    count('points', lines.num_points)
+    return img
+
+
+def _draw_polyline(img: np.ndarray,
+                   xy: np.ndarray,
+                   radius: float,
+                   rgb: np.ndarray,
+                   opacity: Optional[float] = None) -> None:
+    """ thick polyline: segments sampled at half pixel, unique samples stamped with a disc
+    each pixel is painted once per stroke so translucent strokes do not accumulate
+    """
+    if len(xy) > 1:
+        seg = np.diff(xy, axis=0)
+        num = np.maximum(np.ceil(np.hypot(seg[:, 0], seg[:, 1]) * 2).astype(np.int64), 1)
+        first = np.repeat(np.cumsum(num) - num, num)
+        t = (np.arange(num.sum()) - first) / np.repeat(num, num)
+        xy = np.concatenate((np.repeat(xy[:-1], num, axis=0)
+                             + np.repeat(seg, num, axis=0) * t[:, None], xy[-1:]))
+    height, width = img.shape[:2]
+    centers = np.unique(np.round(xy).astype(np.int64), axis=0)
+    pix = (centers[:, None, :] + _disc(round(radius * 4) / 4)[None]).reshape(-1, 2)
+    keep = (pix[:, 0] >= 0) & (pix[:, 0] < width) & (pix[:, 1] >= 0) & (pix[:, 1] < height)
+    flat = np.unique(pix[keep, 1] * width + pix[keep, 0])
+    view = img.reshape(-1, 3)
+    if opacity is None:
+        view[flat] = rgb
+    else:
+        view[flat] = view[flat] * (1 - opacity) + rgb * opacity
+
+
+@lru_cache(maxsize=64)
+def _disc(radius: float) -> np.ndarray:
+    """ (K, 2) integer pixel offsets within radius"""
+    r = int(np.ceil(radius))
+    y, x = np.mgrid[-r:r + 1, -r:r + 1]
+    mask = x**2 + y**2 <= max(radius, 0.5)**2
+    return np.stack((x[mask], y[mask]), axis=1)
+
+
+def _page_number(content: dict, rm_path: str) -> int:
+    rm_id = osp.basename(rm_path)
+    for page in content['pages']:
+        if osp.basename(page['rm']) == rm_id:
+            return page['number']
+    raise AssertionError(f"{rm_path} not in {content['pages']}")
+
+
+def _pdf_page_size(pdf: str, page: int) -> tuple:
+    if not osp.isfile(pdf):
+        return A4
+    info = get_pdf_info(pdf, page)
+    return info['width'], info['height']
+
+
+def _page_sizes(pdf: str, num: int) -> list:
+    if not osp.isfile(pdf):
+        return [A4] * num
+    info = get_pdf_info(pdf)
+    if isinstance(info['width'], list):
+        return list(zip(info['width'], info['height']))
+    return [(info['width'], info['height'])] * info['pages']
+
+
+def contact_sheet(filename: str,
+                  dpi: float = 18,
+                  cols: int = 6,
+                  out_name: Optional[str] = None,
+                  xochitl: Optional[str] = None,
+                  annotated_only: bool = False,
+                  gutter: int = 4):
+    """ thumbnails of all pages of a document on one image
+    Args
+        filename    (str) uuid or sufficiently unique partial visible name
+        dpi         (float [18]) thumbnail resolution
+        cols        (int [6]) thumbnails per row
+        out_name    (str [None]) .png name, if None: visible name + _thumbs.png
+        xochitl     (str [None]) backup folder, if None read from ~/.xochitl
+        annotated_only  (bool [False]) only pages with annotations
+        gutter      (int [4]) pixels between thumbnails
+    returns PIL.Image
+    """
+    from PIL import Image
+    _start = time.time()
+    _, name, _, content_file, pdf = _gather_uuid_info(filename, xochitl)
+    content = read_content(content_file)
+    rm_pages = {p['number']: p['rm'] for p in content['pages']}
+    sizes = _page_sizes(pdf, content['pageCount'])
+    numbers = sorted(rm_pages) if annotated_only else list(range(len(sizes)))
+
+    thumbs = []
+    for number in numbers:
+        width, height = sizes[number]
+        rm = rm_pages.get(number)
+        if rm is not None and not is_blank(rm):
+            with span('page', 'page', page=number):
+                thumbs.append(render_page(rm, dpi, content, (width, height)))
+            count('pages_rendered')
+        else:
+            px = dpi / 72
+            thumbs.append(np.full((round(height * px), round(width * px), 3), _BACKGROUND,
+                                  dtype=np.uint8))
+    if not thumbs:
+        print(f"no pages to render in '{name}'")
+        return None
+
+    cell_h = max(t.shape[0] for t in thumbs)
+    cell_w = max(t.shape[1] for t in thumbs)
+    rows = -(-len(thumbs) // cols)
+    sheet = np.full((rows * (cell_h + gutter) + gutter, min(cols, len(thumbs))
+                     * (cell_w + gutter) + gutter, 3), _GUTTER, dtype=np.uint8)
+    for i, thumb in enumerate(thumbs):
+        y = gutter + (i // cols) * (cell_h + gutter)
+        x = gutter + (i % cols) * (cell_w + gutter)
+        sheet[y:y + thumb.shape[0], x:x + thumb.shape[1]] = thumb
+
+    if out_name is None:
+        out_name = f"{name.replace(' ', '_')}_thumbs.png"
+    if osp.splitext(out_name)[-1].lower() != '.png':
+        out_name += '.png'
+    img = Image.fromarray(sheet)
+    img.save(out_name)
+    _elapsed = time.time() - _start
+    print(f"Saved {len(thumbs)} pages to <{out_name}> in {_elapsed:.2f}s "
+          f"({_elapsed / len(thumbs):.3f}s/page)")
+    return img
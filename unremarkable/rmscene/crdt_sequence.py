@@ -36,6 +36,7 @@ class CrdtSequence(tp.Generic[_Ti]):
     left/right IDs establishing a partial order.
 
     Iterating through the `CrdtSequence` yields IDs following this order.
+    The order is sorted once and cached until the next `add`.
 
     """
 
@@ -43,6 +44,7 @@ class CrdtSequence(tp.Generic[_Ti]):
         if items is None:
             items = []
         self._items = {item.item_id: item for item in items}
+        self._order: tp.Optional[list[CrdtId]] = None
 
     def __eq__(self, other):
         if isinstance(other, CrdtSequence):
@@ -58,7 +60,12 @@ class CrdtSequence(tp.Generic[_Ti]):
 
     def __iter__(self) -> tp.Iterator[CrdtId]:
         """Return ids in order"""
-        yield from toposort_items(self._items.values())
+        if self._order is None:
+            self._order = list(toposort_items(self._items.values()))
+        return iter(self._order)
+
+    def __len__(self) -> int:
+        return len(self._items)
 
     def keys(self) -> list[CrdtId]:
         """Return CrdtIds in order."""
@@ -88,6 +95,7 @@ class CrdtSequence(tp.Generic[_Ti]):
         if item.item_id in self._items:
             raise ValueError("Already have item %s" % item.item_id)
         self._items[item.item_id] = item
+        self._order = None
 
 
 END_MARKER = CrdtId(0, 0)
@@ -127,17 +135,28 @@ def toposort_items(items: Iterable[CrdtSequenceItem]) -> Iterable[CrdtId]:
     }
     data.update({k: set() for k in sources_not_in_data})
 
+    # resolve one tier of items at a time, counting remaining dependencies
+    # instead of rebuilding `data` per tier
+    pending = {item: len(deps) for item, deps in data.items()}
+    dependents = defaultdict(list)
+    for item, deps in data.items():
+        for dep in deps:
+            dependents[dep].append(item)
+
+    next_items = {item for item, count in pending.items() if not count}
     while True:
-        next_items = {item for item, deps in data.items() if not deps}
         if next_items == {"__end"}:
             break
         assert next_items
         yield from sorted(k for k in next_items if k in item_dict)
-        data = {
-            item: (deps - next_items)
-            for item, deps in data.items()
-            if item not in next_items
-        }
-
-    if data != {"__end": set()}:
+        ready = set()
+        for item in next_items:
+            del pending[item]
+            for dependent in dependents[item]:
+                pending[dependent] -= 1
+                if not pending[dependent]:
+                    ready.add(dependent)
+        next_items = ready
+
+    if pending != {"__end": 0}:
         raise ValueError("cyclic dependency")
\ No newline at end of file
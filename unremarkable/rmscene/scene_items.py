@@ -7,6 +7,7 @@ import typing as tp
 
 from .tagged_block_common import CrdtId, LwwValue
 from .crdt_sequence import CrdtSequence
+from .text_pieces import TextPieces
 
 
 
@@ -122,6 +123,13 @@ class Point:
 
 @dataclass
 class Line(SceneItem):
+    """Stroke.
+
+    `points` is a list of `Point` when read; to write, it can also be a numpy
+    structured or (N, 6) array with x, y, speed, direction, width, pressure columns.
+
+    """
+
     color: PenColor
     tool: Pen
     points: list[Point]
@@ -166,6 +174,9 @@ class Text(SceneItem):
 
     `pos_x`, `pos_y` and `width` are dimensions for the text block.
 
+    `pieces` is the piece table of `items`, built when the block is read: plain
+    text, paragraphs and char id -> offset lookups without expanding characters.
+
     """
 
     items: CrdtSequence[Union[str,int]]
@@ -173,6 +184,17 @@ class Text(SceneItem):
     pos_x: float
     pos_y: float
     width: float
+    pieces: tp.Optional[TextPieces] = field(default=None, compare=False, repr=False)
+
+    def piece_table(self) -> TextPieces:
+        """Piece table of `items`, built on first use if not read from a stream."""
+        if self.pieces is None:
+            self.pieces = TextPieces.from_items(self.items)
+        return self.pieces
+
+    def paragraphs(self) -> list[tuple[str, tp.Optional[ParagraphStyle]]]:
+        """(text, style) per line of text."""
+        return self.piece_table().paragraphs(self.styles)
 
 
 ## Glyph range
@@ -20,6 +20,7 @@ from .tagged_block_common import CrdtId, LwwValue
 from .tagged_block_reader import TaggedBlockReader, MainBlockInfo
 from .tagged_block_writer import TaggedBlockWriter
 from .crdt_sequence import CrdtSequence, CrdtSequenceItem
+from .text_pieces import TextPieces
 from .scene_tree import SceneTree
 from . import scene_items as si
 
@@ -385,6 +386,62 @@ def point_to_stream(point: si.Point, writer: TaggedBlockWriter, version: int = 2
         d.write_uint8(point.pressure)
 
 
+# packed little endian point records, one row per point as point_to_stream writes
+POINT_FIELDS = ("x", "y", "speed", "direction", "width", "pressure")
+_POINT_DTYPES = {
+    1: [("x", "<f4"), ("y", "<f4"), ("speed", "<f4"), ("direction", "<f4"),
+        ("width", "<f4"), ("pressure", "<f4")],
+    2: [("x", "<f4"), ("y", "<f4"), ("speed", "<u2"), ("width", "<u2"),
+        ("direction", "u1"), ("pressure", "u1")],
+}
+
+
+def point_dtype(version: int = 2):
+    """numpy structured dtype of one serialized point, itemsize point_serialized_size()"""
+    import numpy as np
+    if version not in _POINT_DTYPES:
+        raise ValueError(f"Unknown version {version}")
+    return np.dtype(_POINT_DTYPES[version])
+
+
+def points_to_bytes(points, version: int = 2) -> bytes:
+    """Serialize all points of a line with a single `ndarray.tobytes()`.
+
+    `points` is a list of `si.Point`, a structured array with `POINT_FIELDS`
+    fields, or an (N, 6) array with columns in `POINT_FIELDS` order. Bytes are
+    the same as `point_to_stream` per point; v2 integer fields are rounded and
+    must fit uint16 (speed, width) or uint8 (direction, pressure).
+
+    """
+    # numpy is only needed to write, reading .rm files does not import it
+    import numpy as np
+    dtype = point_dtype(version)
+    if isinstance(points, np.ndarray) and points.dtype.names:
+        columns = {name: points[name] for name in POINT_FIELDS}
+    else:
+        if not isinstance(points, np.ndarray):
+            points = [(p.x, p.y, p.speed, p.direction, p.width, p.pressure) for p in points]
+        points = np.asarray(points, dtype=np.float64).reshape(-1, len(POINT_FIELDS))
+        columns = dict(zip(POINT_FIELDS, points.T))
+
+    out = np.empty(len(columns["x"]), dtype=dtype)
+    out["x"] = columns["x"]
+    out["y"] = columns["y"]
+    if version == 1:
+        # calculation based on ddvk's reader
+        out["speed"] = np.asarray(columns["speed"], dtype=np.float64) / 4
+        out["direction"] = np.asarray(columns["direction"], dtype=np.float64) * (2 * math.pi) / 255
+        out["width"] = np.asarray(columns["width"], dtype=np.float64) / 4
+        out["pressure"] = np.asarray(columns["pressure"], dtype=np.float64) / 255
+    else:
+        for name in ("speed", "width", "direction", "pressure"):
+            values = np.rint(np.asarray(columns[name], dtype=np.float64))
+            if len(values) and (values.min() < 0 or values.max() > np.iinfo(dtype[name]).max):
+                raise ValueError(f"Point {name} out of range for {dtype[name]}")
+            out[name] = values
+    return out.tobytes()
+
+
 def line_from_stream(stream: TaggedBlockReader, version: int = 2) -> si.Line:
     _logger.debug("Reading Line version %d", version)
     tool_id = stream.read_int(1)
@@ -416,8 +473,7 @@ def line_to_stream(line: si.Line, writer: TaggedBlockWriter, version: int = 2):
     writer.write_double(3, line.thickness_scale)
     writer.write_float(4, line.starting_length)
     with writer.write_subblock(5):
-        for point in line.points:
-            point_to_stream(point, writer, version)
+        writer.data.write_bytes(points_to_bytes(line.points, version))
 
     # XXX didn't save
     timestamp = CrdtId(0, 1)
@@ -454,13 +510,9 @@ class SceneItemBlock(Block):
                 f"unknown scene type {block_type} in {stream.current_block}"
             )
 
-        parent_id = stream.read_id(1)
-        item_id = stream.read_id(2)
-        left_id = stream.read_id(3)
-        right_id = stream.read_id(4)
-        deleted_length = stream.read_int(5)
+        header = stream.data.read_item_header()
 
-        if stream.has_subblock(6):
+        if header.has_value:
             with stream.read_subblock(6) as block_info:
                 item_type = stream.data.read_uint8()
                 assert item_type == subclass.ITEM_TYPE
@@ -472,8 +524,9 @@ class SceneItemBlock(Block):
             extra_data = b""
 
         return subclass(
-                parent_id=parent_id,
-                item=CrdtSequenceItem(item_id, left_id, right_id, deleted_length, value),
+                parent_id=header.parent_id,
+                item=CrdtSequenceItem(header.item_id, header.left_id, header.right_id,
+                                      header.deleted_length, value),
                 extra_data=extra_data,
             )
 
@@ -745,12 +798,14 @@ class RootTextBlock(Block):
         # "width" from ddvk
         width = stream.read_float(4)
 
+        items = CrdtSequence(text_items)
         value = si.Text(
-            items=CrdtSequence(text_items),
+            items=items,
             styles=text_formats,
             pos_x=pos_x,
             pos_y=pos_y,
             width=width,
+            pieces=TextPieces.from_items(items),
         )
         return RootTextBlock(block_id=block_id, value=value, extra_data=b'')
 
@@ -21,6 +21,7 @@ class SceneTree:
         self.root = si.Group(ROOT_ID)
         self._node_ids = {self.root.node_id: self.root}
         self.root_text: tp.Optional[si.Text] = None
+        self._leaves: tp.Optional[list[tuple[si.SceneItem, tuple[si.Group, ...]]]] = None
 
     def __contains__(self, node_id: CrdtId):
         return node_id in self._node_ids
@@ -33,6 +34,7 @@ class SceneTree:
             raise ValueError(f"Node {node_id} already in tree")
         node = si.Group(node_id)
         self._node_ids[node_id] = node
+        self._leaves = None
         # parent = self._node_ids[parent_id]
         # parent.children.add(item)
 
@@ -41,15 +43,56 @@ class SceneTree:
             raise ValueError(f"Parent id not known: {parent_id}")
         parent = self._node_ids[parent_id]
         parent.children.add(item)
-
-    def walk(self) -> tp.Iterator[si.SceneItem]:
-        """Iterate through all leaf items (not groups)."""
-        yield from _walk_items(self.root)
-
-
-def _walk_items(item):
-    if isinstance(item, si.Group):
-        for child in item.children.values():
-            yield from _walk_items(child)
-    else:
-        yield item
+        self._leaves = None
+
+    def walk(
+        self,
+        item_type: tp.Union[type, tuple[type, ...], None] = None,
+        groups: tp.Union[CrdtId, str, tp.Iterable[tp.Union[CrdtId, str]], None] = None,
+    ) -> tp.Iterator[si.SceneItem]:
+        """Iterate through all leaf items (not groups), depth first.
+
+        :param item_type: only leaves of this type, e.g. `si.Line` or
+            `(si.Line, si.GlyphRange)`; deleted items (None) are skipped.
+        :param groups: only leaves inside these layers or groups, given by
+            node id or label, e.g. `"Layer 1"`.
+
+        """
+        if groups is not None:
+            if isinstance(groups, (CrdtId, str)):
+                groups = [groups]
+            groups = set(groups)
+        for item, parents in self.leaves():
+            if item_type is not None and not isinstance(item, item_type):
+                continue
+            if groups is not None and not any(
+                g.node_id in groups or g.label.value in groups for g in parents
+            ):
+                continue
+            yield item
+
+    def leaves(self) -> list[tuple[si.SceneItem, tuple[si.Group, ...]]]:
+        """Flattened (leaf, parent groups from root) list, depth first.
+
+        Cached until the next `add_node` or `add_item`.
+
+        """
+        if self._leaves is None:
+            self._leaves = _flatten(self.root)
+        return self._leaves
+
+
+def _flatten(root: si.Group) -> list[tuple[si.SceneItem, tuple[si.Group, ...]]]:
+    """Depth first leaves of `root` with an explicit stack, no recursion."""
+    leaves = []
+    stack = [(iter(root.children.values()), (root,))]
+    while stack:
+        children, parents = stack[-1]
+        for child in children:
+            if isinstance(child, si.Group):
+                stack.append((iter(child.children.values()), parents + (child,)))
+                break
+            leaves.append((child, parents))
+        else:
+            stack.pop()
+    return leaves
@@ -28,16 +28,63 @@ class UnexpectedBlockError(Exception):
     """Unexpected tag or index in block stream."""
 
 
-@dataclass(eq=True, order=True, frozen=True)
-class CrdtId:
-    "An identifier or timestamp."
-    part1: int
-    part2: int
+_PART2_BITS = 56
+_PART2_MASK = (1 << _PART2_BITS) - 1
+_INTERN_MAX = 1 << 20
+
+
+class CrdtId(int):
+    """An identifier or timestamp.
+
+    Packed as `(part1 << 56) | part2`: hashes, compares and orders as a plain
+    int, in the same order as (part1, part2). Equal ids are interned, reading
+    a file creates one object per distinct id. Always truthy, like the former
+    dataclass, so `CrdtId(0, 0)` is not mistaken for a missing id.
+
+    """
+
+    __slots__ = ()
+    _interned: tp.ClassVar[dict] = {}
+
+    def __new__(cls, part1: int, part2: int):
+        if not 0 <= part2 <= _PART2_MASK or not 0 <= part1 < 256:
+            raise ValueError(f"CrdtId out of range: ({part1}, {part2})")
+        key = (part1 << _PART2_BITS) | part2
+        value = cls._interned.get(key)
+        if value is None:
+            if len(cls._interned) >= _INTERN_MAX:
+                cls._interned.clear()
+            value = cls._interned[key] = int.__new__(cls, key)
+        return value
+
+    @property
+    def part1(self) -> int:
+        return int(self) >> _PART2_BITS
+
+    @property
+    def part2(self) -> int:
+        return int(self) & _PART2_MASK
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __reduce__(self):
+        return (CrdtId, (self.part1, self.part2))
 
     def __repr__(self) -> str:
         return f"CrdtId({self.part1}, {self.part2})"
 
 
+class ItemHeader(tp.NamedTuple):
+    "Tagged fields 1-5 of a scene item block, and whether a value follows."
+    parent_id: CrdtId
+    item_id: CrdtId
+    left_id: CrdtId
+    right_id: CrdtId
+    deleted_length: int
+    has_value: bool
+
+
 class DataStream:
     """Read basic values from a remarkable v6 file stream."""
 
@@ -195,6 +242,21 @@ class DataStream:
         # result = (part1 << 48) | part2
         return CrdtId(part1, part2)
 
+    def read_item_header(self) -> ItemHeader:
+        """Read the CRDT sequence item header of a scene item block.
+
+        Reads parent, item, left and right ids and deleted length. The value
+        subblock (tag 6) is checked for but not read, deleted items have none.
+
+        """
+        ids = []
+        for index in range(1, 5):
+            self.read_tag(index, TagType.ID)
+            ids.append(self.read_crdt_id())
+        self.read_tag(5, TagType.Byte4)
+        deleted_length = self.read_uint32()
+        return ItemHeader(*ids, deleted_length, self.check_tag(6, TagType.Length4))
+
     def write_bool(self, value: bool):
         """Write a bool to the data stream."""
         self._write_struct("?", value)
@@ -225,7 +287,7 @@ class DataStream:
             raise ValueError("value is negative")
         b = bytearray()
         while True:
-            to_write = value & 0x7F@dataclass(eq=True, order=True, frozen=True)
+            to_write = value & 0x7F
             value >>= 7
             if value:
                 b.append(to_write | 0x80)
@@ -234,15 +296,15 @@ class DataStream:
                 break
         self.data.write(b)
 
-def write_crdt_id(self, value: CrdtId):
-    """Write a `CrdtId` to the data stream."""
-    # Based on ddvk's reader.go
-    # TODO: should be var unit?
-    if value.part1 >= 2**8 or value.part2 >= 2**64:
-        raise ValueError(f"CrdtId too large: {value}")
-    self.write_uint8(value.part1)
-    self.write_varuint(value.part2)
-    # result = (part1 << 48) | part2
+    def write_crdt_id(self, value: CrdtId):
+        """Write a `CrdtId` to the data stream."""
+        # Based on ddvk's reader.go
+        # TODO: should be var unit?
+        if value.part1 >= 2**8 or value.part2 >= 2**64:
+            raise ValueError(f"CrdtId too large: {value}")
+        self.write_uint8(value.part1)
+        self.write_varuint(value.part2)
+        # result = (part1 << 48) | part2
 
 
 
@@ -0,0 +1,200 @@
+"""Piece table over the CRDT text items of a `Text` block.
+
+Each CRDT text item holds a whole string whose characters have implicit
+sequential ids `CrdtId(part1, part2 + i)`. Instead of expanding every
+character, `TextPieces` keeps one piece per item, in document order, with its
+id range and its offset in the plain text:
+
+    text      "hello\\nworld"       formatting codes and deleted items dropped
+    offset()  CrdtId -> offset      bisect over the id ranges of the author
+    char_id() offset -> CrdtId      bisect over piece offsets
+
+Items are ordered once with `toposort_items`, per piece not per character.
+
+@xvdp
+"""
+
+import typing as tp
+from bisect import bisect_right, insort
+from dataclasses import dataclass
+
+from .tagged_block_common import CrdtId
+from .crdt_sequence import CrdtSequence, CrdtSequenceItem, toposort_items
+
+END_MARKER = CrdtId(0, 0)
+
+
+@dataclass(frozen=True)
+class Piece:
+    """Run of consecutive character ids.
+
+    `value` is the item string, or an integer formatting code. Deleted items
+    keep their id range with an empty `value` and no text.
+
+    """
+
+    part1: int
+    first: int
+    id_length: int
+    offset: int
+    value: tp.Union[str, int]
+
+    @property
+    def length(self) -> int:
+        """Number of characters in the plain text."""
+        return len(self.value) if isinstance(self.value, str) else 0
+
+
+class TextPieces:
+    """Plain text and id <-> offset mapping of a `CrdtSequence` of strings.
+
+    Built by `RootTextBlock.from_stream`, see `si.Text.piece_table()`.
+
+    """
+
+    def __init__(self, pieces: tp.Sequence[Piece]):
+        self.pieces = list(pieces)
+        self.text = "".join(p.value for p in self.pieces if p.length)
+
+        # per author: piece indices sorted by first id, for offset()
+        self._authors: dict[int, tuple[list[int], list[int]]] = {}
+        for i in sorted(range(len(self.pieces)),
+                        key=lambda i: (self.pieces[i].part1, self.pieces[i].first)):
+            firsts, indices = self._authors.setdefault(self.pieces[i].part1, ([], []))
+            firsts.append(self.pieces[i].first)
+            indices.append(i)
+
+        # pieces with text, by offset, for char_id()
+        self._texts = [i for i, p in enumerate(self.pieces) if p.length]
+        self._offsets = [self.pieces[i].offset for i in self._texts]
+
+    @classmethod
+    def from_items(cls, items: CrdtSequence[tp.Union[str, int]]) -> "TextPieces":
+        """Pieces in document order from CRDT text items.
+
+        Left and right ids may point inside another item: items are split at
+        referenced characters, then ordered, one toposort node per piece.
+
+        """
+        runs = {}  # {first id: [id_length, left_id, right_id, value]}
+        firsts: dict[int, list[int]] = {}
+        for item in items.sequence_items():
+            value = item.value
+            if isinstance(value, str) and value:
+                id_length = len(value)
+            elif isinstance(value, int):
+                id_length = 1
+            else:
+                id_length = max(item.deleted_length, 1)
+            runs[item.item_id] = [id_length, item.left_id, item.right_id, value]
+            firsts.setdefault(item.item_id.part1, []).append(item.item_id.part2)
+        for author in firsts.values():
+            author.sort()
+
+        def _find(char_id: CrdtId) -> tp.Optional[CrdtId]:
+            author = firsts.get(char_id.part1)
+            if author:
+                i = bisect_right(author, char_id.part2) - 1
+                if i >= 0:
+                    first = CrdtId(char_id.part1, author[i])
+                    if char_id.part2 < first.part2 + runs[first][0]:
+                        return first
+            return None
+
+        def _split(first: CrdtId, k: int) -> None:
+            """run [first, first + k) [first + k, ...), as expanded characters would link"""
+            id_length, left_id, right_id, value = runs[first]
+            second = CrdtId(first.part1, first.part2 + k)
+            value = value if isinstance(value, str) else ""
+            runs[first] = [k, left_id, second, value[:k]]
+            runs[second] = [id_length - k, CrdtId(first.part1, second.part2 - 1), right_id,
+                            value[k:]]
+            insort(firsts[first.part1], second.part2)
+
+        for _, left_id, right_id, _ in list(runs.values()):
+            first = _find(left_id)
+            if first is not None and left_id.part2 < first.part2 + runs[first][0] - 1:
+                _split(first, left_id.part2 - first.part2 + 1)
+            first = _find(right_id)
+            if first is not None and right_id != first:
+                _split(first, right_id.part2 - first.part2)
+
+        nodes = []
+        for first, (_, left_id, right_id, _) in runs.items():
+            left_id = _find(left_id) or left_id
+            nodes.append(CrdtSequenceItem(first, left_id, right_id, 0, None))
+
+        pieces = []
+        offset = 0
+        for first in toposort_items(nodes):
+            id_length, _, _, value = runs[first]
+            piece = Piece(first.part1, first.part2, id_length, offset, value)
+            pieces.append(piece)
+            offset += piece.length
+        return cls(pieces)
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def _piece(self, char_id: CrdtId) -> Piece:
+        """Piece whose id range holds `char_id`."""
+        if char_id.part1 in self._authors:
+            firsts, indices = self._authors[char_id.part1]
+            i = bisect_right(firsts, char_id.part2) - 1
+            if i >= 0:
+                piece = self.pieces[indices[i]]
+                if char_id.part2 < piece.first + piece.id_length:
+                    return piece
+        raise KeyError(char_id)
+
+    def offset(self, char_id: CrdtId) -> int:
+        """Offset of character `char_id` in `text`.
+
+        Formatting codes and deleted characters map to the offset of the next
+        character. `END_MARKER` is offset 0. Raises KeyError for unknown ids.
+
+        """
+        if char_id == END_MARKER:
+            return 0
+        piece = self._piece(char_id)
+        if not piece.length:
+            return piece.offset
+        return piece.offset + char_id.part2 - piece.first
+
+    def char_id(self, offset: int) -> CrdtId:
+        """Id of the character at `offset` in `text`."""
+        if not 0 <= offset < len(self.text):
+            raise IndexError(offset)
+        piece = self.pieces[self._texts[bisect_right(self._offsets, offset) - 1]]
+        return CrdtId(piece.part1, piece.first + offset - piece.offset)
+
+    def formats(self) -> list[tuple[int, int]]:
+        """(offset, formatting code) of integer items."""
+        return [(p.offset, p.value) for p in self.pieces if isinstance(p.value, int)]
+
+    def paragraphs(self, styles: tp.Optional[dict] = None) -> list[tuple[str, tp.Any]]:
+        """(text, style) per line of text, newline dropped.
+
+        `styles` maps the id of the newline before a paragraph, `END_MARKER`
+        for the first, to a `LwwValue[ParagraphStyle]`, as `si.Text.styles`.
+        Unstyled paragraphs, or styles on unknown ids, give None.
+
+        """
+        starts = {}
+        for char_id, value in (styles or {}).items():
+            try:
+                offset = self.offset(char_id)
+            except KeyError:
+                continue
+            if char_id != END_MARKER and self.text[offset:offset + 1] == "\n":
+                offset += 1
+            starts[offset] = value.value
+        out = []
+        offset = 0
+        for line in self.text.split("\n"):
+            out.append((line, starts.get(offset)))
+            offset += len(line) + 1
+        return out
@@ -0,0 +1,177 @@
+"""@xvdp
+what changed on a .rm page between two versions
+
+block_index() scans block headers and scene item ids, payloads are hashed, never decoded
+decode_block() parses one indexed block
+diff_rm() decodes only the blocks whose hash differs, time grows with the number of items
+
+    changes = diff_rm('last_week/page.rm', 'xochitl/<uuid>/<page>.rm')
+    changes['added']        [{'id', 'parent_id', 'kind', 'item', 'deleted_length'}]
+    changes['deleted']      items erased since, 'item' is the old value
+    changes['modified']     same id, new payload, 'old' is the old value
+    changes['text']         {'added': [(CrdtId, str)], 'deleted': [(CrdtId, str)]} typed text runs
+
+kind: 'line' | 'glyph' | 'group' | 'text_item'
+"""
+from typing import Union, BinaryIO, Tuple
+from collections import namedtuple
+from bisect import bisect_right
+import io
+import os.path as osp
+import hashlib
+
+from .rmscene import (SceneLineItemBlock, SceneGlyphItemBlock, SceneGroupItemBlock,
+                      SceneTextItemBlock, RootTextBlock, read_blocks)
+from .rmscene.tagged_block_common import DataStream, CrdtId, HEADER_V6
+
+KINDS = {SceneLineItemBlock.BLOCK_TYPE: 'line',
+         SceneGlyphItemBlock.BLOCK_TYPE: 'glyph',
+         SceneGroupItemBlock.BLOCK_TYPE: 'group',
+         SceneTextItemBlock.BLOCK_TYPE: 'text_item'}
+TEXT = 'root_text'
+
+# one indexed block: payload digest, [start, end) of header and payload in the file bytes
+BlockEntry = namedtuple('BlockEntry',
+                        'block_type digest start end parent_id deleted_length visible')
+
+
+def _read(data: Union[str, bytes, BinaryIO]) -> bytes:
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, str) and osp.isfile(data):
+        with open(data, 'rb') as _fi:
+            return _fi.read()
+    return data.read()
+
+
+def block_index(data: Union[str, bytes, BinaryIO]) -> Tuple[dict, bytes]:
+    """ ({key: BlockEntry}, file bytes) of scene items, by item CrdtId, and root text, by TEXT
+    Args
+        data    (str, bytes, BinaryIO) .rm v6 file
+    returns (index, file bytes), entries slice their block from the bytes, see decode_block()
+    """
+    data = _read(data)
+    stream = DataStream(io.BytesIO(data))
+    stream.read_header()
+    index = {}
+    offset = stream.tell()
+    while offset + 8 <= len(data):
+        stream.data.seek(offset)
+        length = stream.read_uint32()
+        stream.read_bytes(3)    # unknown, min_version, current_version
+        block_type = stream.read_uint8()
+        end = offset + 8 + length
+        digest = hashlib.blake2b(data[offset + 4:end], digest_size=16).digest()
+        if block_type in KINDS:
+            header = stream.read_item_header()
+            index[header.item_id] = BlockEntry(block_type, digest, offset, end,
+                                               header.parent_id, header.deleted_length,
+                                               header.has_value)
+        elif block_type == RootTextBlock.BLOCK_TYPE:
+            index[TEXT] = BlockEntry(block_type, digest, offset, end, None, 0, True)
+        offset = end
+    return index, data
+
+
+def decode_block(data: bytes, entry: BlockEntry):
+    """ single block from its bytes, entry of block_index(data) """
+    return next(read_blocks(io.BytesIO(HEADER_V6 + data[entry.start:entry.end])))
+
+
+def _change(data: bytes, key: CrdtId, entry: BlockEntry) -> dict:
+    block = decode_block(data, entry)
+    return {'id': key, 'parent_id': entry.parent_id, 'kind': KINDS[entry.block_type],
+            'item': block.item.value, 'deleted_length': entry.deleted_length}
+
+
+def diff_rm(old: Union[str, bytes, BinaryIO], new: Union[str, bytes, BinaryIO]) -> dict:
+    """ added, deleted and modified scene items and typed text runs, old -> new
+    Args
+        old, new    (str, bytes, BinaryIO) two versions of the same .rm page
+    returns {'added': [], 'deleted': [], 'modified': [], 'text': {'added': [], 'deleted': []}}
+    """
+    old_index, old_data = block_index(old)
+    new_index, new_data = block_index(new)
+    out = {'added': [], 'deleted': [], 'modified': [], 'text': {'added': [], 'deleted': []}}
+    for key, entry in new_index.items():
+        if key == TEXT:
+            continue
+        before = old_index.get(key)
+        if before is not None and before.digest == entry.digest:
+            continue
+        if before is None or not before.visible:
+            if entry.visible:
+                out['added'].append(_change(new_data, key, entry))
+        elif not entry.visible:
+            change = _change(old_data, key, before)
+            change['deleted_length'] = entry.deleted_length
+            out['deleted'].append(change)
+        else:
+            change = _change(new_data, key, entry)
+            change['old'] = decode_block(old_data, before).item.value
+            out['modified'].append(change)
+    for key, before in old_index.items():
+        if key not in new_index and key != TEXT and before.visible:
+            out['deleted'].append(_change(old_data, key, before))
+
+    before, entry = old_index.get(TEXT), new_index.get(TEXT)
+    if entry is not None and (before is None or before.digest != entry.digest):
+        new_pieces = decode_block(new_data, entry).value.piece_table()
+        old_pieces = None if before is None else decode_block(old_data, before).value.piece_table()
+        out['text']['added'] = _text_runs(new_pieces, old_pieces)
+        out['text']['deleted'] = _text_runs(old_pieces, new_pieces)
+    elif before is not None and entry is None:
+        out['text']['deleted'] = _text_runs(decode_block(old_data, before).value.piece_table())
+    return out
+
+
+def _text_runs(pieces, other=None) -> list:
+    """ [(CrdtId, text)] characters of pieces whose ids are not visible in other """
+    if pieces is None:
+        return []
+    spans = {}
+    if other is not None:
+        for piece in other.pieces:
+            if piece.length:
+                spans.setdefault(piece.part1, []).append((piece.first,
+                                                          piece.first + piece.length))
+        for author in spans.values():
+            author.sort()
+    out = []
+    for piece in pieces.pieces:
+        if not piece.length:
+            continue
+        start, stop = piece.first, piece.first + piece.length
+        author = spans.get(piece.part1, [])
+        i = max(bisect_right(author, (start, float('inf'))) - 1, 0)
+        while i < len(author) and author[i][0] < stop:
+            first, end = author[i]
+            if end > start:
+                if first > start:
+                    out.append(_run(piece, start, first))
+                start = max(start, end)
+            i += 1
+        if start < stop:
+            out.append(_run(piece, start, stop))
+    return out
+
+
+def _run(piece, start: int, stop: int) -> tuple:
+    return (CrdtId(piece.part1, start),
+            piece.value[start - piece.first:stop - piece.first])
+
+
+def diff_summary(changes: dict) -> str:
+    """ one line count per change kind, e.g. '+3 line -1 glyph ~1 line, +12 -4 typed chars' """
+    parts = []
+    for sign, name in (('+', 'added'), ('-', 'deleted'), ('~', 'modified')):
+        kinds = {}
+        for change in changes[name]:
+            kinds[change['kind']] = kinds.get(change['kind'], 0) + 1
+        parts += [f"{sign}{n} {kind}" for kind, n in sorted(kinds.items())]
+    summary = ' '.join(parts) or 'no item changes'
+    added = sum(len(text) for _, text in changes['text']['added'])
+    deleted = sum(len(text) for _, text in changes['text']['deleted'])
+    if added or deleted:
+        summary += f", +{added} -{deleted} typed chars"
+    return summary
@@ -0,0 +1,227 @@
+"""@xvdp
+typed text and highlight search over a reMarkable backup
+
+sqlite fts5 table in ~/.cache/unremarkable/search/, one row per typed text block or highlight
+    update_index(xochitl)       reparses only .rm files whose mtime or size changed
+    search('adversarial')       -> [{'uuid', 'name', 'page', 'kind', 'text', 'snippet'}, ...]
+
+console:
+    $ remarkable_grep <query> [-k highlight|typed] [-n limit]
+
+queries are fts5: words, "exact phrase", prefix*, AND OR NOT, NEAR(a b)
+query path imports sqlite3 and the stdlib only .unremarkable and .profiling modules,
+.rm parsing (rmscene, annotations) is imported only when files changed
+"""
+from typing import Optional, Iterator
+from contextlib import contextmanager
+import os
+import os.path as osp
+import json
+import hashlib
+import sqlite3
+from .unremarkable import get_cache_dir, _get_xochitl, _is_uuid
+from .profiling import span, count
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, uuid TEXT, mtime_ns INTEGER, size INTEGER);
+CREATE TABLE IF NOT EXISTS docs (uuid TEXT PRIMARY KEY, name TEXT, stamp TEXT);
+CREATE VIRTUAL TABLE IF NOT EXISTS notes USING fts5(
+    text, uuid UNINDEXED, page UNINDEXED, kind UNINDEXED, path UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2');
+"""
+KINDS = ('typed', 'highlight')
+
+
+def index_path(xochitl: str) -> str:
+    """ one database per backup folder """
+    name = hashlib.sha1(osp.abspath(xochitl).encode('utf8')).hexdigest()[:16]
+    return get_cache_dir('search', f"{name}.sqlite")
+
+
+@contextmanager
+def _connect(xochitl: str, db: Optional[str] = None) -> Iterator[sqlite3.Connection]:
+    """ one transaction, committed on exit, rolled back on error """
+    db = db or index_path(xochitl)
+    os.makedirs(osp.dirname(osp.abspath(db)), exist_ok=True)
+    conn = sqlite3.connect(db)
+    try:
+        conn.executescript(_SCHEMA)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _resolve_xochitl(xochitl: Optional[str]) -> str:
+    if xochitl is None:
+        xochitl = _get_xochitl()
+    assert xochitl is not None and osp.isdir(xochitl), \
+        f"xochitl backup folder not found {xochitl}, run remarkable_backup or pass folder"
+    return xochitl
+
+
+##
+# index
+#
+def update_index(xochitl: Optional[str] = None,
+                 db: Optional[str] = None,
+                 verbose: bool = False) -> dict:
+    """ bring the index in line with the backup: new or modified .rm files are parsed,
+    deleted ones removed, documents whose .content or .metadata changed are reparsed
+    Args
+        xochitl (str [None]) backup folder, None: ~/.xochitl
+        db      (str [None]) sqlite file, None: index_path(xochitl)
+    returns {'parsed': int, 'removed': int, 'unchanged': int, 'failed': int}
+        files that fail to parse are not recorded, the next update retries them
+    """
+    xochitl = _resolve_xochitl(xochitl)
+    with span('search.update', xochitl=xochitl), _connect(xochitl, db) as conn:
+        docs, files = _scan(xochitl)
+        known_docs = dict(conn.execute("SELECT uuid, stamp FROM docs"))
+        known_files = {row[0]: row[1:] for row in
+                       conn.execute("SELECT path, uuid, mtime_ns, size FROM files")}
+
+        changed_docs = {uid for uid, (stamp, _) in docs.items() if known_docs.get(uid) != stamp}
+        stale = [path for path in known_files if path not in files]
+        todo = [path for path, value in files.items()
+                if value[0] in changed_docs or known_files.get(path) != value]
+
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS _stale (path TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM _stale")
+        conn.executemany("INSERT INTO _stale VALUES (?)", [(p,) for p in stale + todo])
+        conn.execute("DELETE FROM notes WHERE path IN (SELECT path FROM _stale)")
+        conn.execute("DELETE FROM files WHERE path IN (SELECT path FROM _stale)")
+        conn.executemany("DELETE FROM docs WHERE uuid = ?",
+                         [(uid,) for uid in known_docs if uid not in docs])
+
+        failed = set()
+        if todo:
+            rows, failed = _parse_files(todo, files, docs, verbose)
+            conn.executemany("INSERT INTO notes (text, uuid, page, kind, path) VALUES (?,?,?,?,?)",
+                             rows)
+            conn.executemany("INSERT INTO files VALUES (?,?,?,?)",
+                             [(p, *files[p]) for p in todo if p not in failed])
+        conn.executemany("INSERT OR REPLACE INTO docs VALUES (?,?,?)",
+                         [(uid, _visible_name(docs[uid][1]), docs[uid][0])
+                          for uid in changed_docs])
+    count('search.parsed', len(todo) - len(failed))
+    count('search.failed', len(failed))
+    out = {'parsed': len(todo) - len(failed), 'removed': len(stale),
+           'unchanged': len(files) - len(todo), 'failed': len(failed)}
+    if verbose:
+        print(f"search index {out}")
+    return out
+
+
+def _scan(xochitl: str) -> tuple:
+    """ stat only pass over backup
+    returns docs {uuid: (stamp, metadata)}, files {rm: (uuid, mtime_ns, size)}
+    """
+    docs, files = {}, {}
+    for entry in os.scandir(xochitl):
+        uid, ext = osp.splitext(entry.name)
+        if ext != '.content' or not _is_uuid(uid):
+            continue
+        metadata = osp.join(xochitl, f"{uid}.metadata")
+        if not osp.isfile(metadata):
+            continue
+        stats = (entry.stat().st_mtime_ns, os.stat(metadata).st_mtime_ns)
+        docs[uid] = (f"{stats[0]}:{stats[1]}", metadata)
+        folder = osp.join(xochitl, uid)
+        if osp.isdir(folder):
+            for rm in os.scandir(folder):
+                if rm.name.endswith('.rm'):
+                    stat = rm.stat()
+                    files[rm.path] = (uid, stat.st_mtime_ns, stat.st_size)
+    return docs, files
+
+
+def _visible_name(metadata: str) -> str:
+    with open(metadata, 'r', encoding='utf8') as _fi:
+        return json.load(_fi).get('visibleName', '')
+
+
+def _parse_files(paths: list, files: dict, docs: dict, verbose: bool = False) -> tuple:
+    """ rows [(text, uuid, page, kind, path)], failed {paths that raised} """
+    from .annotations import read_content
+    from .rmscene import read_blocks
+    pages = {}
+    for uid in {files[p][0] for p in paths}:
+        content = read_content(docs[uid][1].replace('.metadata', '.content'))
+        pages.update({page['rm']: page['number'] for page in content['pages']})
+    rows, failed = [], set()
+    for path in paths:
+        uid = files[path][0]
+        try:
+            with span('search.read_blocks', rm=osp.basename(path)):
+                items = page_text(read_blocks(path))
+        except Exception as e: # pylint: disable=broad-except
+            if verbose:
+                print(f"  cannot index {path}: {type(e).__name__} {e}")
+            failed.add(path)
+            continue
+        rows += [(text, uid, pages.get(path), kind, path) for kind, text in items]
+    return rows, failed
+
+
+def page_text(blocks) -> list:
+    """ [(kind, text)] from .rm blocks
+        'typed'     RootTextBlock text, formatting codes dropped
+        'highlight' SceneGlyphItemBlock GlyphRange.text, one per highlight
+    """
+    from .rmscene import RootTextBlock, SceneGlyphItemBlock
+    out = []
+    for block in blocks:
+        if isinstance(block, RootTextBlock):
+            text = block.value.piece_table().text
+            if text.strip():
+                out.append(('typed', text))
+        elif isinstance(block, SceneGlyphItemBlock) and block.item.value is not None:
+            if block.item.value.text.strip():
+                out.append(('highlight', block.item.value.text))
+    return out
+
+
+##
+# query
+#
+def search(query: str,
+           xochitl: Optional[str] = None,
+           kind: Optional[str] = None,
+           limit: int = 50,
+           update: bool = True,
+           marks: tuple = ('[', ']'),
+           db: Optional[str] = None) -> list:
+    """ full text search of typed text and highlights, best matches first
+    Args
+        query   (str) fts5 query, if invalid fts5 syntax, words are matched as literals
+        xochitl (str [None]) backup folder, None: ~/.xochitl
+        kind    (str [None]) 'typed' | 'highlight', None: both
+        limit   (int [50])
+        update  (bool [True]) update_index() first, only stats files if nothing changed
+        marks   (tuple [('[', ']')]) around matched words in 'snippet'
+    returns [{'uuid', 'name', 'page', 'kind', 'text', 'snippet'}]
+    """
+    assert kind is None or kind in KINDS, f"kind {kind} not in {KINDS}"
+    xochitl = _resolve_xochitl(xochitl)
+    if update:
+        update_index(xochitl, db)
+    sql = """SELECT notes.uuid, docs.name, notes.page, notes.kind, notes.text,
+                    snippet(notes, 0, ?, ?, '...', 12)
+             FROM notes LEFT JOIN docs ON docs.uuid = notes.uuid
+             WHERE notes MATCH ?""" + (" AND notes.kind = ?" if kind else "") + \
+          " ORDER BY rank LIMIT ?"
+    keys = ('uuid', 'name', 'page', 'kind', 'text', 'snippet')
+    with span('search.query', query=query), _connect(xochitl, db) as conn:
+        for fts in (query, _literal_query(query)):
+            args = (*marks, fts, kind, limit) if kind else (*marks, fts, limit)
+            try:
+                return [dict(zip(keys, row)) for row in conn.execute(sql, args)]
+            except sqlite3.OperationalError:
+                continue
+    return []
+
+
+def _literal_query(query: str) -> str:
+    """ every word as quoted phrase: fts5 syntax characters lose meaning """
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in query.split())
@@ -0,0 +1,160 @@
+"""@xvdp
+where strokes are on a page
+
+per stroke bounding boxes, a uniform grid index for rect queries,
+and blank page detection that scans .rm block headers without decoding points
+
+    >>> blocks = read_rm(rm)
+    >>> lines, minmax = read_lines(blocks)
+    >>> index = StrokeIndex.from_lines(lines)
+    >>> index.query((-200, 300, 200, 800))   # x0, y0, x1, y1 in .rm coordinates
+    array([0, 4, 7])
+"""
+from typing import Union, Optional, BinaryIO
+import os.path as osp
+import numpy as np
+
+from .rmscene import SceneLineItemBlock, SceneGlyphItemBlock, Pen
+from .rmscene.tagged_block_common import DataStream, TagType
+
+
+def stroke_bboxes(xs: list, ys: list) -> np.ndarray:
+    """ bounding boxes of strokes (N, 4) [x0, y0, x1, y1] in one reduction
+    Args
+        xs, ys  (list) per stroke sequences of coordinates, none may be empty
+    """
+    if not xs:
+        return np.zeros((0, 4), dtype=np.float32)
+    lengths = np.fromiter((len(x) for x in xs), dtype=np.int64, count=len(xs))
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    x = np.concatenate([np.asarray(x, dtype=np.float32) for x in xs])
+    y = np.concatenate([np.asarray(y, dtype=np.float32) for y in ys])
+    return np.stack((np.minimum.reduceat(x, offsets), np.minimum.reduceat(y, offsets),
+                     np.maximum.reduceat(x, offsets), np.maximum.reduceat(y, offsets)), axis=1)
+
+
+def transform_bboxes(bboxes: np.ndarray,
+                     center_x: float,
+                     scale_x: float,
+                     center_y: float,
+                     scale_y: float,
+                     pdf_height: float) -> np.ndarray:
+    """ .rm bboxes to pdf coordinates, same transform as annotations.shift_lines
+    y is flipped, so y0, y1 swap
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64)
+    x0 = (bboxes[:, 0] + center_x) * scale_x
+    x1 = (bboxes[:, 2] + center_x) * scale_x
+    y0 = pdf_height - (bboxes[:, 3] + center_y) * scale_y
+    y1 = pdf_height - (bboxes[:, 1] + center_y) * scale_y
+    return np.stack((x0, y0, x1, y1), axis=1)
+
+
+def union_bbox(bboxes: np.ndarray) -> Optional[tuple]:
+    """ (x0, y0, x1, y1) enclosing all bboxes or None """
+    if not len(bboxes):
+        return None
+    return (float(bboxes[:, 0].min()), float(bboxes[:, 1].min()),
+            float(bboxes[:, 2].max()), float(bboxes[:, 3].max()))
+
+
+class StrokeIndex:
+    """ uniform grid over stroke bounding boxes
+    Args
+        bboxes  (ndarray (N,4)) x0, y0, x1, y1
+        cell    (float [128.]) grid cell size, in bbox units
+    """
+    def __init__(self, bboxes: np.ndarray, cell: float = 128.):
+        self.bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        self.cell = float(cell)
+        self._grid = {}
+        cells = np.floor(self.bboxes / self.cell).astype(np.int64)
+        for i, (cx0, cy0, cx1, cy1) in enumerate(cells.tolist()):
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self._grid.setdefault((cx, cy), []).append(i)
+
+    @classmethod
+    def from_lines(cls, lines: list, cell: float = 128.) -> 'StrokeIndex':
+        """ from annotations.read_lines() StrokeBatch, or list of line dicts """
+        if hasattr(lines, 'bboxes'):
+            return cls(lines.bboxes, cell)
+        if lines and 'bbox' in lines[0]:
+            return cls(np.array([line['bbox'] for line in lines]), cell)
+        return cls(stroke_bboxes([line['x'] for line in lines],
+                                 [line['y'] for line in lines]), cell)
+
+    def __len__(self) -> int:
+        return len(self.bboxes)
+
+    @property
+    def bounds(self) -> Optional[tuple]:
+        """ (x0, y0, x1, y1) of all strokes or None """
+        return union_bbox(self.bboxes)
+
+    def query(self, rect: Union[tuple, list, np.ndarray]) -> np.ndarray:
+        """ sorted indices of strokes whose bbox intersects rect (x0, y0, x1, y1) """
+        x0, y0, x1, y1 = rect
+        cx0, cy0, cx1, cy1 = np.floor(np.array(rect, dtype=np.float64) / self.cell).astype(int)
+        candidates = set()
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self._grid):
+            for key, ids in self._grid.items():
+                if cx0 <= key[0] <= cx1 and cy0 <= key[1] <= cy1:
+                    candidates.update(ids)
+        else:
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    candidates.update(self._grid.get((cx, cy), ()))
+        if not candidates:
+            return np.zeros(0, dtype=np.int64)
+        ids = np.fromiter(sorted(candidates), dtype=np.int64, count=len(candidates))
+        b = self.bboxes[ids]
+        hit = (b[:, 0] <= x1) & (b[:, 2] >= x0) & (b[:, 1] <= y1) & (b[:, 3] >= y0)
+        return ids[hit]
+
+
+##
+# blank page detection, header scan only
+#
+_ERASERS = (Pen.ERASER,) # as in annotations.draw_annotation
+
+def is_blank(data: Union[str, BinaryIO]) -> bool:
+    """ True if .rm has no visible strokes or highlights
+    reads block headers and the tool id of line items, points are never decoded
+    Args
+        data    (str, BinaryIO) .rm v6 file
+    """
+    if isinstance(data, str) and osp.isfile(data):
+        with open(data, 'rb') as fi:
+            return is_blank(fi)
+
+    stream = DataStream(data)
+    stream.read_header()
+    offset = stream.tell()
+    while True:
+        try:
+            block_length = stream.read_uint32()
+        except EOFError:
+            return True
+        stream.read_uint8()
+        stream.read_uint8() # min_version
+        stream.read_uint8() # current_version
+        block_type = stream.read_uint8()
+        start = offset + 8
+        if block_type in (SceneLineItemBlock.BLOCK_TYPE, SceneGlyphItemBlock.BLOCK_TYPE):
+            if _item_is_visible(stream, block_type):
+                return False
+        offset = start + block_length
+        data.seek(offset)
+
+
+def _item_is_visible(stream: DataStream, block_type: int) -> bool:
+    if not stream.read_item_header().has_value:
+        return False # deleted item, no value
+    if block_type == SceneGlyphItemBlock.BLOCK_TYPE:
+        return True
+    stream.read_tag(6, TagType.Length4)
+    stream.read_uint32()
+    stream.read_uint8() # item type
+    stream.read_tag(1, TagType.Byte4)
+    return stream.read_uint32() not in _ERASERS
@@ -0,0 +1,561 @@
+"""@xvdp
+every stroke of a backup as columnar tables, one partition per document
+
+    export_strokes('~/strokes')             # <folder>/<uuid>.npz and manifest.json
+    tables = load_strokes('~/strokes', uuid)
+    tables['x'][tables['offsets'][i]:tables['offsets'][i + 1]]     # points of stroke i
+
+point table, one row per point
+    x, y (float32), speed, width (uint16), direction, pressure (uint8)  as .rm v2 points
+    stroke_id (int32) row of the stroke table
+stroke table, one row per stroke, ragged: points of stroke i are offsets[i]:offsets[i+1]
+    uuid (str), page (int32), item_id (uint64 packed CrdtId), tool, color (uint8),
+    thickness_scale (float64), bbox (N, 4 float32) x0, y0, x1, y1, offsets (N+1 int64)
+
+points are read from the line block bytes with one np.frombuffer(), no Point objects
+v1 points are converted to v2 units and rounded, deleted strokes are skipped, erasers kept
+
+incremental: manifest.json keeps .content, .metadata stamps and .rm mtime, size per document
+    unchanged documents are skipped, changed ones rewritten, new ones appended,
+    documents removed from the backup are removed from the dataset
+fmt='parquet' needs pyarrow: <folder>/points/<uuid>.parquet, <folder>/strokes/<uuid>.parquet
+
+StrokeBatch holds the same columns for one page, used by annotations and raster:
+transform, bounds, tool filtering and drawing are operations over all points at once
+"""
+from typing import Union, Optional, BinaryIO
+import io
+import os
+import os.path as osp
+import json
+import tempfile
+from collections import OrderedDict
+import numpy as np
+
+from .rmscene import SceneLineItemBlock, Line, Pen, PenColor
+from .rmscene.scene_stream import point_dtype
+from .rmscene.tagged_block_common import DataStream, TagType
+from .profiling import span, count
+
+POINT_COLUMNS = ('x', 'y', 'speed', 'direction', 'width', 'pressure')
+STROKE_COLUMNS = ('item_id', 'tool', 'color', 'thickness_scale', 'bbox')
+_V2 = point_dtype(2)
+_MANIFEST = 'manifest.json'
+_VERSION = 2
+FORMATS = ('npz', 'parquet')
+
+
+##
+# one page
+#
+def page_strokes(data: Union[str, bytes, BinaryIO]) -> dict:
+    """ visible strokes of one .rm page as columns, points concatenated
+    Args
+        data    (str, bytes, BinaryIO) .rm v6 file
+    returns {'x', 'y', 'speed', 'direction', 'width', 'pressure',
+             'item_id', 'tool', 'color', 'thickness_scale', 'bbox', 'offsets'}
+    """
+    if isinstance(data, str) and osp.isfile(data):
+        with open(data, 'rb') as _fi:
+            data = _fi.read()
+    elif not isinstance(data, bytes):
+        data = data.read()
+    stream = DataStream(io.BytesIO(data))
+    stream.read_header()
+    points, strokes = [], []
+    offset = stream.tell()
+    while offset + 8 <= len(data):
+        stream.data.seek(offset)
+        length = stream.read_uint32()
+        stream.read_uint8()
+        stream.read_uint8()             # min_version
+        version = stream.read_uint8()   # current_version
+        block_type = stream.read_uint8()
+        if block_type == SceneLineItemBlock.BLOCK_TYPE:
+            line = _read_line(stream, version)
+            if line is not None:
+                strokes.append(line[0])
+                points.append(line[1])
+        offset += 8 + length
+    return _page_tables(strokes, points)
+
+
+def _read_line(stream: DataStream, version: int) -> Optional[tuple]:
+    """ ((item_id, tool, color, thickness_scale), v2 points) or None if deleted or empty """
+    header = stream.read_item_header()
+    if not header.has_value:
+        return None
+    item_id = header.item_id
+    stream.read_tag(6, TagType.Length4)
+    stream.read_uint32()
+    stream.read_uint8()                 # item type
+    stream.read_tag(1, TagType.Byte4)
+    tool = stream.read_uint32()
+    stream.read_tag(2, TagType.Byte4)
+    color = stream.read_uint32()
+    stream.read_tag(3, TagType.Byte8)
+    thickness_scale = stream.read_float64()
+    stream.read_tag(4, TagType.Byte4)
+    stream.read_float32()               # starting_length
+    stream.read_tag(5, TagType.Length4)
+    size = stream.read_uint32()
+    dtype = point_dtype(version)
+    assert size % dtype.itemsize == 0, \
+        f"line {item_id} point data {size} not multiple of {dtype.itemsize}"
+    points = np.frombuffer(stream.read_bytes(size), dtype=dtype)
+    if not len(points):
+        return None
+    if version == 1:
+        points = _v1_to_v2(points)
+    return (int(item_id), tool, color, thickness_scale), points
+
+
+def _v1_to_v2(points: np.ndarray) -> np.ndarray:
+    """ v1 float points in v2 units, as point_from_stream(), rounded to v2 types """
+    out = np.empty(len(points), dtype=_V2)
+    out['x'] = points['x']
+    out['y'] = points['y']
+    scaled = {'speed': points['speed'] * 4, 'width': points['width'] * 4,
+              'direction': points['direction'] * 255 / (2 * np.pi),
+              'pressure': points['pressure'] * 255}
+    for name, values in scaled.items():
+        out[name] = np.clip(np.rint(values), 0, np.iinfo(_V2[name]).max)
+    return out
+
+
+def _page_tables(strokes: list, points: list) -> dict:
+    """ columns from per stroke tuples and per stroke structured point arrays """
+    lengths = np.fromiter((len(p) for p in points), dtype=np.int64, count=len(points))
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    points = np.concatenate(points) if points else np.empty(0, dtype=_V2)
+    out = {name: np.ascontiguousarray(points[name]) for name in POINT_COLUMNS}
+    item_id, tool, color, thickness_scale = zip(*strokes) if strokes else ((),) * 4
+    out['item_id'] = np.array(item_id, dtype=np.uint64)     # part1 << 56 overflows int64
+    out['tool'] = np.array(tool, dtype=np.uint8)
+    out['color'] = np.array(color, dtype=np.uint8)
+    out['thickness_scale'] = np.array(thickness_scale, dtype=np.float64)
+    out['bbox'] = _bboxes(out['x'], out['y'], offsets)
+    out['offsets'] = offsets
+    return out
+
+
+def _bboxes(x: np.ndarray, y: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """ (N, 4) x0, y0, x1, y1 per ragged stroke, no stroke is empty """
+    if len(offsets) < 2:
+        return np.zeros((0, 4), dtype=np.float32)
+    starts = offsets[:-1]
+    return np.stack((np.minimum.reduceat(x, starts), np.minimum.reduceat(y, starts),
+                     np.maximum.reduceat(x, starts), np.maximum.reduceat(y, starts)), axis=1)
+
+
+##
+# page batch
+#
+class StrokeBatch:
+    """ strokes of one page, ragged: points of stroke i are rows offsets[i]:offsets[i+1]
+    Args
+        columns         (dict) POINT_COLUMNS arrays, one row per point
+        offsets         (ndarray) (N+1,) int64, no stroke is empty
+        tool, color     (ndarray) (N,) Pen, PenColor values
+        thickness_scale (ndarray) (N,) float64
+        item_id         (ndarray [None]) (N,) packed CrdtId
+    per stroke bboxes (N, 4) x0, y0, x1, y1 are computed on first access
+
+        >>> lines = StrokeBatch.from_rm(rm)
+        >>> lines = lines.drop_tools()                  # without ERASER strokes
+        >>> xy = lines.transform(*get_xform_args)       # (P, 2) all points, one operation
+        >>> xy[lines.offsets[i]:lines.offsets[i + 1]]   # stroke i
+    """
+    def __init__(self,
+                 columns: dict,
+                 offsets: np.ndarray,
+                 tool: np.ndarray,
+                 color: np.ndarray,
+                 thickness_scale: np.ndarray,
+                 item_id: Optional[np.ndarray] = None) -> None:
+        self.columns = columns
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.tool = np.asarray(tool, dtype=np.uint8)
+        self.color = np.asarray(color, dtype=np.uint8)
+        self.thickness_scale = np.asarray(thickness_scale, dtype=np.float64)
+        self.item_id = None if item_id is None else np.asarray(item_id, dtype=np.uint64)
+        self._bboxes = None
+
+    @classmethod
+    def from_tables(cls, tables: dict) -> 'StrokeBatch':
+        """ from page_strokes() or load_strokes() tables """
+        batch = cls({name: tables[name] for name in POINT_COLUMNS}, tables['offsets'],
+                    tables['tool'], tables['color'], tables['thickness_scale'],
+                    tables.get('item_id'))
+        batch._bboxes = tables.get('bbox')
+        return batch
+
+    @classmethod
+    def from_rm(cls, data: Union[str, bytes, BinaryIO]) -> 'StrokeBatch':
+        """ from .rm bytes, points are never decoded to Point objects """
+        return cls.from_tables(page_strokes(data))
+
+    @classmethod
+    def from_blocks(cls, blocks: list) -> 'StrokeBatch':
+        """ from read_rm() blocks, SceneLineItemBlocks with a Line value
+        from_rm() is faster when blocks are not already decoded
+        """
+        lines, item_ids = [], []
+        for i, block in enumerate(blocks):
+            if isinstance(block, SceneLineItemBlock):
+                if isinstance(block.item.value, Line):
+                    assert block.item.value.points, f"line {i} has no members! {block}"
+                    lines.append(block.item.value)
+                    item_ids.append(int(block.item.item_id))
+                elif block.item.value is not None:
+                    raise ValueError(f'SceneLineItemBlock()[{i}].item().value '
+                                     f'{type(block.item.value)}')
+        points = [point for line in lines for point in line.points]
+        columns = {name: np.array([getattr(point, name) for point in points], dtype=np.float64)
+                   for name in POINT_COLUMNS}
+        lengths = [len(line.points) for line in lines]
+        return cls(columns, np.cumsum([0] + lengths),
+                   [line.tool for line in lines], [line.color for line in lines],
+                   [line.thickness_scale for line in lines], item_ids)
+
+    @classmethod
+    def from_lines(cls, lines: list) -> 'StrokeBatch':
+        """ from read_line_rm() dicts, missing attributes default to 0 """
+        lengths = [len(line['x']) for line in lines]
+        columns = {}
+        for name in POINT_COLUMNS:
+            columns[name] = np.concatenate([np.zeros(0)] + [
+                np.asarray(line[name] if name in line else np.zeros(n), dtype=np.float64)
+                for line, n in zip(lines, lengths)])
+        return cls(columns, np.cumsum([0] + lengths),
+                   [line.get('tool', 0) for line in lines],
+                   [line.get('color', 0) for line in lines],
+                   [line.get('thickness_scale', 1.0) for line in lines])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> dict:
+        """ read_line_rm() like dict of stroke i, point columns are array views """
+        i = range(len(self))[i]     # negative index, IndexError out of range
+        rows = slice(self.offsets[i], self.offsets[i + 1])
+        out = {name: self.columns[name][rows] for name in POINT_COLUMNS}
+        out.update(tool=Pen(int(self.tool[i])), color=PenColor(int(self.color[i])),
+                   thickness_scale=float(self.thickness_scale[i]),
+                   bbox=tuple(self.bboxes[i].tolist()))
+        return out
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.columns['x']
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.columns['y']
+
+    @property
+    def num_points(self) -> int:
+        return int(self.offsets[-1])
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @property
+    def bboxes(self) -> np.ndarray:
+        """ (N, 4) x0, y0, x1, y1 per stroke, one reduceat per bound """
+        if self._bboxes is None:
+            self._bboxes = _bboxes(np.asarray(self.x, dtype=np.float32),
+                                   np.asarray(self.y, dtype=np.float32), self.offsets)
+        return self._bboxes
+
+    def bounds(self) -> Optional[tuple]:
+        """ (x0, y0, x1, y1) of all strokes or None """
+        from .spatial import union_bbox
+        return union_bbox(self.bboxes)
+
+    def minmax(self) -> Optional[tuple]:
+        """ ((xmin, xmax), (ymin, ymax)) or None, as read_lines() """
+        bounds = self.bounds()
+        if bounds is None:
+            return None
+        return (bounds[0], bounds[2]), (bounds[1], bounds[3])
+
+    def select(self, keep: np.ndarray) -> 'StrokeBatch':
+        """ strokes where keep, bool (N,) mask or stroke indices, order kept """
+        keep = np.asarray(keep)
+        if keep.dtype != bool:
+            mask = np.zeros(len(self), dtype=bool)
+            mask[keep] = True
+            keep = mask
+        rows = np.repeat(keep, self.lengths)
+        batch = StrokeBatch({name: values[rows] for name, values in self.columns.items()},
+                            np.concatenate(([0], np.cumsum(self.lengths[keep]))),
+                            self.tool[keep], self.color[keep], self.thickness_scale[keep],
+                            None if self.item_id is None else self.item_id[keep])
+        if self._bboxes is not None:
+            batch._bboxes = self._bboxes[keep]
+        return batch
+
+    def drop_tools(self, tools: tuple = (Pen.ERASER,)) -> 'StrokeBatch':
+        """ strokes without tools, default Pen.ERASER, white marker, not drawn """
+        return self.select(~np.isin(self.tool, tools))
+
+    def transform(self,
+                  center_x: float,
+                  scale_x: float,
+                  center_y: float,
+                  scale_y: float,
+                  pdf_height: float) -> np.ndarray:
+        """ (P, 2) float64 points in pdf coordinates, recenter, scale, flip y """
+        xy = np.empty((self.num_points, 2), dtype=np.float64)
+        np.multiply(np.add(self.x, center_x, dtype=np.float64), scale_x, out=xy[:, 0])
+        np.multiply(np.add(self.y, center_y, dtype=np.float64), -scale_y, out=xy[:, 1])
+        xy[:, 1] += pdf_height
+        return xy
+
+    def split(self, values: np.ndarray) -> list:
+        """ per stroke views of a (P, ...) array """
+        return np.split(values, self.offsets[1:-1])
+
+
+_PAGES = OrderedDict()  # {rm: (mtime_ns, size, StrokeBatch)}, stays warm in remarkabled
+_MAX_PAGES = 256
+
+def page_batch(rm: str) -> StrokeBatch:
+    """ StrokeBatch.from_rm(rm), reparsed only if file mtime or size changed
+    least recently used pages are dropped past _MAX_PAGES
+    """
+    stat = os.stat(rm)
+    cached = _PAGES.get(rm)
+    if cached is None or cached[:2] != (stat.st_mtime_ns, stat.st_size):
+        cached = (stat.st_mtime_ns, stat.st_size, StrokeBatch.from_rm(rm))
+        count('page_batch_misses')
+    else:
+        count('page_batch_hits')
+    _PAGES[rm] = cached
+    _PAGES.move_to_end(rm)
+    while len(_PAGES) > _MAX_PAGES:
+        _PAGES.popitem(last=False)
+    return cached[2]
+
+
+##
+# one document
+#
+def document_strokes(uid: str, xochitl: str) -> dict:
+    """ tables of all annotated pages of a document, page order
+    Args
+        uid     (str) document uuid
+        xochitl (str) backup folder
+    returns page_strokes() columns concatenated, with
+        'uuid' (str), 'page' (int32) per stroke, 'stroke_id' (int32) per point
+    """
+    from .annotations import read_content
+    content = read_content(osp.join(xochitl, f"{uid}.content"))
+    pages = sorted(content['pages'], key=lambda page: page['number'])
+    tables = []
+    for page in pages:
+        with span('strokes.page', rm=osp.basename(page['rm'])):
+            tables.append((page['number'], page_strokes(page['rm'])))
+    return _concat(uid, tables)
+
+
+def _concat(uid: str, tables: list) -> dict:
+    """ [(page number, page_strokes())] to one document table, offsets shifted """
+    empty = _page_tables([], [])
+    tables = tables or [(0, empty)]
+    out = {name: np.concatenate([table[name] for _, table in tables])
+           for name in POINT_COLUMNS + STROKE_COLUMNS}
+    starts = np.cumsum([0] + [len(table['x']) for _, table in tables])
+    out['offsets'] = np.concatenate([[0]] + [table['offsets'][1:] + start
+                                             for (_, table), start in zip(tables, starts)])
+    counts = [len(table['tool']) for _, table in tables]
+    out['page'] = np.repeat(np.array([page for page, _ in tables], dtype=np.int32), counts)
+    out['stroke_id'] = np.repeat(np.arange(len(out['tool']), dtype=np.int32),
+                                 np.diff(out['offsets']))
+    out['uuid'] = np.array(uid)
+    return out
+
+
+##
+# dataset
+#
+def export_strokes(folder: str,
+                   xochitl: Optional[str] = None,
+                   fmt: str = 'npz',
+                   verbose: bool = False) -> dict:
+    """ write or update the stroke dataset of a backup, one partition per document
+    Args
+        folder  (str) dataset folder, created if needed
+        xochitl (str [None]) backup folder, None: ~/.xochitl
+        fmt     (str ['npz']) npz | parquet, parquet requires pyarrow
+        verbose (bool [False]) print documents written and removed
+    returns {'written': int, 'removed': int, 'unchanged': int, 'strokes': int, 'points': int}
+        strokes and points counted over written documents
+    """
+    from .search import _resolve_xochitl, _scan
+    assert fmt in FORMATS, f"fmt {fmt} not in {FORMATS}"
+    if fmt == 'parquet':
+        _pyarrow()
+    xochitl = _resolve_xochitl(xochitl)
+    folder = osp.abspath(osp.expanduser(folder))
+    os.makedirs(folder, exist_ok=True)
+    manifest = _load_manifest(folder)
+    if manifest.get('format', fmt) != fmt or manifest.get('version') != _VERSION:
+        for uid in manifest.get('docs', {}):
+            _remove_partition(folder, uid)  # written in the old format or version
+        manifest = {'docs': {}}
+    known = manifest['docs']
+
+    with span('strokes.export', xochitl=xochitl):
+        docs, files = _scan(xochitl)
+        state = {uid: {'stamp': stamp, 'files': {}} for uid, (stamp, _) in docs.items()}
+        for path, (uid, mtime_ns, size) in files.items():
+            state[uid]['files'][osp.basename(path)] = [mtime_ns, size]
+        state = {uid: value for uid, value in state.items() if value['files']}
+
+        removed = [uid for uid in known if uid not in state]
+        for uid in removed:
+            _remove_partition(folder, uid)
+            del known[uid]
+        todo = [uid for uid, value in state.items()
+                if {k: known.get(uid, {}).get(k) for k in value} != value]
+        out = {'written': 0, 'removed': len(removed), 'unchanged': len(state) - len(todo),
+               'strokes': 0, 'points': 0}
+        for uid in sorted(todo):
+            tables = document_strokes(uid, xochitl)
+            _write_partition(folder, uid, tables, fmt)
+            known[uid] = dict(state[uid], strokes=len(tables['tool']), points=len(tables['x']))
+            out['written'] += 1
+            out['strokes'] += len(tables['tool'])
+            out['points'] += len(tables['x'])
+            if verbose:
+                print(f"  {uid} {len(tables['tool'])} strokes {len(tables['x'])} points")
+            # manifest after each document, an interrupted export resumes
+            _save_manifest(folder, {'version': _VERSION, 'format': fmt, 'docs': known})
+        _save_manifest(folder, {'version': _VERSION, 'format': fmt, 'docs': known})
+    count('strokes.written', out['written'])
+    count('strokes.points', out['points'])
+    if verbose:
+        print(f"stroke dataset {out}")
+    return out
+
+
+def load_strokes(folder: str, uid: Optional[str] = None) -> dict:
+    """ tables of one document partition, or of all concatenated if uid is None
+    Args
+        folder  (str) dataset folder written by export_strokes()
+        uid     (str [None]) document uuid
+    returns document_strokes() columns, 'uuid' per stroke when all documents are loaded
+    """
+    folder = osp.abspath(osp.expanduser(folder))
+    manifest = _load_manifest(folder)
+    fmt = manifest.get('format', 'npz')
+    if uid is not None:
+        return _read_partition(folder, uid, fmt)
+    tables = [_read_partition(folder, uid, fmt) for uid in sorted(manifest.get('docs', {}))]
+    if not tables:
+        out = _concat('', [])
+        out['uuid'] = np.zeros(0, dtype='<U36')
+        return out
+    out = {name: np.concatenate([table[name] for table in tables])
+           for name in POINT_COLUMNS + STROKE_COLUMNS + ('page',)}
+    starts = np.cumsum([0] + [len(table['x']) for table in tables])
+    out['offsets'] = np.concatenate([[0]] + [table['offsets'][1:] + start
+                                             for table, start in zip(tables, starts)])
+    out['stroke_id'] = np.repeat(np.arange(len(out['tool']), dtype=np.int32),
+                                 np.diff(out['offsets']))
+    out['uuid'] = np.repeat(np.array([str(table['uuid']) for table in tables]),
+                            [len(table['tool']) for table in tables])
+    return out
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("fmt='parquet' requires pyarrow, pip install pyarrow "
+                          "or use fmt='npz'") from e
+    return pyarrow
+
+
+def _partition(folder: str, uid: str, fmt: str) -> list:
+    if fmt == 'parquet':
+        return [osp.join(folder, 'points', f"{uid}.parquet"),
+                osp.join(folder, 'strokes', f"{uid}.parquet")]
+    return [osp.join(folder, f"{uid}.npz")]
+
+
+def _remove_partition(folder: str, uid: str) -> None:
+    for fmt in FORMATS:
+        for name in _partition(folder, uid, fmt):
+            if osp.isfile(name):
+                os.remove(name)
+
+
+def _write_partition(folder: str, uid: str, tables: dict, fmt: str) -> None:
+    """ atomic per file, readers never see a partial partition file """
+    if fmt == 'npz':
+        _atomic(_partition(folder, uid, fmt)[0],
+                lambda fi: np.savez(fi, **tables))
+        return
+    pa = _pyarrow()
+    points_file, strokes_file = _partition(folder, uid, fmt)
+    points = pa.table({name: tables[name] for name in POINT_COLUMNS + ('stroke_id',)})
+    strokes = pa.table({'uuid': [uid] * len(tables['tool']), 'page': tables['page'],
+                        'item_id': tables['item_id'], 'tool': tables['tool'],
+                        'color': tables['color'], 'thickness_scale': tables['thickness_scale'],
+                        'x0': tables['bbox'][:, 0], 'y0': tables['bbox'][:, 1],
+                        'x1': tables['bbox'][:, 2], 'y1': tables['bbox'][:, 3],
+                        'offset': tables['offsets'][:-1]})
+    _atomic(points_file, lambda fi: pa.parquet.write_table(points, fi))
+    _atomic(strokes_file, lambda fi: pa.parquet.write_table(strokes, fi))
+
+
+def _read_partition(folder: str, uid: str, fmt: str) -> dict:
+    if fmt == 'npz':
+        with np.load(_partition(folder, uid, fmt)[0]) as data:
+            return {name: data[name] for name in data.files}
+    pa = _pyarrow()
+    points_file, strokes_file = _partition(folder, uid, fmt)
+    points = pa.parquet.read_table(points_file)
+    strokes = pa.parquet.read_table(strokes_file)
+    out = {name: points[name].to_numpy() for name in POINT_COLUMNS + ('stroke_id',)}
+    out.update({name: strokes[name].to_numpy()
+                for name in ('page', 'item_id', 'tool', 'color', 'thickness_scale')})
+    out['bbox'] = np.stack([strokes[name].to_numpy() for name in ('x0', 'y0', 'x1', 'y1')],
+                           axis=1).reshape(-1, 4)
+    out['offsets'] = np.append(strokes['offset'].to_numpy(), len(out['x'])).astype(np.int64)
+    out['uuid'] = np.array(uid)
+    return out
+
+
+def _load_manifest(folder: str) -> dict:
+    name = osp.join(folder, _MANIFEST)
+    if osp.isfile(name):
+        try:
+            with open(name, 'r', encoding='utf8') as _fi:
+                return json.load(_fi)
+        except (OSError, ValueError):
+            pass
+    return {'docs': {}}
+
+
+def _save_manifest(folder: str, manifest: dict) -> None:
+    _atomic(osp.join(folder, _MANIFEST),
+            lambda fi: fi.write(json.dumps(manifest, indent=1).encode('utf8')))
+
+
+def _atomic(name: str, write) -> None:
+    """ write(file object) to a temp file in the same folder, then replace name """
+    os.makedirs(osp.dirname(name), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(suffix=osp.splitext(name)[1], prefix='.', dir=osp.dirname(name))
+    try:
+        with os.fdopen(fd, 'wb') as _fi:
+            write(_fi)
+        os.replace(tmp, name)
+    finally:
+        if osp.isfile(tmp):
+            os.remove(tmp)
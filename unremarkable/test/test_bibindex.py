@@ -0,0 +1,98 @@
+"""
+"""
+import os
+import os.path as osp
+from pybtex.database import parse_string
+from ..bibindex import BibIndex, normalize_title, _cache_file
+from ..pdf import bibs_to_dict
+
+_BIB = """@article{Vaswani2017,
+    title = {Attention Is All You {N}eed},
+    author = {Vaswani, Ashish and Shazeer, Noam},
+    doi = {10.48550/arXiv.1706.03762},
+    year = {2017}
+}
+@inproceedings{he2016deep,
+    title = {Deep Residual Learning for Image Recognition},
+    author = {He, Kaiming},
+    year = {2016}
+}
+"""
+_MORE = """@article{he2016deep,
+    title = {Duplicate, first file wins},
+    year = {2020}
+}
+@misc{lecun1998,
+    title = {Gradient-Based Learning Applied to Document Recognition},
+    year = {1998}
+}
+"""
+
+
+def _write(name, text):
+    with open(name, 'w', encoding='utf8') as _fi:
+        _fi.write(text)
+    return name
+
+
+def test_bib_index(tmp_path):
+    cache = osp.join(tmp_path, 'cache')
+    bib = _write(osp.join(tmp_path, 'lab.bib'), _BIB)
+    more = _write(osp.join(tmp_path, 'more.bib'), _MORE)
+    index = BibIndex([bib, more], cache_dir=cache)
+    assert index.records == ['vaswani2017', 'he2016deep', 'lecun1998']
+    assert index.get('he2016deep')['year'] == '2016'
+    assert index.find('Vaswani2017') == 'vaswani2017'
+    assert index.find('https://doi.org/10.48550/ARXIV.1706.03762') == 'vaswani2017'
+    assert index.find('Attention_Is_All_You_Need') == 'vaswani2017'
+    assert index.find('AttentionIsAllYouNeed') == 'vaswani2017'
+    assert index.match('Deep_Residual_Learning_Image_Recogniton')[0] == 'he2016deep'
+    assert index.match('deep learning') is None
+    assert '@misc{lecun1998' in index.bibtex('lecun1998')
+    assert normalize_title('Attention Is All You {N}eed') == 'attention is all you need'
+
+    pdfs = [osp.join(tmp_path, n) for n in ('Attention_is_all_you_need.pdf', 'other.pdf',
+                                            'Gradient Based Learning Applied to Document.pdf')]
+    for pdf in pdfs:
+        _write(pdf, '')
+    assert index.match_pdfs(str(tmp_path)) == {pdfs[0]: 'vaswani2017', pdfs[2]: 'lecun1998'}
+
+
+def test_bib_index_cache(tmp_path):
+    cache = osp.join(tmp_path, 'cache')
+    bib = _write(osp.join(tmp_path, 'lab.bib'), _BIB)
+    BibIndex(bib, cache_dir=cache)
+    cached = _cache_file(bib, cache)
+    assert osp.isfile(cached)
+    stamp = os.stat(cached).st_mtime_ns
+    assert len(BibIndex(bib, cache_dir=cache)) == 2
+    assert os.stat(cached).st_mtime_ns == stamp
+
+    # modified bib invalidates
+    _write(bib, _BIB + _MORE.split('@misc')[0].replace('he2016deep', 'new2024'))
+    index = BibIndex(bib, cache_dir=cache)
+    assert len(index) == 3 and 'new2024' in index
+
+
+def test_bibs_to_dict_indexed(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    monkeypatch.setattr('unremarkable.pdf._BIB_INDEX_MIN_BYTES', 0)
+    bib = _write(osp.join(tmp_path, 'lab.bib'), _BIB)
+    out = bibs_to_dict(bib)
+    assert sorted(out) == ['Attention Is All You Need', 'Deep Residual Learning for Image Recognition']
+    assert out['Attention Is All You Need']['record'] == 'vaswani2017'
+    assert 'Vaswani' in out['Attention Is All You Need']['author']
+    assert osp.isdir(osp.join(tmp_path, 'unremarkable', 'bib'))
+
+
+def test_bib_index_macros(tmp_path):
+    text = ('@string{jmlr = "Journal of Machine Learning Research"}\n'
+            '@article{macro2020,\n    title = {Uses a Macro},\n    journal = jmlr,\n'
+            '    month = jan,\n    year = {2020}\n}\n' + _MORE)
+    bib = _write(osp.join(tmp_path, 'macro.bib'), text)
+    index = BibIndex(bib, cache_dir=osp.join(tmp_path, 'cache'))
+    assert index.records == ['macro2020', 'he2016deep', 'lecun1998']
+    entry = parse_string(index.bibtex('macro2020'), 'bibtex').entries['macro2020']
+    assert entry.fields['journal'] == 'Journal of Machine Learning Research'
+    # entries without macros are still sliced from the source
+    assert index.bibtex('lecun1998') == '@misc{lecun1998' + _MORE.split('@misc{lecun1998')[1]
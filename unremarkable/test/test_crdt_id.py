@@ -0,0 +1,26 @@
+"""
+"""
+import pickle
+import random
+from ..rmscene.tagged_block_common import CrdtId
+
+
+def test_crdt_id_packed():
+    crdt_id = CrdtId(2, 0xfffffffffffe)
+    assert (crdt_id.part1, crdt_id.part2) == (2, 0xfffffffffffe)
+    assert repr(crdt_id) == str(crdt_id) == f"{crdt_id}" == "CrdtId(2, 281474976710654)"
+    assert crdt_id == (2 << 56) | 0xfffffffffffe and {crdt_id: 1}[(2 << 56) | 0xfffffffffffe]
+    assert CrdtId(2, 0xfffffffffffe) is crdt_id
+    assert pickle.loads(pickle.dumps(crdt_id)) is crdt_id
+    assert CrdtId(0, 0)
+    for part1, part2 in ((256, 0), (0, 1 << 56), (-1, 0)):
+        try:
+            CrdtId(part1, part2)
+            assert False, "out of range"
+        except ValueError:
+            pass
+
+
+def test_crdt_id_order():
+    pairs = [(random.randint(0, 255), random.randint(0, 1 << 40)) for _ in range(500)]
+    assert [(i.part1, i.part2) for i in sorted(CrdtId(*p) for p in pairs)] == sorted(pairs)
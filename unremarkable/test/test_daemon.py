@@ -0,0 +1,64 @@
+"""
+remarkabled in a thread, console entry points run as client subprocesses
+"""
+import os
+import os.path as osp
+import json
+import sys
+import threading
+import subprocess as sp
+from .. import daemon
+
+_ROOT = osp.dirname(osp.dirname(osp.dirname(osp.abspath(__file__))))
+_UUID = '0f0e1b2e-58a4-4a2e-9b2e-5a1c2a3b4c5d'
+
+
+def _client(entry, argv, sock, cwd, **env):
+    code = (f"import sys; sys.path.insert(0, {_ROOT!r}); "
+            f"from unremarkable.__main__ import {entry}; "
+            f"sys.argv = [{entry!r}] + {argv!r}; sys.exit({entry}())")
+    env = dict(os.environ, REMARKABLED_SOCKET=sock, **env)
+    return sp.run([sys.executable, '-c', code], cwd=cwd, env=env, capture_output=True,
+                  text=True, check=False)
+
+
+def _backup(root):
+    xochitl = osp.join(root, 'xochitl')
+    os.makedirs(xochitl)
+    with open(osp.join(xochitl, f"{_UUID}.metadata"), 'w', encoding='utf8') as _fi:
+        json.dump({'visibleName': 'Paper One', 'parent': '', 'type': 'DocumentType'}, _fi)
+    return xochitl
+
+
+def test_forward(tmp_path, monkeypatch):
+    sock = str(tmp_path / 'rd.sock')
+    _backup(str(tmp_path))
+    monkeypatch.setenv('REMARKABLED_SOCKET', sock)
+    assert daemon.forward('remarkable_ls', []) is None     # no daemon, run in process
+
+    server = daemon.make_server(sock)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert daemon.is_running()
+        # relative folder resolves in the client's directory
+        out = _client('remarkable_ls', ['xochitl'], sock, str(tmp_path))
+        assert out.returncode == 0 and f"'Paper One': '{_UUID}'" in out.stdout
+        # argparse errors keep their exit code and reach stderr
+        out = _client('remarkable_grep', [], sock, str(tmp_path))
+        assert out.returncode == 2 and 'required' in out.stderr
+        assert daemon.run_entry('remarkabled', []) == 2      # not a forwarded entry
+
+        monkeypatch.setenv('UNREMARKABLE_NO_DAEMON', '1')
+        assert daemon.forward('remarkable_ls', []) is None
+        assert daemon.stop()
+        thread.join(5)
+        assert not thread.is_alive()
+    finally:
+        server.server_close()
+
+    # stale socket file: clients fall back, a new daemon replaces it
+    monkeypatch.delenv('UNREMARKABLE_NO_DAEMON')
+    assert osp.exists(sock) and not daemon.is_running()
+    assert daemon.forward('remarkable_ls', []) is None
+    daemon.make_server(sock).server_close()
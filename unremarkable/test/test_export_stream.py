@@ -0,0 +1,96 @@
+"""
+"""
+import os.path as osp
+from reportlab.graphics.shapes import Drawing, PolyLine
+from reportlab.graphics import renderPDF
+from reportlab.lib import colors
+import pypdf
+from pypdf import PdfWriter, PdfReader
+from .. import annotations
+from ..pagetree import page_refs
+from ..annotations import _export_incremental, highlight_annotations
+from ..rmscene import PenColor
+
+
+def _overlay(tempname):
+    drawing = Drawing(612, 792)
+    drawing.add(PolyLine([100, 100, 200, 300], strokeWidth=2, strokeColor=colors.blue,
+                         strokeOpacity=0.4))
+    renderPDF.drawToFile(drawing, tempname)
+    return PdfReader(tempname).pages[0]
+
+
+def test_export_incremental(tmp_path, monkeypatch):
+    pdf = osp.join(tmp_path, 'book.pdf')
+    writer = PdfWriter()
+    for _ in range(30):
+        writer.add_blank_page(612, 792)
+    with open(pdf, 'wb') as _fi:
+        writer.write(_fi)
+
+    highlight = {'text': 'marked text', 'color': PenColor.YELLOW, 'rects': [(0, 0, 50, 10)]}
+    def _page_annotations(out, page, xform, tempname, cache=None):
+        return _overlay(tempname), highlight_annotations([highlight], *xform), (90, 90, 210, 310)
+    monkeypatch.setattr(annotations, '_page_annotations', _page_annotations)
+
+    out_name = osp.join(tmp_path, 'book_annotated.pdf')
+    assert _export_incremental({}, pdf, [4, 20], out_name, (0, 1, 0, 1, 792),
+                               osp.join(tmp_path, 'overlay.pdf'), crop=True)
+
+    with open(pdf, 'rb') as _fi, open(out_name, 'rb') as _fo:
+        original = _fi.read()
+        assert _fo.read(len(original)) == original
+
+    reader = PdfReader(out_name)
+    assert len(reader.pages) == 30
+    for i, page in enumerate(reader.pages):
+        if i in (4, 20):
+            assert b'/UnremarkableOverlay Do' in page.get_contents().get_data()
+            assert '/UnremarkableOverlay' in page['/Resources']['/XObject']
+            annot = page['/Annots'][0].get_object()
+            assert annot['/Subtype'] == '/Highlight' and annot['/Contents'] == 'marked text'
+            assert [float(v) for v in page.cropbox] == [78, 78, 222, 322]
+        else:
+            assert '/Annots' not in page and page.cropbox == page.mediabox
+
+
+class _Recording(PdfReader):
+    """ PdfReader noting its input and every object number it resolves """
+    readers = []
+
+    def __init__(self, stream, *args, **kwargs):
+        self.stream_type = type(stream)
+        self.resolved = set()
+        super().__init__(stream, *args, **kwargs)
+        self.readers.append(self)
+
+    def get_object(self, indirect_reference):
+        num = indirect_reference if isinstance(indirect_reference, int) \
+            else indirect_reference.idnum
+        self.resolved.add(num)
+        return super().get_object(indirect_reference)
+
+
+def test_export_incremental_lazy(tmp_path, monkeypatch):
+    pdf = osp.join(tmp_path, 'book.pdf')
+    writer = PdfWriter()
+    for _ in range(40):
+        writer.add_blank_page(612, 792)
+    with open(pdf, 'wb') as _fi:
+        writer.write(_fi)
+    refs = page_refs(pdf)
+
+    def _page_annotations(out, page, xform, tempname, cache=None):
+        return _overlay(tempname), [], (90, 90, 210, 310)
+    monkeypatch.setattr(annotations, '_page_annotations', _page_annotations)
+    monkeypatch.setattr(pypdf, 'PdfReader', _Recording)
+    _Recording.readers = []
+
+    out_name = osp.join(tmp_path, 'book_annotated.pdf')
+    assert _export_incremental({}, pdf, [7], out_name, (0, 1, 0, 1, 792),
+                               osp.join(tmp_path, 'overlay.pdf'))
+    reader = _Recording.readers[0]
+    assert not issubclass(reader.stream_type, (str, bytes))     # open file, not read to memory
+    untouched = {num for i, (num, _) in enumerate(refs) if i != 7}
+    assert refs[7][0] in reader.resolved and not reader.resolved & untouched
+    assert len(PdfReader(out_name).pages) == 40
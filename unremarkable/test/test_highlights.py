@@ -0,0 +1,43 @@
+"""
+"""
+import io
+import numpy as np
+from pypdf import PdfWriter, PdfReader
+from ..rmscene import SceneGlyphItemBlock, CrdtId
+from ..rmscene import scene_items as si
+from ..rmscene.crdt_sequence import CrdtSequenceItem
+from ..annotations import read_highlights, highlight_annotations
+
+
+def _glyph(text, rects, color=si.PenColor.YELLOW, deleted=False):
+    value = None if deleted else si.GlyphRange(None, len(text), text, color,
+                                               [si.Rectangle(*r) for r in rects])
+    return SceneGlyphItemBlock(parent_id=CrdtId(0, 11), extra_data=b'',
+                               item=CrdtSequenceItem(CrdtId(1, 5), CrdtId(0, 0), CrdtId(0, 0),
+                                                     0, value))
+
+
+def test_highlight_annotations():
+    blocks = [_glyph('two line highlight', [(-100, 200, 300, 20), (-100, 230, 80, 20)],
+                     si.PenColor.PINK),
+              _glyph('deleted', [], deleted=True)]
+    highlights = read_highlights(blocks)
+    assert len(highlights) == 1 and highlights[0]['text'] == 'two line highlight'
+
+    # x: (x + 100) * 0.5, y: 792 - y * 0.5
+    annots = highlight_annotations(highlights, 100, 0.5, 0, 0.5, 792)
+    annot = annots[0]
+    assert annot['/Subtype'] == '/Highlight'
+    assert annot['/Contents'] == 'two line highlight'
+    assert np.allclose(annot['/QuadPoints'], [0, 692, 150, 692, 0, 682,
+                                              150, 682, 0, 677, 40, 677, 0, 667, 40, 667])
+    assert np.allclose(annot['/Rect'], [0, 667, 150, 692])
+    assert np.allclose(annot['/C'], [1, 192/255, 203/255], atol=1e-3)
+
+    writer = PdfWriter()
+    writer.add_blank_page(612, 792)
+    writer.add_annotation(0, annot)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    page = PdfReader(buffer).pages[0]
+    assert page['/Annots'][0].get_object()['/Contents'] == 'two line highlight'
@@ -0,0 +1,85 @@
+"""
+"""
+import os.path as osp
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import NameObject
+from ..incremental import append_info
+from ..pdf import pdf_mod
+
+
+def _make_pdf(name, pages=3):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(612, 792)
+    writer.add_metadata({'/Title': 'Old'})
+    with open(name, 'wb') as _fi:
+        writer.write(_fi)
+    with open(name, 'rb') as _fi:
+        return _fi.read()
+
+
+def test_append_info_classic_and_stream(tmp_path):
+    pdf = osp.join(tmp_path, 'a.pdf')
+    original = _make_pdf(pdf)
+
+    assert append_info(pdf, {'/Title': 'New (1)', '/Bibtex': '@article{a,\n title={x}}'})
+    with open(pdf, 'rb') as _fi:
+        data = _fi.read()
+    assert data.startswith(original) and len(data) - len(original) < 512
+    reader = PdfReader(pdf, strict=True)
+    assert reader.metadata['/Title'] == 'New (1)'
+    assert reader.metadata['/Bibtex'] == '@article{a,\n title={x}}'
+    assert len(reader.pages) == 3
+
+    # xref stream section, then auto detected on next update
+    assert append_info(pdf, {'/Title': 'Stream'}, xref_stream=True)
+    assert PdfReader(pdf, strict=True).metadata['/Title'] == 'Stream'
+    assert append_info(pdf, {'/Title': 'Again', '/Author': 'Me'})
+    with open(pdf, 'rb') as _fi:
+        assert _fi.read().count(b'/Type /XRef') == 2
+    reader = PdfReader(pdf, strict=True)
+    assert dict(reader.metadata) == {'/Title': 'Again', '/Author': 'Me'}
+    assert len(reader.pages) == 3
+
+
+def test_pdf_mod_incremental(tmp_path):
+    pdf = osp.join(tmp_path, 'a.pdf')
+    original = _make_pdf(pdf)
+    out = osp.join(tmp_path, 'b.pdf')
+    assert pdf_mod(pdf, out, subject='Copy')
+    with open(pdf, 'rb') as _fi:
+        assert _fi.read() == original
+    with open(out, 'rb') as _fi:
+        assert _fi.read().startswith(original)
+    assert PdfReader(out).metadata['/Subject'] == 'Copy'
+    assert PdfReader(out).metadata['/Title'] == 'Old'
+
+    # page selection rewrites
+    assert pdf_mod(pdf, custom_pages=[0, 2], title='Two')
+    reader = PdfReader(pdf)
+    assert len(reader.pages) == 2 and reader.metadata['/Title'] == 'Two'
+
+
+def test_pdf_mod_delete_rewrites(tmp_path):
+    pdf = osp.join(tmp_path, 'a.pdf')
+    writer = PdfWriter()
+    writer.add_blank_page(612, 792)
+    writer.add_metadata({'/Title': 'Old', '/Author': 'SECRET_NAME'})
+    writer._info.get_object()[NameObject('/Trapped')] = NameObject('/False')
+    with open(pdf, 'wb') as _fi:
+        writer.write(_fi)
+
+    # added key, appended: existing values keep their type
+    out = osp.join(tmp_path, 'b.pdf')
+    assert pdf_mod(pdf, out, subject='New')
+    assert PdfReader(out).metadata['/Trapped'] == NameObject('/False')
+    assert isinstance(PdfReader(out).metadata['/Trapped'], NameObject)
+
+    # deleted or replaced values are not left in the file bytes
+    for kwargs in ({'delete_keys': ['/Author']}, {'author': 'Someone'}):
+        out = osp.join(tmp_path, 'c.pdf')
+        assert pdf_mod(pdf, out, **kwargs)
+        with open(out, 'rb') as _fi:
+            assert b'SECRET' not in _fi.read()
+        metadata = PdfReader(out).metadata
+        assert metadata['/Title'] == 'Old' and isinstance(metadata['/Trapped'], NameObject)
@@ -0,0 +1,67 @@
+"""
+"""
+import os
+import os.path as osp
+import zlib
+import numpy as np
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+from ..pdf import make_pdf, _flate_image
+
+
+def test_make_pdf_images(tmp_path):
+    folder = osp.join(tmp_path, 'scans')
+    os.makedirs(folder)
+    rng = np.random.default_rng(0)
+    Image.fromarray(rng.integers(0, 255, (80, 60, 3), dtype=np.uint8)).save(
+        osp.join(folder, '0.jpg'), quality=90)
+    Image.fromarray(rng.integers(0, 255, (50, 40), dtype=np.uint8)).save(
+        osp.join(folder, '1.jpeg'))
+    rgba = np.zeros((30, 20, 4), dtype=np.uint8)
+    rgba[..., 0] = 255
+    rgba[:15, :, 3] = 255      # top half opaque red, bottom transparent -> white
+    Image.fromarray(rgba).save(osp.join(folder, '2.png'))
+    Image.fromarray(rng.integers(0, 255, (10, 10, 3), dtype=np.uint8)).save(
+        osp.join(folder, '3.png'))
+    writer = PdfWriter()
+    writer.add_blank_page(612, 792)
+    with open(osp.join(folder, '4.pdf'), 'wb') as _fi:
+        writer.write(_fi)
+    before = sorted(os.listdir(folder))
+
+    out = osp.join(tmp_path, 'scans.pdf')
+    make_pdf(folder, out, title='Scans', workers=2)
+    assert sorted(os.listdir(folder)) == before # no temp files
+
+    reader = PdfReader(out)
+    assert len(reader.pages) == 5
+    assert reader.metadata['/Title'] == 'Scans'
+    # 100 dpi
+    assert np.allclose([float(reader.pages[0].mediabox.width),
+                        float(reader.pages[0].mediabox.height)], [60 * 0.72, 80 * 0.72])
+
+    # jpeg bytes embedded unchanged
+    xobject = reader.pages[0]['/Resources']['/XObject']['/Im0'].get_object()
+    assert xobject['/Filter'] == '/DCTDecode'
+    with open(osp.join(folder, '0.jpg'), 'rb') as _fi:
+        assert xobject._data == _fi.read()
+    assert reader.pages[1]['/Resources']['/XObject']['/Im0'].get_object()['/ColorSpace'] \
+        == '/DeviceGray'
+
+    png = np.asarray(reader.pages[2].images[0].image)
+    assert png.shape == (30, 20, 3)
+    assert (png[:15] == (255, 0, 0)).all() and (png[15:] == 255).all()
+    assert float(reader.pages[4].mediabox.width) == 612
+
+
+def test_flate_16bit(tmp_path):
+    ramp = np.tile(np.linspace(0, 65535, 256).astype(np.uint16), (4, 1))
+    name = osp.join(tmp_path, 'scan16.png')
+    Image.fromarray(ramp).save(name)
+    with Image.open(name) as im:
+        assert im.mode.startswith('I')
+    width, height, mode, _, data, _ = _flate_image(name)
+    gray = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(height, width)
+    assert (width, height, mode) == (256, 4, 'L')
+    # rescaled, not clipped: mid gray stays mid gray
+    assert gray[0, 0] == 0 and gray[0, -1] == 255 and abs(int(gray[0, 128]) - 128) <= 1
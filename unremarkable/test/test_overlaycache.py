@@ -0,0 +1,87 @@
+"""
+"""
+import os
+import os.path as osp
+from reportlab.graphics.shapes import Drawing, PolyLine
+from reportlab.graphics import renderPDF
+from reportlab.lib import colors
+from .. import annotations
+from ..overlaycache import OverlayCache, overlay_key
+from ..rmscene import PenColor
+from ..strokes import StrokeBatch
+
+_UUID = 'b01e9ba5-4205-459c-b499-c71af1f635a4'
+
+
+def _rm(tmp_path, data=b'lines'):
+    folder = osp.join(tmp_path, 'xochitl', _UUID)
+    rm = osp.join(folder, 'page-id.rm')
+    os.makedirs(folder, exist_ok=True)
+    with open(rm, 'wb') as _fi:
+        _fi.write(data)
+    return rm
+
+
+def test_overlay_key(tmp_path):
+    out = {'zoomMode': 'bestFit', 'orientation': 'portrait', 'pdf_width': 612, 'pdf_height': 792}
+    rm = _rm(tmp_path)
+    key = overlay_key(out, rm)
+    assert overlay_key(dict(out), rm) == key
+    assert overlay_key({**out, 'zoomMode': 'customFit'}, rm) != key
+    assert overlay_key({**out, 'pdf_height': 842}, rm) != key
+    _rm(tmp_path, b'lines and a new stroke')
+    assert overlay_key(out, rm) != key
+
+
+def test_overlay_cache(tmp_path):
+    out = {'zoomMode': 'bestFit', 'orientation': 'portrait', 'pdf_width': 612, 'pdf_height': 792}
+    rm = _rm(tmp_path)
+    cache = OverlayCache(osp.join(tmp_path, 'cache'))
+    assert cache.get(out, rm) is None
+    cache.put(out, rm, b'%PDF', [], (0, 0, 1, 1))
+    assert osp.isfile(osp.join(tmp_path, 'cache', _UUID, 'page-id.pkl'))
+
+    cache = OverlayCache(osp.join(tmp_path, 'cache'))
+    assert cache.get(out, rm)['overlay'] == b'%PDF'
+    assert cache.get({**out, 'orientation': 'landscape'}, rm) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.report() == 'overlay cache: 1/2 pages reused (50%)'
+
+
+def test_page_annotations_reuse(tmp_path, monkeypatch):
+    rm = _rm(tmp_path)
+    out = {'zoomMode': 'bestFit', 'orientation': 'portrait', 'pdf_width': 612,
+           'pdf_height': 792, 'pages': [{'rm': rm, 'number': 3}]}
+    highlight = {'text': 'marked', 'color': PenColor.YELLOW, 'rects': [(0, 0, 50, 10)]}
+    rendered = []
+
+    def _get_annotation_data(content, page):
+        rendered.append(page)
+        return {'highlights': [highlight]}, []
+    monkeypatch.setattr(annotations, 'get_annotation_data', _get_annotation_data)
+
+    def _draw_annotation(data, lines, shifted, out_name):
+        drawing = Drawing(612, 792)
+        drawing.add(PolyLine([100, 100, 200, 300], strokeColor=colors.blue))
+        renderPDF.drawToFile(drawing, out_name)
+
+    xform = (0, 1, 0, 1, 792)
+    tempname = osp.join(tmp_path, 'overlay.pdf')
+    cache = OverlayCache(osp.join(tmp_path, 'cache'))
+    first = annotations._page_annotations(out, 3, xform, tempname, cache=cache)
+    second = annotations._page_annotations(out, 3, xform, tempname, cache=cache)
+    assert rendered == [3] and (cache.hits, cache.misses) == (1, 1)
+    assert first[0] is None and second[0] is None
+    assert first[2] == second[2]
+    assert second[1][0]['/Contents'] == 'marked'
+
+    monkeypatch.setattr(annotations, 'draw_annotation', _draw_annotation)
+    monkeypatch.setattr(annotations, 'get_annotation_data',
+                        lambda content, page: ({'highlights': [], 'bboxes': [(0, 0, 10, 10)]},
+                                               StrokeBatch.from_lines([{'x': [0, 10], 'y': [0, 10]}])))
+    _rm(tmp_path, b'new stroke')
+    drawn = annotations._page_annotations(out, 3, xform, tempname, cache=cache)
+    reused = annotations._page_annotations(out, 3, xform, tempname, cache=cache)
+    assert drawn[0] is not None and reused[0] is not None
+    assert reused[0].get_contents().get_data() == drawn[0].get_contents().get_data()
+    assert (cache.hits, cache.misses) == (2, 2)
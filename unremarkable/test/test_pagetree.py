@@ -0,0 +1,106 @@
+"""
+"""
+import os.path as osp
+import zlib
+import numpy as np
+from pypdf import PdfWriter, PdfReader
+from ..pagetree import page_boxes, page_count, page_sizes, _png_unpredict
+from ..incremental import append_info
+from ..pdf import get_page_sizes
+
+
+def _pypdf_boxes(pdf):
+    return np.array([[float(v) for v in p.mediabox] for p in PdfReader(pdf).pages])
+
+
+def _xref_stream_pdf(name):
+    """ pages in an object stream, xref stream with png up predictor,
+    MediaBox inherited from intermediate /Pages node """
+    objects = {
+        1: b'<< /Type /Catalog /Pages 2 0 R >>',
+        2: b'<< /Type /Pages /Kids [3 0 R 6 0 R] /Count 3 /MediaBox [0 0 612 792] >>',
+        3: b'<< /Type /Pages /Parent 2 0 R /Kids [4 0 R 5 0 R] /Count 2 '
+           b'/MediaBox [0 0 300.5 400] >>',
+        4: b'<< /Type /Page /Parent 3 0 R >>',
+        5: b'<< /Type /Page /Parent 3 0 R /MediaBox [10 20 110 220] >>',
+        6: b'<< /Type /Page /Parent 2 0 R >>',
+    }
+    in_stream = [2, 3, 4, 5, 6]
+    body = b''.join(objects[n] + b'\n' for n in in_stream)
+    offsets, pos = [], 0
+    for n in in_stream:
+        offsets.append(f"{n} {pos}".encode())
+        pos += len(objects[n]) + 1
+    header = b' '.join(offsets) + b' '
+    objstm = zlib.compress(header + body)
+
+    out = b'%PDF-1.5\n'
+    entries = {0: (0, 0, 65535)}
+    entries[1] = (1, len(out), 0)
+    out += b'1 0 obj\n' + objects[1] + b'\nendobj\n'
+    entries[7] = (1, len(out), 0)
+    out += (b'7 0 obj\n<< /Type /ObjStm /N 5 /First %d /Filter /FlateDecode /Length %d >>\n'
+            b'stream\n' % (len(header), len(objstm)) + objstm + b'\nendstream\nendobj\n')
+    for i, n in enumerate(in_stream):
+        entries[n] = (2, 7, i)
+    entries[8] = (1, len(out), 0)
+    rows, prev = b'', bytes(5)
+    for n in range(9):
+        row = bytes([entries[n][0]]) + entries[n][1].to_bytes(2, 'big') + \
+            entries[n][2].to_bytes(2, 'big')
+        rows += b'\x02' + bytes((a - b) & 0xFF for a, b in zip(row, prev))
+        prev = row
+    data = zlib.compress(rows)
+    xref = len(out)
+    out += (b'8 0 obj\n<< /Type /XRef /Size 9 /W [1 2 2] /Root 1 0 R /Filter /FlateDecode '
+            b'/DecodeParms << /Predictor 12 /Columns 5 >> /Length %d >>\nstream\n' % len(data)
+            + data + b'\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n' % xref)
+    with open(name, 'wb') as _fi:
+        _fi.write(out)
+    return name
+
+
+def test_page_boxes_xref_stream(tmp_path):
+    pdf = _xref_stream_pdf(osp.join(tmp_path, 'objstm.pdf'))
+    expected = [[0, 0, 300.5, 400], [10, 20, 110, 220], [0, 0, 612, 792]]
+    assert np.allclose(_pypdf_boxes(pdf), expected)
+    assert np.allclose(page_boxes(pdf), expected)
+    assert page_count(pdf) == 3
+    assert np.allclose(page_sizes(pdf)[1], [100, 200])
+
+
+def test_page_boxes_classic_and_incremental(tmp_path):
+    pdf = osp.join(tmp_path, 'classic.pdf')
+    writer = PdfWriter()
+    for i in range(40):
+        writer.add_blank_page(500 + i, 700 - i)
+    with open(pdf, 'wb') as _fi:
+        writer.write(_fi)
+    assert np.allclose(page_boxes(pdf), _pypdf_boxes(pdf))
+    # incremental sections, table then stream
+    append_info(pdf, {'/Title': 'a'})
+    append_info(pdf, {'/Title': 'b'}, xref_stream=True)
+    assert np.allclose(page_boxes(pdf), _pypdf_boxes(pdf))
+    assert page_count(pdf) == 40
+    assert sum(get_page_sizes(pdf)['page_count'].values()) == 40
+
+
+def test_fallback(tmp_path):
+    pdf = osp.join(tmp_path, 'broken.pdf')
+    writer = PdfWriter()
+    writer.add_blank_page(200, 300)
+    with open(pdf, 'wb') as _fi:
+        writer.write(_fi)
+    with open(pdf, 'rb') as _fi:
+        data = _fi.read()
+    # wrong startxref, pypdf recovers by scanning objects
+    with open(pdf, 'wb') as _fi:
+        _fi.write(data.replace(b'startxref\n', b'startxref\n1'))
+    assert np.allclose(page_boxes(pdf), [[0, 0, 200, 300]])
+
+
+def test_png_unpredict():
+    rows = [bytes([1, 2, 3]), bytes([4, 6, 8]), bytes([4, 6, 9])]
+    # none, sub, up
+    data = b'\x00' + rows[0] + b'\x01' + bytes([4, 2, 2]) + b'\x02' + bytes([0, 0, 1])
+    assert _png_unpredict(data, 3) == b''.join(rows)
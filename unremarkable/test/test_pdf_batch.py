@@ -0,0 +1,52 @@
+"""
+"""
+import os.path as osp
+from pypdf import PdfReader, PdfWriter
+from ..pdf import pdf_mod_batch, pdf_mod
+
+_BIB = """@article{vaswani2017,
+    title = {Attention Is All You Need},
+    author = {Vaswani, Ashish and Shazeer, Noam and Parmar, Niki},
+    year = {2017}
+}
+@inproceedings{he2016deep,
+    title = {Deep Residual Learning for Image Recognition},
+    author = {He, Kaiming},
+    year = {2016}
+}
+"""
+
+
+def _make_pdf(name):
+    writer = PdfWriter()
+    writer.add_blank_page(612, 792)
+    with open(name, 'wb') as _fi:
+        writer.write(_fi)
+    return name
+
+
+def test_pdf_mod_batch(tmp_path):
+    names = ['Attention_Is_All_You_Need.pdf', 'he2016deep.pdf', 'unknown.pdf']
+    pdfs = [_make_pdf(osp.join(tmp_path, n)) for n in names]
+    bib = osp.join(tmp_path, 'library.bib')
+    with open(bib, 'w', encoding='utf8') as _fi:
+        _fi.write(_BIB)
+
+    out = pdf_mod_batch(str(tmp_path), bib_db=bib, workers=2, require_bib=True)
+    assert sorted(out['written']) == sorted(pdfs[:2])
+    assert out['skipped'] == [pdfs[2]]
+    assert not out['failed']
+    assert PdfReader(pdfs[0]).metadata['/Title'] == 'Attention Is All You Need'
+    assert PdfReader(pdfs[1]).metadata['/Year'] == '2016'
+
+    # same metadata, nothing rewritten
+    out = pdf_mod_batch(osp.join(tmp_path, '*.pdf'), bib_db=bib, workers=2, require_bib=True)
+    assert sorted(out['unchanged']) == sorted(pdfs[:2])
+    assert not out['written']
+
+
+def test_pdf_mod_skip_unchanged(tmp_path):
+    pdf = _make_pdf(osp.join(tmp_path, 'a.pdf'))
+    assert pdf_mod(pdf, url='https://arxiv.org', skip_unchanged=True)
+    assert not pdf_mod(pdf, url='https://arxiv.org', skip_unchanged=True)
+    assert pdf_mod(pdf, url='https://arxiv.org')
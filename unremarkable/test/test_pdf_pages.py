@@ -0,0 +1,71 @@
+"""
+"""
+import os.path as osp
+import time
+from pypdf import PdfReader, PdfWriter
+from pypdf.constants import PageLabelStyle
+from pypdf.generic import DictionaryObject, ArrayObject, NameObject, BooleanObject, \
+    create_string_object
+from ..pdf import pdf_mod, _select_pages
+
+
+def test_select_pages():
+    assert _select_pages(None, 10) is None
+    assert _select_pages(3, 10) == [3]
+    assert _select_pages([-1, 2, 2, 40], 10) == [2, 9]
+    assert _select_pages(slice(7, None), 10) == [7, 8, 9]
+    assert _select_pages(slice(0, None), 10) is None
+    assert _select_pages([40], 10) is None
+
+
+def test_pdf_mod_pages_1200(tmp_path):
+    pdf = osp.join(tmp_path, 'big.pdf')
+    writer = PdfWriter()
+    for _ in range(1200):
+        writer.add_blank_page(612, 792)
+    for i in range(0, 1200, 100):
+        writer.add_outline_item(f"chapter {i}", i)
+    with open(pdf, 'wb') as _fi:
+        writer.write(_fi)
+
+    start = time.time()
+    pdf_mod(pdf, custom_pages=list(range(0, 1200, 3)) + [-1], title='every third')
+    elapsed = time.time() - start
+    print(f"1200 pages -> 401 in {elapsed:.2f}s")
+
+    reader = PdfReader(pdf)
+    assert len(reader.pages) == 401
+    assert reader.metadata['/Title'] == 'every third'
+    # outline items pointing to kept pages survive, 0, 300, 600, 900
+    titles = [item.title for item in reader.outline]
+    assert titles == [f"chapter {i}" for i in (0, 300, 600, 900)]
+    assert elapsed < 10
+
+
+def test_pdf_mod_pages_catalog(tmp_path):
+    pdf = osp.join(tmp_path, 'front.pdf')
+    writer = PdfWriter()
+    for _ in range(5):
+        writer.add_blank_page(612, 792)
+    writer.set_page_label(0, 2, PageLabelStyle.LOWERCASE_ROMAN)
+    writer.set_page_label(3, 4, PageLabelStyle.DECIMAL, prefix='A-')
+    root = writer.root_object
+    root[NameObject('/Lang')] = create_string_object('en-US')
+    root[NameObject('/MarkInfo')] = DictionaryObject({NameObject('/Marked'): BooleanObject(True)})
+    root[NameObject('/ViewerPreferences')] = DictionaryObject(
+        {NameObject('/DisplayDocTitle'): BooleanObject(True)})
+    root[NameObject('/AcroForm')] = DictionaryObject({NameObject('/Fields'): ArrayObject()})
+    with open(pdf, 'wb') as _fi:
+        writer.write(_fi)
+    assert PdfReader(pdf).page_labels == ['i', 'ii', 'iii', 'A-1', 'A-2']
+
+    out = osp.join(tmp_path, 'out.pdf')
+    pdf_mod(pdf, out, custom_pages=[0, 1, 2])
+    reader = PdfReader(out)
+    assert reader.page_labels == ['i', 'ii', 'iii']
+    root = reader.trailer['/Root']
+    assert root['/Lang'] == 'en-US' and root['/MarkInfo']['/Marked']
+    assert root['/ViewerPreferences']['/DisplayDocTitle'] and '/AcroForm' in root
+
+    pdf_mod(pdf, out, custom_pages=[1, 4])
+    assert PdfReader(out).page_labels == ['ii', 'A-2']
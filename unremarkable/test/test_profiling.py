@@ -0,0 +1,96 @@
+"""
+"""
+import json
+import os
+import os.path as osp
+import subprocess as sp
+from tempfile import mkdtemp
+from ..profiling import profile, span, count, get_tracer
+from .. import unremarkable as unr
+
+_RSYNC = """
+Number of files: 1,204 (reg: 1,180, dir: 24)
+Number of created files: 3 (reg: 3)
+Number of deleted files: 0
+Number of regular files transferred: 5
+Total file size: 1.23G bytes
+Total transferred file size: 310.50K bytes
+Total bytes sent: 2.04K
+Total bytes received: 312,117
+
+sent 2.04K bytes  received 312.12K bytes  209.44K bytes/sec
+"""
+
+
+def test_disabled_is_noop():
+    assert get_tracer() is None
+    with span('stage'):
+        count('points', 3)
+    assert span('a') is span('b')
+
+
+def test_profile_chrome_trace():
+    out = osp.join(mkdtemp(), 'trace')
+    with profile(out, cprofile=True, verbose=False) as tracer:
+        with span('document', 'document', uuid='x'):
+            for p in range(2):
+                with span('page', 'page', page=p):
+                    count('points', 10)
+    assert get_tracer() is None
+    assert tracer.counters['points'] == 20
+    assert tracer.summary()['page']['count'] == 2
+
+    with open(out + '.json', 'r', encoding='utf8') as _fi:
+        trace = json.load(_fi)
+    names = [e['name'] for e in trace['traceEvents'] if e['ph'] == 'X']
+    assert {'total', 'document', 'page'} <= set(names)
+    assert osp.isfile(out + '.prof')
+
+
+def test_rsync_stats():
+    stats = unr.rsync_stats(_RSYNC)
+    assert stats == {'files': 1204, 'files_deleted': 0, 'files_transferred': 5,
+                     'total_bytes': 1230000000, 'transferred_bytes': 310500,
+                     'bytes_sent': 2040, 'bytes_received': 312117}
+
+
+def test_run_metrics(tmp_path, monkeypatch):
+    def _run(cmd, check, **kwargs):
+        if cmd[-1] == 'fail':
+            raise sp.CalledProcessError(23, cmd, '', 'some files vanished')
+        return sp.CompletedProcess(cmd, 0, _RSYNC, '')
+    monkeypatch.setattr(unr.sp, 'run', _run)
+
+    prom = str(tmp_path / 'backup.prom')
+    with profile(metrics=prom, job='backup', verbose=False):
+        with span('rsync'):
+            assert unr._run_cmd(['rsync', '--stats', 'src', 'dst']) == 0
+        count('overlay_cache_hits', 3)
+        count('overlay_cache_misses')
+    with open(prom, encoding='utf8') as _fi:
+        text = _fi.read()
+    assert text.endswith('# EOF\n') and os.listdir(tmp_path) == ['backup.prom']   # no .tmp left
+    assert 'unremarkable_rsync_bytes_received{job="backup"} 312117' in text
+    assert 'unremarkable_stage_calls{job="backup",stage="rsync"} 1' in text
+    assert 'unremarkable_cache_hit_ratio{job="backup",cache="overlay_cache"} 0.75' in text
+    assert 'unremarkable_run_failures{job="backup"} 0' in text
+
+    # failed command and exception, json lines append one line per run
+    runs = str(tmp_path / 'runs.jsonl')
+    for _ in range(2):
+        try:
+            with profile(metrics=runs, job='upload', verbose=False):
+                assert unr._run_cmd(['rsync', 'fail']) == 1
+                count('upload_failures')    # same failure seen by a caller, not counted twice
+                raise KeyboardInterrupt
+        except KeyboardInterrupt:
+            pass
+    with open(runs, encoding='utf8') as _fi:
+        lines = [json.loads(line) for line in _fi]
+    assert len(lines) == 2 and lines[0]['job'] == 'upload'
+    assert lines[0]['failures'] == 2 and lines[0]['counters']['command_failures'] == 1
+
+    # folder: one textfile per job
+    with profile(metrics=str(tmp_path), job='export', verbose=False):
+        pass
+    assert osp.isfile(tmp_path / 'unremarkable_export.prom')
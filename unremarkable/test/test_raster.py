@@ -0,0 +1,36 @@
+"""
+"""
+import numpy as np
+from ..rmscene import Pen, PenColor
+from ..raster import rasterize_lines, _draw_polyline
+
+_DATA = {'orientation': 'portrait', 'zoomMode': 'bestFit', 'customZoomScale': 1,
+         'customZoomCenterX': 0, 'customZoomCenterY': 0, 'pdf_width': 612, 'pdf_height': 792}
+
+
+def _line(tool, color, x, y, thickness=2):
+    return {'tool': tool, 'color': color, 'thickness_scale': thickness, 'x': x, 'y': y}
+
+
+def test_draw_polyline_covers_segment():
+    img = np.full((20, 40, 3), 255, dtype=np.uint8)
+    _draw_polyline(img, np.array([[2., 10.], [37., 10.]]), 1, np.zeros(3))
+    assert (img[10, 2:38] == 0).all()
+    assert (img[2] == 255).all() and (img[18] == 255).all()
+
+
+def test_rasterize_lines():
+    lines = [_line(Pen.FINELINER_2, PenColor.BLACK, [-500, 500], [600, 600], 6),
+             _line(Pen.HIGHLIGHTER_2, PenColor.BLACK, [-500, 500], [1200, 1200]),
+             _line(Pen.ERASER, PenColor.BLACK, [-500, 500], [1800, 1800], 20)]
+    img = rasterize_lines(lines, _DATA, dpi=72)
+    assert img.shape == (792, 612, 3)
+    dark = img.min(axis=(1, 2))
+    ink = np.where(dark == 0)[0]
+    assert len(ink) and ink.max() - ink.min() < 6
+    # highlighter blends, never saturates
+    translucent = np.where((dark > 0) & (dark < 255))[0]
+    assert len(translucent) and translucent.min() > ink.max()
+    # eraser is not drawn
+    assert (img[int(1700 * 612 / 1929.5):] == 255).all()
+    assert (rasterize_lines([], _DATA, dpi=36) == 255).all()
@@ -0,0 +1,70 @@
+"""
+async remote layer against a fake ssh on PATH
+"""
+import os
+import os.path as osp
+import time
+from .. import unremarkable as unr
+from ..unremarkable import async_get_remote_files, _run_async, uuid_exists, upload_pdf
+
+_UUID = '0f0e1b2e-58a4-4a2e-9b2e-5a1c2a3b4c5d'
+_PARENT = '1a2b3c4d-58a4-4a2e-9b2e-5a1c2a3b4c5d'
+
+# fake ssh: sleeps, then answers existence tests, finds and cats
+_SSH = f"""#!/bin/sh
+sleep 0.3
+case "$2" in
+    *"-e "*{_UUID}*) echo /xochitl/{_UUID}.pdf ;;
+    *"-e "*) echo ;;
+    *'Paper One'*) echo /xochitl/{_UUID}.metadata ;;
+    *find*) ;;
+    *cat*{_UUID}*) echo '{{"parent": "{_PARENT}"}}' ;;
+    *cat*{_PARENT}*) echo '{{"visibleName": "Papers"}}' ;;
+    *) exit 1 ;;
+esac
+"""
+
+
+def _fake_ssh(tmp_path, monkeypatch):
+    ssh = osp.join(tmp_path, 'ssh')
+    with open(ssh, 'w', encoding='utf8') as _fi:
+        _fi.write(_SSH)
+    os.chmod(ssh, 0o755)
+    monkeypatch.setenv('PATH', f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_async_get_remote_files(tmp_path, monkeypatch):
+    _fake_ssh(tmp_path, monkeypatch)
+    names = [f"{_UUID}.pdf", 'Paper_One.pdf'] + [f"missing_{i}.pdf" for i in range(6)]
+    start = time.time()
+    out = _run_async(async_get_remote_files(names, parent=True, verbose=False))
+    elapsed = time.time() - start
+    assert set(out['exist']) == set(names[:2])
+    assert sorted(out['nonexist']) == sorted(names[2:])
+    assert out['exist']['Paper_One.pdf'] == {'uuid': _UUID, 'parent_uuid': _PARENT,
+                                             'parent_name': 'Papers'}
+    # 8 lookups + 2x2 parent reads, sequential would take > 3.5s
+    assert elapsed < 2.0
+
+
+def test_sync_wrapper(tmp_path, monkeypatch):
+    _fake_ssh(tmp_path, monkeypatch)
+    assert uuid_exists(f"{_UUID}.pdf") == _UUID
+    assert uuid_exists("nothere.pdf") == ''
+
+
+def test_upload_batch_names(tmp_path, monkeypatch, capsys):
+    _fake_ssh(tmp_path, monkeypatch)
+    # names override lookups, uuid file names are looked up by name as upload_pdf does
+    files = [f"{_UUID}.pdf", 'a.pdf']
+    out = _run_async(async_get_remote_files(files, names=['nothing', 'Paper One']))
+    assert out['nonexist'] == [files[0]] and list(out['exist']) == ['a.pdf']
+
+    monkeypatch.setattr(unr, '_is_host_reachable', lambda *args, **kwargs: True)
+    papers = tmp_path / 'papers'
+    papers.mkdir()
+    (papers / 'Paper_One.pdf').write_bytes(b'')
+    upload_pdf(str(papers / '*'))
+    printed = capsys.readouterr().out
+    assert 'Papers/Paper One' in printed and 'all 1 pdfs already on device' in printed
+    assert 'No pdfs found' not in printed
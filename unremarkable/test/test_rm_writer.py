@@ -0,0 +1,79 @@
+"""
+"""
+import io
+import numpy as np
+from ..rmscene import (SceneLineItemBlock, SceneGlyphItemBlock, write_blocks, read_blocks,
+                       simple_text_document, points_to_bytes, point_dtype, point_to_stream,
+                       TaggedBlockWriter)
+from ..rmscene import scene_items as si
+from ..rmscene.crdt_sequence import CrdtSequenceItem
+from ..rmscene.tagged_block_common import CrdtId
+from ..spatial import is_blank
+
+_END = CrdtId(0, 0)
+
+
+def _points(n=40):
+    return [si.Point(10. + i, 20. - i / 3, 3 * i, i % 256, 100 + i, 255 - i % 256)
+            for i in range(n)]
+
+
+def _line_block(points, i=0):
+    line = si.Line(si.PenColor.BLUE, si.Pen.FINELINER_2, points, 2., 0.)
+    return SceneLineItemBlock(parent_id=CrdtId(0, 11), extra_data=b'',
+                              item=CrdtSequenceItem(CrdtId(1, 100 + i), _END, _END, 0, line))
+
+
+def _write(blocks, version="3.1"):
+    data = io.BytesIO()
+    write_blocks(data, blocks, options={"version": version})
+    data.seek(0)
+    return data
+
+
+def test_points_to_bytes():
+    points = _points()
+    for version in (1, 2):
+        writer = TaggedBlockWriter(io.BytesIO())
+        for point in points:
+            point_to_stream(point, writer, version)
+        expected = writer.data.data.getvalue()
+        assert points_to_bytes(points, version) == expected
+        columns = np.array([(p.x, p.y, p.speed, p.direction, p.width, p.pressure)
+                            for p in points])
+        assert points_to_bytes(columns, version) == expected
+    records = np.frombuffer(points_to_bytes(points), dtype=point_dtype(2))
+    assert points_to_bytes(records) == points_to_bytes(points)
+    try:
+        points_to_bytes(np.array([[0, 0, 70000, 0, 0, 0]]))
+        assert False, "speed out of uint16 range"
+    except ValueError:
+        pass
+
+
+def test_write_read_lines():
+    points = _points()
+    records = np.frombuffer(points_to_bytes(points), dtype=point_dtype(2))
+    blocks = list(simple_text_document("typed")) + [_line_block(points, 0),
+                                                     _line_block(records, 1)]
+    lines = [b.item.value for b in read_blocks(_write(blocks))
+             if isinstance(b, SceneLineItemBlock)]
+    assert len(lines) == 2
+    for line in lines:
+        assert len(line.points) == len(points)
+        assert [(p.speed, p.direction, p.width, p.pressure) for p in line.points] == \
+            [(p.speed, p.direction, p.width, p.pressure) for p in points]
+        assert np.allclose([p.x for p in line.points], [p.x for p in points])
+
+
+def test_is_blank():
+    text = list(simple_text_document("typed text only"))
+    assert is_blank(_write(text))
+    assert not is_blank(_write(text + [_line_block(_points())]))
+    deleted = SceneLineItemBlock(parent_id=CrdtId(0, 11), extra_data=b'',
+                                 item=CrdtSequenceItem(CrdtId(1, 100), _END, _END, 40, None))
+    assert is_blank(_write(text + [deleted]))
+    glyph = si.GlyphRange(None, 4, "text", si.PenColor.YELLOW, [si.Rectangle(0, 0, 10, 10)])
+    glyph_block = SceneGlyphItemBlock(parent_id=CrdtId(0, 11), extra_data=b'',
+                                      item=CrdtSequenceItem(CrdtId(1, 500), _END, _END, 0, glyph))
+    assert not is_blank(_write(text + [glyph_block]))
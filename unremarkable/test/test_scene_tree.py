@@ -0,0 +1,79 @@
+"""
+"""
+from ..rmscene import scene_items as si
+from ..rmscene.scene_tree import SceneTree
+from ..rmscene.tagged_block_common import CrdtId, LwwValue
+from ..rmscene.crdt_sequence import CrdtSequence, CrdtSequenceItem
+
+_END = CrdtId(0, 0)
+
+
+def _line():
+    return si.Line(si.PenColor.BLACK, si.Pen.FINELINER_1, [], 1., 0.)
+
+
+def _glyph():
+    return si.GlyphRange(None, 4, 'text', si.PenColor.YELLOW, [])
+
+
+def _add(tree, item_id, value, parent_id, left_id=_END):
+    tree.add_item(CrdtSequenceItem(item_id, left_id, _END, 0, value), parent_id)
+
+
+def _tree():
+    """ root > Layer 1 [line, group > [glyph, line], line], Layer 2 [glyph] """
+    tree = SceneTree()
+    for node, label in ((CrdtId(0, 11), 'Layer 1'), (CrdtId(0, 12), 'Layer 2'),
+                        (CrdtId(2, 1), '')):
+        tree.add_node(node, tree.root.node_id)
+        tree[node].label = LwwValue(CrdtId(0, 0), label)
+    _add(tree, CrdtId(1, 1), tree[CrdtId(0, 11)], tree.root.node_id)
+    _add(tree, CrdtId(1, 2), tree[CrdtId(0, 12)], tree.root.node_id, CrdtId(1, 1))
+    _add(tree, CrdtId(1, 10), _line(), CrdtId(0, 11))
+    _add(tree, CrdtId(1, 11), tree[CrdtId(2, 1)], CrdtId(0, 11), CrdtId(1, 10))
+    _add(tree, CrdtId(1, 12), _line(), CrdtId(0, 11), CrdtId(1, 11))
+    _add(tree, CrdtId(1, 20), _glyph(), CrdtId(2, 1))
+    _add(tree, CrdtId(1, 21), _line(), CrdtId(2, 1), CrdtId(1, 20))
+    _add(tree, CrdtId(1, 30), _glyph(), CrdtId(0, 12))
+    return tree
+
+
+def test_walk_filters():
+    tree = _tree()
+    kinds = [type(item).__name__ for item in tree.walk()]
+    assert kinds == ['Line', 'GlyphRange', 'Line', 'Line', 'GlyphRange']
+    assert len(list(tree.walk(si.Line))) == 3
+    assert len(list(tree.walk((si.Line, si.GlyphRange)))) == 5
+    assert len(list(tree.walk(si.GlyphRange, groups='Layer 1'))) == 1
+    assert len(list(tree.walk(groups=CrdtId(2, 1)))) == 2
+    assert len(list(tree.walk(groups=['Layer 2', CrdtId(2, 1)]))) == 3
+
+
+def test_leaves_cache():
+    tree = _tree()
+    leaves = tree.leaves()
+    assert tree.leaves() is leaves
+    _add(tree, CrdtId(1, 31), _line(), CrdtId(0, 12), CrdtId(1, 30))
+    assert tree.leaves() is not leaves and len(tree.leaves()) == 6
+
+
+def test_walk_deep():
+    """ nesting deeper than the recursion limit """
+    tree = SceneTree()
+    parent = tree.root.node_id
+    for i in range(3000):
+        node = CrdtId(2, i + 1)
+        tree.add_node(node, parent)
+        _add(tree, CrdtId(3, i + 1), tree[node], parent)
+        parent = node
+    _add(tree, CrdtId(4, 1), _line(), parent)
+    leaves = tree.leaves()
+    assert len(leaves) == 1 and len(leaves[0][1]) == 3001
+
+
+def test_sequence_order_cache():
+    seq = CrdtSequence([CrdtSequenceItem(CrdtId(1, 2), CrdtId(1, 1), _END, 0, 'b'),
+                        CrdtSequenceItem(CrdtId(1, 1), _END, _END, 0, 'a')])
+    assert seq.values() == ['a', 'b'] and seq.keys() is not seq.keys()
+    seq.add(CrdtSequenceItem(CrdtId(1, 3), _END, CrdtId(1, 1), 0, 'c'))
+    assert seq.values() == ['c', 'a', 'b'] and len(seq) == 3
@@ -0,0 +1,72 @@
+"""
+"""
+import io
+from dataclasses import replace
+from ..rmscene import (SceneLineItemBlock, SceneGlyphItemBlock, SceneGroupItemBlock,
+                       RootTextBlock, write_blocks, simple_text_document)
+from ..rmscene import scene_items as si
+from ..rmscene.crdt_sequence import CrdtSequence, CrdtSequenceItem
+from ..rmscene.tagged_block_common import CrdtId
+from ..scenediff import block_index, diff_rm, diff_summary, TEXT
+
+_END = CrdtId(0, 0)
+
+
+def _line(i, deleted=False, color=si.PenColor.BLACK):
+    value = None if deleted else si.Line(color, si.Pen.FINELINER_2,
+                                         [si.Point(i, i, 0, 0, 10, 100)] * 3, 2., 0.)
+    return SceneLineItemBlock(parent_id=CrdtId(0, 11), extra_data=b'',
+                              item=CrdtSequenceItem(CrdtId(1, 100 + i), _END, _END,
+                                                    int(deleted), value))
+
+
+def _glyph(color):
+    glyph = si.GlyphRange(None, 4, 'text', color, [si.Rectangle(0, 0, 10, 10)])
+    return SceneGlyphItemBlock(parent_id=CrdtId(0, 11), extra_data=b'',
+                               item=CrdtSequenceItem(CrdtId(1, 500), _END, _END, 0, glyph))
+
+
+def _page(items, text_items):
+    blocks = []
+    for block in simple_text_document(''):
+        if isinstance(block, RootTextBlock):
+            block = RootTextBlock(block_id=block.block_id, extra_data=b'',
+                                  value=replace(block.value, items=CrdtSequence(text_items)))
+        blocks.append(block)
+    data = io.BytesIO()
+    write_blocks(data, blocks + items, options={"version": "3.1"})
+    return data.getvalue()
+
+
+def test_diff_rm():
+    old_text = [CrdtSequenceItem(CrdtId(1, 16), _END, _END, 0, "hello world")]
+    new_text = [CrdtSequenceItem(CrdtId(1, 16), _END, _END, 0, "hello "),
+                CrdtSequenceItem(CrdtId(1, 22), CrdtId(1, 21), _END, 5, ""),
+                CrdtSequenceItem(CrdtId(1, 40), CrdtId(1, 21), CrdtId(1, 22), 0, "there")]
+    old = _page([_line(0), _line(1), _glyph(si.PenColor.YELLOW)], old_text)
+    new = _page([_line(0), _line(1, deleted=True), _line(2), _glyph(si.PenColor.GREEN)],
+                new_text)
+
+    index, _ = block_index(new)
+    layer = CrdtId(0, 13)     # simple_text_document layer group
+    assert set(index) == {CrdtId(1, 100), CrdtId(1, 101), CrdtId(1, 102), CrdtId(1, 500),
+                          layer, TEXT}
+    assert index[layer].block_type == SceneGroupItemBlock.BLOCK_TYPE
+    assert not index[CrdtId(1, 101)].visible and index[CrdtId(1, 101)].deleted_length == 1
+
+    changes = diff_rm(old, new)
+    assert [(c['id'], c['kind']) for c in changes['added']] == [(CrdtId(1, 102), 'line')]
+    assert isinstance(changes['added'][0]['item'], si.Line)
+    assert [(c['id'], c['deleted_length']) for c in changes['deleted']] == [(CrdtId(1, 101), 1)]
+    assert changes['deleted'][0]['item'].points[0].x == 1
+    modified = changes['modified']
+    assert len(modified) == 1 and modified[0]['kind'] == 'glyph'
+    assert (modified[0]['old'].color, modified[0]['item'].color) == \
+        (si.PenColor.YELLOW, si.PenColor.GREEN)
+    assert changes['text'] == {'added': [(CrdtId(1, 40), 'there')],
+                               'deleted': [(CrdtId(1, 22), 'world')]}
+    assert diff_summary(changes) == '+1 line -1 line ~1 glyph, +5 -5 typed chars'
+
+    unchanged = diff_rm(new, new)
+    assert not any(unchanged[k] for k in ('added', 'deleted', 'modified'))
+    assert diff_summary(unchanged) == 'no item changes'
@@ -0,0 +1,96 @@
+"""
+"""
+import os
+import os.path as osp
+import json
+import uuid
+from ..rmscene import simple_text_document, SceneGlyphItemBlock, CrdtId
+from ..rmscene import scene_items as si
+from ..rmscene.crdt_sequence import CrdtSequenceItem
+from ..search import page_text, search, update_index
+
+
+def _blocks(typed, highlight=None):
+    blocks = list(simple_text_document(typed))
+    if highlight is not None:
+        glyph = si.GlyphRange(None, len(highlight), highlight, si.PenColor.YELLOW,
+                              [si.Rectangle(0, 0, 100, 20)])
+        blocks.append(SceneGlyphItemBlock(
+            parent_id=CrdtId(0, 11),
+            item=CrdtSequenceItem(CrdtId(1, 500), CrdtId(0, 0), CrdtId(0, 0), 0, glyph),
+            extra_data=b''))
+    return blocks
+
+
+def _backup(root, pages):
+    """ xochitl folder, one document, pages {number: rm file text} """
+    xochitl = osp.join(root, 'xochitl')
+    uid = str(uuid.uuid4())
+    os.makedirs(osp.join(xochitl, uid))
+    cpages = []
+    for number, text in pages.items():
+        pid = str(uuid.uuid4())
+        cpages.append({'id': pid, 'redir': {'value': number}})
+        with open(osp.join(xochitl, uid, f"{pid}.rm"), 'w', encoding='utf8') as _fi:
+            _fi.write(text)
+    with open(osp.join(xochitl, f"{uid}.content"), 'w', encoding='utf8') as _fi:
+        json.dump({'cPages': {'pages': cpages}, 'pageCount': len(pages)}, _fi)
+    with open(osp.join(xochitl, f"{uid}.metadata"), 'w', encoding='utf8') as _fi:
+        json.dump({'visibleName': 'Notes', 'parent': '', 'type': 'DocumentType'}, _fi)
+    return xochitl, uid
+
+
+def test_page_text():
+    out = page_text(_blocks('typed words\nsecond line', 'highlighted pdf text'))
+    assert out == [('typed', 'typed words\nsecond line'), ('highlight', 'highlighted pdf text')]
+
+
+def test_search_incremental(tmp_path, monkeypatch):
+    # .rm files hold 'typed|highlight', parsed into blocks by the patched reader
+    parsed = []
+    def _read_blocks(path):
+        parsed.append(path)
+        with open(path, 'r', encoding='utf8') as _fi:
+            text = _fi.read()
+        if text == 'corrupt':
+            raise ValueError(text)
+        return _blocks(*text.split('|'))
+    monkeypatch.setattr('unremarkable.rmscene.read_blocks', _read_blocks)
+
+    db = osp.join(tmp_path, 'index.sqlite')
+    xochitl, uid = _backup(tmp_path, {0: 'first page|adversarial defense',
+                                      4: 'Résumé of the method|'})
+    assert update_index(xochitl, db)['parsed'] == 2
+    found = search('adversarial', xochitl, db=db)
+    assert len(found) == 1 and found[0]['page'] == 0 and found[0]['kind'] == 'highlight'
+    assert found[0]['name'] == 'Notes' and found[0]['uuid'] == uid
+    assert found[0]['snippet'] == '[adversarial] defense'
+    assert search('resume', xochitl, kind='typed', db=db)[0]['page'] == 4
+    assert not search('resume', xochitl, kind='highlight', db=db)
+    assert search('adv*', xochitl, db=db)
+    assert not search('foo-bar"', xochitl, db=db)   # invalid fts5, literal fallback
+    assert len(parsed) == 2
+
+    # only the modified page is reparsed, removed pages are dropped
+    rms = sorted(osp.join(xochitl, uid, f) for f in os.listdir(osp.join(xochitl, uid)))
+    with open(rms[0], 'w', encoding='utf8') as _fi:
+        _fi.write('rewritten note|')
+    os.utime(rms[0], ns=(1, 1))
+    os.remove(rms[1])
+    assert update_index(xochitl, db) == {'parsed': 1, 'removed': 1, 'unchanged': 0, 'failed': 0}
+    assert len(search('rewritten OR adversarial OR resume', xochitl, db=db)) == 1
+    assert update_index(xochitl, db)['parsed'] == 0
+
+    # a page that fails to parse is not recorded and is retried until it parses
+    page = search('rewritten', xochitl, db=db)[0]['page']
+    with open(rms[0], 'w', encoding='utf8') as _fi:
+        _fi.write('corrupt')
+    os.utime(rms[0], ns=(2, 2))
+    assert update_index(xochitl, db) == {'parsed': 0, 'removed': 0, 'unchanged': 0, 'failed': 1}
+    assert update_index(xochitl, db)['failed'] == 1
+    assert not search('rewritten', xochitl, db=db)
+    with open(rms[0], 'w', encoding='utf8') as _fi:
+        _fi.write('repaired note|')
+    os.utime(rms[0], ns=(2, 2))
+    assert update_index(xochitl, db) == {'parsed': 1, 'removed': 0, 'unchanged': 0, 'failed': 0}
+    assert search('repaired', xochitl, db=db)[0]['page'] == page
@@ -0,0 +1,31 @@
+"""
+"""
+import numpy as np
+from ..spatial import stroke_bboxes, transform_bboxes, StrokeIndex
+
+
+def _strokes():
+    xs = [[0, 10, 5], [300, 310], [-50, -40, -45, -60]]
+    ys = [[0, 5, 20], [300, 290], [900, 1000, 950, 920]]
+    return xs, ys
+
+
+def test_stroke_bboxes():
+    bboxes = stroke_bboxes(*_strokes())
+    assert np.allclose(bboxes, [[0, 0, 10, 20], [300, 290, 310, 300], [-60, 900, -40, 1000]])
+    assert stroke_bboxes([], []).shape == (0, 4)
+
+
+def test_transform_bboxes_flips_y():
+    out = transform_bboxes(np.array([[0, 0, 10, 20]]), 5, 2, 0, 1, 100)
+    assert np.allclose(out, [[10, 80, 30, 100]])
+
+
+def test_stroke_index_query():
+    index = StrokeIndex(stroke_bboxes(*_strokes()), cell=64)
+    assert len(index) == 3
+    assert index.bounds == (-60, 0, 310, 1000)
+    assert index.query((-1, -1, 1, 1)).tolist() == [0]
+    assert index.query((-100, 950, 0, 960)).tolist() == [2]
+    assert index.query((100, 100, 200, 200)).tolist() == []
+    assert index.query((-1e6, -1e6, 1e6, 1e6)).tolist() == [0, 1, 2]
@@ -0,0 +1,32 @@
+"""
+"""
+import os.path as osp
+from pypdf import PdfReader, PdfWriter
+from ..pdf import split_pdf
+
+
+def _make_pdf(name, pages):
+    writer = PdfWriter()
+    for i in range(pages):
+        writer.add_blank_page(100 + i, 200)
+    with open(name, 'wb') as _fi:
+        writer.write(_fi)
+
+
+def test_split_pdf(tmp_path):
+    pdf = osp.join(tmp_path, 'doc.pdf')
+    _make_pdf(pdf, 25)
+
+    out = split_pdf(pdf, workers=2)
+    assert len(out) == 25 and osp.basename(out[3]) == 'doc_03.pdf'
+    assert float(PdfReader(out[3]).pages[0].mediabox.width) == 103
+
+    out = split_pdf(pdf, osp.join(tmp_path, 'part'), chunk=10, workers=2, dedup=True)
+    assert [osp.basename(o) for o in out] == ['part_00-09.pdf', 'part_10-19.pdf',
+                                              'part_20-24.pdf']
+    assert [len(PdfReader(o).pages) for o in out] == [10, 10, 5]
+
+    out = split_pdf(pdf, osp.join(tmp_path, 'r'), ranges=[(2, 4), slice(20, None), [7, 1]],
+                    workers=1)
+    assert [len(PdfReader(o).pages) for o in out] == [2, 5, 2]
+    assert float(PdfReader(out[2]).pages[0].mediabox.width) == 107
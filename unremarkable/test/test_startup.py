@@ -0,0 +1,47 @@
+"""
+import time budget for console entry points, python -X importtime
+"""
+import os.path as osp
+import re
+import subprocess as sp
+import sys
+import pytest
+
+# generous, cold interpreters on slow disks; heavy imports cost ~500ms
+IMPORT_BUDGET_MS = 250
+HEAVY = ('pypdf', 'reportlab', 'numpy', 'pybtex', 'PIL', 'packaging',
+         'unremarkable.rmscene', 'unremarkable.annotations', 'unremarkable.pdf')
+
+
+def _entry_points() -> list:
+    setup = osp.join(osp.dirname(osp.dirname(osp.dirname(osp.abspath(__file__)))), 'setup.py')
+    with open(setup, 'r', encoding='utf8') as _fi:
+        return re.findall(r"=unremarkable\.__main__:(\w+)'", _fi.read())
+
+
+def _importtime(statement: str) -> dict:
+    """ {module: cumulative us} from -X importtime stderr"""
+    root = osp.dirname(osp.dirname(osp.dirname(osp.abspath(__file__))))
+    out = sp.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=root,
+                 stdout=sp.PIPE, stderr=sp.PIPE, text=True, check=True)
+    modules = {}
+    for line in out.stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)', line)
+        if match:
+            modules[match.group(4)] = int(match.group(2))
+    return modules
+
+
+@pytest.mark.parametrize('entry_point', _entry_points())
+def test_entry_point_import_time(entry_point):
+    modules = _importtime(f"from unremarkable.__main__ import {entry_point}")
+    heavy = [m for m in modules if m.split('.')[0] in HEAVY or m in HEAVY]
+    assert not heavy, f"{entry_point} eagerly imports {heavy}"
+    assert modules['unremarkable.__main__'] / 1e3 < IMPORT_BUDGET_MS
+
+
+def test_lazy_package_attributes():
+    modules = _importtime("import unremarkable; unremarkable.remarkable_ls")
+    assert 'unremarkable.annotations' not in modules
+    modules = _importtime("from unremarkable import pdf_mod")
+    assert 'unremarkable.pdf' in modules
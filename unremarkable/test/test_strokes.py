@@ -0,0 +1,194 @@
+"""
+"""
+import io
+import os
+import os.path as osp
+import json
+import uuid
+import numpy as np
+from ..rmscene import SceneLineItemBlock, write_blocks
+from ..rmscene import scene_items as si
+from ..rmscene.crdt_sequence import CrdtSequenceItem
+from ..rmscene.tagged_block_common import CrdtId, DataStream
+from ..annotations import read_rm, read_lines, shift_lines, draw_annotation
+from ..strokes import page_strokes, export_strokes, load_strokes, StrokeBatch, POINT_COLUMNS
+
+_END = CrdtId(0, 0)
+
+
+def _line(i, n, tool=si.Pen.FINELINER_2, deleted=False, author=1):
+    points = [si.Point(10. * i + k, 5. * k - i, 2 * k, k % 256, 20 + k, 200 - k)
+              for k in range(n)]
+    value = None if deleted else si.Line(si.PenColor.BLUE, tool, points, 1.5 + i, 0.)
+    return SceneLineItemBlock(parent_id=CrdtId(0, 11), extra_data=b'',
+                              item=CrdtSequenceItem(CrdtId(author, 100 + i), _END, _END,
+                                                    int(deleted), value))
+
+
+def _write(name, blocks, version="3.1"):
+    with open(name, 'wb') as _fi:
+        write_blocks(_fi, blocks, options={"version": version})
+
+
+def _backup(root, pages):
+    """ xochitl folder with one document, pages {number: [blocks]} """
+    xochitl = osp.join(root, 'xochitl')
+    uid = str(uuid.uuid4())
+    os.makedirs(osp.join(xochitl, uid))
+    cpages = []
+    for number, blocks in pages.items():
+        pid = str(uuid.uuid4())
+        cpages.append({'id': pid, 'redir': {'value': number}})
+        _write(osp.join(xochitl, uid, f"{pid}.rm"), blocks)
+    with open(osp.join(xochitl, f"{uid}.content"), 'w', encoding='utf8') as _fi:
+        json.dump({'cPages': {'pages': cpages}, 'pageCount': len(pages)}, _fi)
+    with open(osp.join(xochitl, f"{uid}.metadata"), 'w', encoding='utf8') as _fi:
+        json.dump({'visibleName': 'Strokes', 'parent': '', 'type': 'DocumentType'}, _fi)
+    return xochitl, uid
+
+
+def test_page_strokes(tmp_path):
+    blocks = [_line(0, 7), _line(1, 3, deleted=True), _line(2, 12, si.Pen.ERASER), _line(3, 1)]
+    for version in ("3.1", "2.0"):
+        name = str(tmp_path / f"page_{version}.rm")
+        _write(name, blocks, version)
+        lines, _ = read_lines(read_rm(name))
+        tables = page_strokes(name)
+        assert len(tables['tool']) == len(lines) == 3
+        assert tables['offsets'].tolist() == [0, 7, 19, 20]
+        assert tables['item_id'].tolist() == [int(CrdtId(1, i)) for i in (100, 102, 103)]
+        for i, line in enumerate(lines):
+            rows = slice(tables['offsets'][i], tables['offsets'][i + 1])
+            for name in POINT_COLUMNS:
+                assert np.allclose(tables[name][rows], line[name], atol=0.51), name
+            assert tables['tool'][i] == line['tool'] and tables['color'][i] == line['color']
+            assert tables['thickness_scale'][i] == line['thickness_scale']
+            assert np.allclose(tables['bbox'][i], line['bbox'])
+
+
+def test_export_incremental(tmp_path):
+    xochitl, uid = _backup(str(tmp_path), {0: [_line(0, 4)], 3: [_line(1, 5), _line(2, 6)]})
+    folder = str(tmp_path / 'strokes')
+    out = export_strokes(folder, xochitl)
+    assert out == {'written': 1, 'removed': 0, 'unchanged': 0, 'strokes': 3, 'points': 15}
+    assert export_strokes(folder, xochitl)['unchanged'] == 1
+
+    tables = load_strokes(folder, uid)
+    assert tables['page'].tolist() == [0, 3, 3]
+    assert tables['offsets'].tolist() == [0, 4, 9, 15]
+    assert tables['stroke_id'].tolist() == [0] * 4 + [1] * 5 + [2] * 6
+    assert str(tables['uuid']) == uid
+
+    # second document appended, first untouched
+    other, uid2 = _backup(str(tmp_path / 'other'), {1: [_line(5, 2)]})
+    for name in os.listdir(other):
+        os.rename(osp.join(other, name), osp.join(xochitl, name))
+    out = export_strokes(folder, xochitl)
+    assert (out['written'], out['unchanged'], out['strokes']) == (1, 1, 1)
+    tables = load_strokes(folder)
+    assert len(tables['tool']) == 4 and len(tables['x']) == 17
+    assert sorted(set(tables['uuid'].tolist())) == sorted([uid, uid2])
+    assert np.all(np.diff(tables['offsets']) > 0)
+
+    # modified page rewrites its document, removed document is dropped
+    page = next(f.path for f in os.scandir(osp.join(xochitl, uid2)))
+    _write(page, [_line(5, 2), _line(6, 8)])
+    os.utime(page, ns=(1, 1))
+    os.remove(osp.join(xochitl, f"{uid}.content"))
+    out = export_strokes(folder, xochitl)
+    assert (out['written'], out['removed'], out['points']) == (1, 1, 10)
+    assert not osp.isfile(osp.join(folder, f"{uid}.npz"))
+    assert load_strokes(folder)['offsets'].tolist() == [0, 2, 10]
+
+    # manifest of another version: partitions rewritten, stale files removed
+    with open(osp.join(folder, 'manifest.json'), 'r', encoding='utf8') as _fi:
+        manifest = json.load(_fi)
+    manifest['docs']['gone'] = manifest['docs'][uid2]
+    manifest['version'] = 0
+    with open(osp.join(folder, 'manifest.json'), 'w', encoding='utf8') as _fi:
+        json.dump(manifest, _fi)
+    open(osp.join(folder, 'gone.npz'), 'wb').close()
+    assert export_strokes(folder, xochitl)['written'] == 1
+    assert sorted(os.listdir(folder)) == sorted(['manifest.json', f"{uid2}.npz"])
+
+
+def test_item_id_high_author(tmp_path):
+    xochitl, uid = _backup(str(tmp_path), {0: [_line(0, 3, author=200)]})
+    folder = str(tmp_path / 'strokes')
+    export_strokes(folder, xochitl)
+    item_id = load_strokes(folder, uid)['item_id']
+    assert item_id.dtype == np.uint64 and item_id.tolist() == [int(CrdtId(200, 100))]
+
+
+def test_parquet_optional(tmp_path):
+    try:
+        import pyarrow   # pylint: disable=unused-import
+        return
+    except ImportError:
+        pass
+    xochitl, _ = _backup(str(tmp_path), {0: [_line(0, 4)]})
+    try:
+        export_strokes(str(tmp_path / 'strokes'), xochitl, fmt='parquet')
+        assert False, "parquet without pyarrow"
+    except ImportError as e:
+        assert 'pyarrow' in str(e)
+
+
+def test_stroke_batch(tmp_path):
+    name = str(tmp_path / 'page.rm')
+    _write(name, [_line(0, 5), _line(1, 3, si.Pen.ERASER), _line(2, 4, si.Pen.HIGHLIGHTER_2)])
+    lines, minmax = read_lines(read_rm(name))
+    assert isinstance(lines, StrokeBatch) and len(lines) == 3 and lines.num_points == 12
+    raw = StrokeBatch.from_rm(name)
+    for column in POINT_COLUMNS:
+        assert np.array_equal(raw.columns[column], lines.columns[column])
+    assert np.array_equal(raw.bboxes, lines.bboxes)
+    x0, y0, x1, y1 = lines.bounds()
+    assert minmax == ((x0, x1), (y0, y1))
+
+    drawn = lines.drop_tools()
+    assert drawn.tool.tolist() == [si.Pen.FINELINER_2, si.Pen.HIGHLIGHTER_2]
+    assert drawn.offsets.tolist() == [0, 5, 9]
+    assert np.array_equal(drawn[1]['x'], lines[2]['x']) and drawn[1]['bbox'] == lines[2]['bbox']
+    assert lines.select([2]).offsets.tolist() == [0, 4]
+    assert np.array_equal(lines[-1]['x'], lines[2]['x']) and len(lines[-1]['x']) == 4
+    try:
+        lines[3]
+        assert False, "stroke index out of range"
+    except IndexError:
+        pass
+
+    xform = (100., 0.5, -20., 0.25, 792.)
+    xy = drawn.transform(*xform)
+    for i, stroke in enumerate(drawn.split(xy)):
+        line = drawn[i]
+        assert np.allclose(stroke[:, 0], (line['x'] + 100.) * 0.5)
+        assert np.allclose(stroke[:, 1], 792. - (line['y'] - 20.) * 0.25)
+
+    # read_line_rm() dict lists keep the per line form
+    dicts = [drawn[i] for i in range(len(drawn))]
+    per_line = shift_lines(dicts, *xform)
+    assert isinstance(per_line, list) and len(per_line) == 2
+    assert all(np.allclose(a, b) for a, b in zip(per_line, drawn.split(xy)))
+    out = str(tmp_path / 'annot.pdf')
+    draw_annotation({'pdf_width': 612, 'pdf_height': 792}, dicts, per_line, out)
+    assert osp.getsize(out) > 0
+
+
+def test_read_item_header(tmp_path):
+    name = str(tmp_path / 'page.rm')
+    _write(name, [_line(0, 3), _line(1, 2, deleted=True)])
+    with open(name, 'rb') as _fi:
+        data = _fi.read()
+    stream = DataStream(io.BytesIO(data))
+    stream.read_header()
+    headers = []
+    while stream.tell() + 8 <= len(data):
+        start = stream.tell()
+        length = stream.read_uint32()
+        stream.read_bytes(4)    # unknown, min_version, current_version, block type
+        headers.append(stream.read_item_header())
+        stream.data.seek(start + 8 + length)
+    assert [h.item_id for h in headers] == [CrdtId(1, 100), CrdtId(1, 101)]
+    assert [h.has_value for h in headers] == [True, False]
+    assert headers[0].parent_id == CrdtId(0, 11) and headers[1].deleted_length == 1
@@ -0,0 +1,72 @@
+"""
+"""
+from ..rmscene import scene_items as si
+from ..rmscene.tagged_block_common import CrdtId, LwwValue
+from ..rmscene.crdt_sequence import CrdtSequence, CrdtSequenceItem, toposort_items
+from ..rmscene.text_pieces import TextPieces
+
+_END = CrdtId(0, 0)
+
+
+def _text():
+    """ 'hello world\\nsecond' typed by author 1, 'big ' inserted by author 2,
+    'XX' deleted, a formatting code before 'second' """
+    items = [
+        CrdtSequenceItem(CrdtId(1, 10), _END, _END, 0, "hello "),
+        CrdtSequenceItem(CrdtId(1, 16), CrdtId(1, 15), _END, 0, "world\n"),
+        CrdtSequenceItem(CrdtId(2, 5), CrdtId(1, 15), CrdtId(1, 16), 0, "big "),
+        CrdtSequenceItem(CrdtId(1, 22), CrdtId(1, 21), _END, 2, ""),
+        CrdtSequenceItem(CrdtId(1, 24), CrdtId(1, 23), _END, 0, 1),
+        CrdtSequenceItem(CrdtId(1, 25), CrdtId(1, 24), _END, 0, "second"),
+    ]
+    styles = {_END: LwwValue(CrdtId(1, 1), si.ParagraphStyle.HEADING),
+              CrdtId(1, 21): LwwValue(CrdtId(1, 2), si.ParagraphStyle.BULLET)}
+    return si.Text(CrdtSequence(items), styles, 0., 0., 100.)
+
+
+def _expand(items):
+    """ naive reference, one toposort node per character as upstream rmscene """
+    chars = []
+    for item in items.sequence_items():
+        value = item.value
+        if isinstance(value, int):
+            chars.append(item)
+            continue
+        value = value or [''] * max(item.deleted_length, 1)
+        left_id = item.left_id
+        for i, char in enumerate(value):
+            char_id = CrdtId(item.item_id.part1, item.item_id.part2 + i)
+            right_id = item.right_id if i == len(value) - 1 else \
+                CrdtId(char_id.part1, char_id.part2 + 1)
+            chars.append(CrdtSequenceItem(char_id, left_id, right_id, 0, char))
+            left_id = char_id
+    seq = {item.item_id: item for item in chars}
+    ids = [i for i in toposort_items(chars) if isinstance(seq[i].value, str) and seq[i].value]
+    return ids, ''.join(seq[i].value for i in ids)
+
+
+def test_text_pieces():
+    text = _text()
+    pieces = text.piece_table()
+    ids, chars = _expand(text.items)
+    assert pieces.text == chars == "hello big world\nsecond"
+    assert len(pieces) == len(chars)
+    for offset, char_id in enumerate(ids):
+        assert pieces.offset(char_id) == offset
+        assert pieces.char_id(offset) == char_id
+    # deleted characters and formatting codes sit before 'second'
+    assert pieces.offset(CrdtId(1, 23)) == pieces.offset(CrdtId(1, 24)) == chars.index('second')
+    assert pieces.formats() == [(chars.index('second'), 1)]
+    try:
+        pieces.offset(CrdtId(3, 1))
+        assert False, "unknown id"
+    except KeyError:
+        pass
+
+
+def test_paragraphs():
+    text = _text()
+    assert text.paragraphs() == [("hello big world", si.ParagraphStyle.HEADING),
+                                 ("second", si.ParagraphStyle.BULLET)]
+    assert TextPieces.from_items(text.items).paragraphs() == [("hello big world", None),
+                                                              ("second", None)]
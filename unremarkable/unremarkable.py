@@ -9,10 +9,12 @@ from typing import Optional, Union
 import os
 import os.path as osp
 import subprocess as sp
+import re
+import shlex
 import uuid
 import json
-import pypdf
 from pprint import pprint
+from .profiling import span, count
 ##
 # config
 #
@@ -32,6 +34,11 @@ def _kwargs_get(items=('host', 'user', 'path'), **kwargs):
 
 
 def _is_host_reachable(ip='10.11.99.1', packets=5, msg=None) -> bool:
+    opts = _ssh_opts(host=ip)
+    if opts:  # open master connection, see daemon.py
+        check = ['ssh', '-O', 'check', *opts, ip]
+        if not sp.run(check, stdout=sp.DEVNULL, stderr=sp.DEVNULL, check=False).returncode:
+            return True
     command = ['ping', '-w', str(packets), ip]
     try:
         sp.run(command, stdout=sp.DEVNULL, stderr=sp.DEVNULL, check=True)
@@ -41,6 +48,21 @@ def _is_host_reachable(ip='10.11.99.1', packets=5, msg=None) -> bool:
             print(msg)
         return False
 
+def ssh_control_path(host: str = '10.11.99.1', user: str = 'root') -> str:
+    """ ssh ControlMaster socket, opened by remarkabled """
+    return get_cache_dir('ssh', f'{user}@{host}')
+
+def _ssh_opts(**kwargs) -> list:
+    """ ['-o', 'ControlPath=...'] if a master connection is open: ssh skips the handshake """
+    host, user, _ = get_host_user_path(**_kwargs_get(**kwargs))
+    path = ssh_control_path(host, user)
+    return ['-o', f'ControlPath={path}'] if osp.exists(path) else []
+
+def _rsync_ssh(**kwargs) -> list:
+    """ rsync -e remote shell using the master connection, if open """
+    opts = _ssh_opts(**kwargs)
+    return ['-e', ' '.join(shlex.quote(o) for o in ['ssh', *opts])] if opts else []
+
 def _visible_name(name):
     return osp.basename(osp.splitext(name)[0]).replace('_', ' ')
 
@@ -79,14 +101,28 @@ def upload_pdf(pdf: str,
     if osp.basename(pdf) == "*":
         pdfs = [f.path for f in os.scandir(osp.dirname(pdf) or None)
                 if f.name.lower().endswith(".pdf")]
+        if not pdfs:
+            print(f"No pdfs found in {osp.abspath(osp.expanduser(osp.dirname(pdf)))}")
+            return None
+        num = len(pdfs)
+        if not force:
+            # one concurrent batch of the name checks upload_pdf(force=False) does per file
+            names = [visible_name or _visible_name(pdf) for pdf in pdfs]
+            found = get_remote_files(pdfs, parent=True, verbose=False, names=names, **kwargs)
+            for pdf, name in zip(pdfs, names):
+                info = found['exist'].get(pdf)
+                if info is not None:
+                    print(f"file {info['parent_name']}/{name} ({info['uuid']}.pdf) "
+                          "exists, nothing done: pass force=True (-f) to override")
+            pdfs = found['nonexist']
         if pdfs:
             print(f"Uploading {len(pdfs)} files to reMarkable")
             for pdf in pdfs:
-                upload_pdf(pdf, folder, visible_name, restart=False, force=force, **kwargs)
+                upload_pdf(pdf, folder, visible_name, restart=False, force=True, **kwargs)
             if restart:
                 restart_xochitl(**kwargs)
         else:
-            print(f"No pdfs found in {osp.abspath(osp.expanduser(osp.dirname(pdf)))}")
+            print(f"all {num} pdfs already on device, nothing done")
     else:
         assert osp.isfile(pdf) and pdf.lower().endswith(".pdf"), f"pdf expected {pdf}, not found"
 
@@ -123,7 +159,10 @@ def upload_pdf(pdf: str,
         metadata = make_metadata(pdf, visible_name, uuidfolder)
 
         print(f"Upload\n\t{osp.basename(pdf)}\n\t as '{folder}/{visible_name}'\n\t uuid {uid}")
-        ret = _rsync_up(pdf, name=f"{uid}.pdf", **_kw)
+        with span('upload', pdf=osp.basename(pdf)):
+            ret = _rsync_up(pdf, name=f"{uid}.pdf", **_kw)
+        if not ret:
+            count('documents_uploaded')
         # upload pdf and if success, write json files
         if not ret: # generate content and metadata files on device
             name = osp.join(path, uid)
@@ -147,7 +186,8 @@ def restart_xochitl(**kwargs) -> int:
     """ serivce is restarted on reboot
     """
     host, user, _ = get_host_user_path(**_kwargs_get(**kwargs))
-    cmd = ['ssh', f'{user}@{host}', 'systemctl', 'restart', 'xochitl.service']
+    cmd = ['ssh', *_ssh_opts(**kwargs), f'{user}@{host}', 'systemctl', 'restart',
+           'xochitl.service']
     return _run_cmd(cmd, check=True, shell=False)
 
 
@@ -171,11 +211,13 @@ def _rsync_up(fname: str,
     host, user, path = get_host_user_path(**_kwargs_get(**kwargs))
 
     if not _is_host_reachable(host, packets=2, msg=f"host <{host}> is not reachable"):
+        count('command_failures')
         return 1
     name = osp.join(path, osp.basename(kwargs.get('name', fname)))
     sync_args = (sync_args, '--update') if update else (sync_args,)
 
-    cmd = ['rsync', *sync_args, fname, f'{user}@{host}:{name}']
+    cmd = ['rsync', *sync_args, '--stats', *_rsync_ssh(**kwargs), fname,
+           f'{user}@{host}:{name}']
     return _run_cmd(cmd, check=True, shell=False)
 
 
@@ -219,38 +261,16 @@ def get_remote_files(name: Union[str, tuple],
     { 'nonexist':[name ..],
       'exist: {name: {'uuid':uuid, 'parent_name': parent_name, 'parent_uuid': parent_uuid}}
     }
-    
+    lookups run concurrently, see async_get_remote_files()
+    kwargs
+        max_concurrency (int [8]) ssh sessions in flight
+        names           (list [None]) visible names to look up, one per name, default:
+            uuid file names by uuid, others by visible name derived from the file name
     """
-    host, user, path = get_host_user_path(**_kwargs_get(**kwargs))
-    out = {'nonexist': [], 'exist': {}}
+    host, _, _ = get_host_user_path(**_kwargs_get(**kwargs))
     if not _is_host_reachable(host, packets=2, msg=f"host <{host}> is not reachable"):
-        return out
-    if isinstance(name, str):
-        name = (name,)
-
-    for i, n in enumerate(name):
-        if verbose:
-            print(f"checking [{i}/{len(name)}] {n},")
-        _basename = osp.basename(n)
-        if _is_uuid(osp.splitext(_basename)[0]):
-            file_uuid = uuid_exists(_basename, **kwargs)
-        else:
-            file_uuid = get_uuid_from_name( _visible_name(n), target_type='DocumentType', **kwargs)
-
-        if not file_uuid:
-            if verbose:
-                print("  -> NOT FOUND")
-            out['nonexist'] += [n]
-        else:
-            if verbose:
-                print("  -> exists")
-            out['exist'][n] = {'uuid': file_uuid}
-            if parent:
-                print(f"get parent of {file_uuid}, {n}")
-                parent_uuid, parent_name = get_remote_parent(file_uuid, False, **kwargs)
-                out['exist'][n]['parent_name'] = parent_name
-                out['exist'][n]['parent_uuid'] = parent_uuid
-    return out
+        return {'nonexist': [], 'exist': {}}
+    return _run_async(async_get_remote_files(name, parent, verbose, **kwargs))
 
 
 def get_remote_parent(uuid_name: str, check_reachable: bool = True, **kwargs) -> tuple:
@@ -262,24 +282,11 @@ def get_remote_parent(uuid_name: str, check_reachable: bool = True, **kwargs) ->
         check_reachable     (bool [True]) if False , assumes connection is good
     kwargs host, user, path
     """
-    host, user, path = get_host_user_path(**_kwargs_get(**kwargs))
+    host, _, _ = get_host_user_path(**_kwargs_get(**kwargs))
     if check_reachable and not _is_host_reachable(host, packets=2,
                                                   msg=f"host <{host}> is not reachable"):
         return None
-
-    out = runcmd(['ssh', f'{user}@{host}', 'cat', f"{path}/{uuid_name}.metadata"])
-    if out is None: # no uuid_name.metadata file
-        return None, ''
-
-    parent_uuid = json.loads(out).get('parent')
-    if parent_uuid is None: #  metadata contains no 'parent' field
-        return None, ''
-
-    out = runcmd(['ssh', f'{user}@{host}', 'cat', f"{path}/{parent_uuid}.metadata"])
-    if out is None: # no parent_uuid.metadata file
-        return None, ''
-
-    return parent_uuid, json.loads(out).get('visibleName', '')
+    return _run_async(async_get_remote_parent(uuid_name, **kwargs))
 
 
 def list_remote(ext: Optional[str] = '.pdf', **kwargs) -> Optional[list]:
@@ -291,7 +298,7 @@ def list_remote(ext: Optional[str] = '.pdf', **kwargs) -> Optional[list]:
     if not _is_host_reachable(host, packets=2, msg=f"host <{host}> is not reachable"):
         return None
     path = path if ext is None else osp.join(path, f"*{ext}")
-    cmd = ['ssh', f'{user}@{host}', 'ls', path]
+    cmd = ['ssh', *_ssh_opts(**kwargs), f'{user}@{host}', 'ls', path]
     out = runcmd(cmd)
     if out is not None:
         out = out.split("\n")[:-1]
@@ -359,16 +366,7 @@ def get_parent(name: str, folder: str = '.') -> tuple:
 def uuid_exists(uuid_name: str, **kwargs) -> Optional[str]:
     """ check if file exists in remote folder
     """
-    host, user, path = get_host_user_path(**_kwargs_get(**kwargs))
-    cmd = ['ssh', f'{user}@{host}', f'''[ -e {path}/{uuid_name} ] && echo {path}/{uuid_name} || echo ''']
-    out = ''
-    try:
-        result = sp.run(cmd, check=True, stdout=sp.PIPE, stderr=sp.PIPE, text=True)
-        if result.stdout:
-            out = osp.basename(osp.splitext(result.stdout.strip())[0])
-    except sp.CalledProcessError as e:
-        pass
-    return out
+    return _run_async(async_uuid_exists(uuid_name, **kwargs))
 
 
 def get_uuid_from_name(name: str, target_type = "CollectionType", **kwargs) -> Optional[str]:
@@ -381,11 +379,64 @@ def get_uuid_from_name(name: str, target_type = "CollectionType", **kwargs) -> O
         user    (str ['root']) remarkable default
         host    (str ['10.11.99.1']) remarkable usb default
         path    (str)
+    """
+    return _run_async(async_get_uuid_from_name(name, target_type, **kwargs))
+
+##
+# async remote layer: one ssh process per query, bounded concurrency
+# asyncio is imported inside functions to keep console startup fast
+#
+_MAX_CONCURRENCY = 8 # ssh sessions in flight, dropbear on the tablet limits unauth clients
+
+
+def _run_async(coro):
+    """ run coroutine from sync code, also from within a running loop (e.g. jupyter)"""
+    import asyncio
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
 
-    TODO VALIDATE check=True, shell=False
-    shell=True should work, false should not yet it does.
+async def _ssh(cmd: str, semaphore=None, **kwargs) -> Optional[str]:
+    """ run remote command, returns stdout or None on failure
+    Args
+        cmd         (str) remote shell command
+        semaphore   (asyncio.Semaphore [None]) bounds concurrent sessions
     """
-    host, user, path = get_host_user_path(**_kwargs_get(**kwargs))
+    import asyncio
+    host, user, _ = get_host_user_path(**_kwargs_get(**kwargs))
+    async with semaphore or asyncio.Semaphore(1):
+        proc = await asyncio.create_subprocess_exec('ssh', *_ssh_opts(**kwargs),
+                                                    f'{user}@{host}', cmd,
+                                                    stdout=asyncio.subprocess.PIPE,
+                                                    stderr=asyncio.subprocess.PIPE)
+        stdout, _ = await proc.communicate()
+    count('ssh_calls')
+    if proc.returncode:
+        return None
+    return stdout.decode()
+
+
+async def async_uuid_exists(uuid_name: str, semaphore=None, **kwargs) -> Optional[str]:
+    """ async uuid_exists(), '' if not found"""
+    _, _, path = get_host_user_path(**_kwargs_get(**kwargs))
+    cmd = f'[ -e {path}/{uuid_name} ] && echo {path}/{uuid_name} || echo '
+    out = await _ssh(cmd, semaphore, **kwargs)
+    if not out or not out.strip():
+        return ''
+    return osp.basename(osp.splitext(out.strip())[0])
+
+
+async def async_get_uuid_from_name(name: str,
+                                   target_type: str = "CollectionType",
+                                   semaphore=None,
+                                   **kwargs) -> Optional[str]:
+    """ async get_uuid_from_name(), None if not found"""
+    _, _, path = get_host_user_path(**_kwargs_get(**kwargs))
     cmd = f'''
     find {path} -type f -name "*.metadata" | while read file; do
     grep -q "\\"type\\": \\"{target_type}\\"" "$file" && \
@@ -393,16 +444,73 @@ def get_uuid_from_name(name: str, target_type = "CollectionType", **kwargs) -> O
     echo "$file" && exit 0
     done
     '''
-    cmd = ['ssh', f'{user}@{host}', cmd]
+    out = await _ssh(cmd, semaphore, **kwargs)
+    if not out or not out.strip():
+        return None
+    return osp.basename(osp.splitext(out.strip())[0])
 
-    # Execute the SSH command
-    out = None
-    try:
-        result = sp.run(cmd, check=True, stdout=sp.PIPE, stderr=sp.PIPE, text=True)
-        if result.stdout:
-            out = osp.basename(osp.splitext(result.stdout.strip())[0])
-    except sp.CalledProcessError as e:
-        pass
+
+async def async_get_remote_parent(uuid_name: str, semaphore=None, **kwargs) -> tuple:
+    """ async get_remote_parent() -> (parent_uuid, parent visibleName) | (None, '') """
+    _, _, path = get_host_user_path(**_kwargs_get(**kwargs))
+    out = await _ssh(f"cat {path}/{uuid_name}.metadata", semaphore, **kwargs)
+    if out is None: # no uuid_name.metadata file
+        return None, ''
+
+    parent_uuid = json.loads(out).get('parent')
+    if parent_uuid is None: #  metadata contains no 'parent' field
+        return None, ''
+
+    out = await _ssh(f"cat {path}/{parent_uuid}.metadata", semaphore, **kwargs)
+    if out is None: # no parent_uuid.metadata file
+        return None, ''
+
+    return parent_uuid, json.loads(out).get('visibleName', '')
+
+
+async def async_get_remote_files(name: Union[str, tuple],
+                                 parent: bool = False,
+                                 verbose: bool = True,
+                                 max_concurrency: int = _MAX_CONCURRENCY,
+                                 names: Optional[list] = None,
+                                 **kwargs) -> dict:
+    """ async get_remote_files(), all lookups in flight together, bounded by max_concurrency
+    does not check if host is reachable
+    """
+    import asyncio
+    if isinstance(name, str):
+        name = (name,)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _lookup(n, visible):
+        _basename = osp.basename(n)
+        if visible is None and _is_uuid(osp.splitext(_basename)[0]):
+            return await async_uuid_exists(_basename, semaphore, **kwargs)
+        return await async_get_uuid_from_name(visible or _visible_name(n), 'DocumentType',
+                                              semaphore, **kwargs)
+
+    names = [None] * len(name) if names is None else names
+    assert len(names) == len(name), f"{len(names)} names for {len(name)} files"
+    with span('remote_lookup', files=len(name)):
+        uuids = await asyncio.gather(*[_lookup(n, v) for n, v in zip(name, names)])
+
+    out = {'nonexist': [], 'exist': {}}
+    for i, (n, file_uuid) in enumerate(zip(name, uuids)):
+        if verbose:
+            print(f"checking [{i}/{len(name)}] {n},  -> {'exists' if file_uuid else 'NOT FOUND'}")
+        if file_uuid:
+            out['exist'][n] = {'uuid': file_uuid}
+        else:
+            out['nonexist'] += [n]
+
+    if parent and out['exist']:
+        with span('remote_parent', files=len(out['exist'])):
+            parents = await asyncio.gather(*[async_get_remote_parent(v['uuid'], semaphore,
+                                                                     **kwargs)
+                                             for v in out['exist'].values()])
+        for value, (parent_uuid, parent_name) in zip(out['exist'].values(), parents):
+            value['parent_name'] = parent_name
+            value['parent_uuid'] = parent_uuid
     return out
 
 ##
@@ -414,7 +522,7 @@ def ssh_json(json_str: str, name: str, **kwargs) -> int:
     host, user, _ = get_host_user_path(**_kwargs_get(**kwargs))
     cmd = f'echo {json.dumps(json_str)} > {name}'
     # Construct the full SSH command as a list
-    cmd = ['ssh', f'{user}@{host}', cmd]
+    cmd = ['ssh', *_ssh_opts(**kwargs), f'{user}@{host}', cmd]
     return _run_cmd(cmd, check=True, shell=False)
 
 # pylint: disable=no-member
@@ -422,12 +530,12 @@ def make_content(pdf):
     """ .content pageCount and sizeInBytes are important
             orientation is useful
     """
-    with open(pdf, 'rb') as _fi:
-        red = pypdf.PdfReader(_fi)
-        num = len(red.pages)
-        orientation = 'landscape'
-        if red.pages[0].mediabox.height > red.pages[0].mediabox.width:
-            orientation = 'portrait'
+    from .pagetree import page_sizes
+    sizes = page_sizes(pdf)
+    num = len(sizes)
+    orientation = 'landscape'
+    if sizes[0, 1] > sizes[0, 0]:
+        orientation = 'portrait'
     size = os.stat(pdf).st_size
 
     content = {
@@ -488,6 +596,7 @@ def backup_tablet(folder: Optional[str] = None, **kwargs) -> int:
     # 1. is remarkable plugged in
     host, user, path = get_host_user_path(**_kwargs_get(**kwargs))
     if not _is_host_reachable(host, packets=2, msg=f"host <{host}> is not reachable"):
+        count('command_failures')
         return 1
 
     if folder is None:
@@ -518,8 +627,11 @@ def backup_tablet(folder: Optional[str] = None, **kwargs) -> int:
     cmd = ['rsync',
            '-avzhrP',   # archive, verbose, compress, human-readable, recursive partial, progress
            '--update',  # Skip files that are newer on the receiver
+           '--stats',   # transfer totals, counted for --metrics
+           *_rsync_ssh(**kwargs),
            f'{user}@{host}:{path}', folder]
-    out = _run_cmd(cmd, check=True, shell=False)
+    with span('rsync', host=host, folder=folder):
+        out = _run_cmd(cmd, check=True, shell=False)    # counts rsync stats and failures
     _set_xochitl(xochitl)
     return out
 
@@ -538,13 +650,24 @@ def build_name_graph(uidgraph, folder, graph):
     """ convert uuid graph to name graph
     """
     for key, value in uidgraph.items():
-        with open(osp.join(folder, f"{key}.metadata"), 'r', encoding='utf8') as fi:
-            x = json.load(fi)
-            if isinstance(value, str):
-                graph[x['visibleName']] = key
-            else:
-                graph[x['visibleName']] = {'uuid': key}
-                build_name_graph(value, folder, graph[x['visibleName']])
+        x = _read_metadata(osp.join(folder, f"{key}.metadata"))
+        if isinstance(value, str):
+            graph[x['visibleName']] = key
+        else:
+            graph[x['visibleName']] = {'uuid': key}
+            build_name_graph(value, folder, graph[x['visibleName']])
+
+
+_METADATA = {}  # {file: (mtime_ns, size, json)}, stays warm in remarkabled
+
+def _read_metadata(file: str) -> dict:
+    """ parsed .metadata json, reparsed only if file mtime or size changed """
+    stat = os.stat(file)
+    cached = _METADATA.get(file)
+    if cached is None or cached[:2] != (stat.st_mtime_ns, stat.st_size):
+        with open(file, 'r', encoding='utf8') as fi:
+            cached = _METADATA[file] = (stat.st_mtime_ns, stat.st_size, json.load(fi))
+    return cached[2]
 
 
 def build_file_graph(folder: Optional[str] = None, dir_type: bool = False) -> Optional[dict]:
@@ -580,8 +703,7 @@ def build_file_graph(folder: Optional[str] = None, dir_type: bool = False) -> Op
     if dir_type:
         print("  \033[31mlisting folders \033[0m" )
     for file in files:
-        with open(file, 'r', encoding='utf8') as fi:
-            x = json.load(fi)
+        x = _read_metadata(file)
         if dir_type and x['type'] != "CollectionType":
             continue
         parent = x["parent"]
@@ -673,6 +795,11 @@ def _get_xochitl(**kwargs):
             return out
     return None
 
+def get_cache_dir(*names) -> str:
+    """ $XDG_CACHE_HOME/unremarkable or ~/.cache/unremarkable, joined with names"""
+    root = os.environ.get('XDG_CACHE_HOME') or osp.expanduser('~/.cache')
+    return osp.join(root, 'unremarkable', *names)
+
 def _set_xochitl(folder: str, **kwargs):
     """ set backup folder """
     folder = osp.abspath(osp.expanduser(folder))
@@ -696,12 +823,14 @@ def replace_pdf(pdf, visible_name, **kwargs) -> int:
 
     uidname = get_uuid_from_name(visible_name, "DocumentType", **kwargs)
 
-    cmd = ['rsync', '-avz', pdf, f'{user}@{host}:{osp.join(path, uidname)}']
+    cmd = ['rsync', '-avz', *_rsync_ssh(**kwargs), pdf,
+           f'{user}@{host}:{osp.join(path, uidname)}']
     return _run_cmd(cmd, check=True, shell=False)
 
 
 def _run_cmd(cmd, check=True, shell=False, text=True) -> int:
     """ TODO replace other functions sp.run, test and validate
+    rsync --stats output is added to profiling counters, failures counted as command_failures
     """
     try:
         result = sp.run(cmd, check=check, shell=shell, stdout=sp.PIPE, stderr=sp.PIPE, text=text)
@@ -709,7 +838,33 @@ def _run_cmd(cmd, check=True, shell=False, text=True) -> int:
         _err = result.stderr
         if _err:
             print("Error output!!", _err)
+        if cmd[0] == 'rsync' and text:
+            for name, value in rsync_stats(result.stdout).items():
+                count(f'rsync_{name}', value)
         return 0
     except sp.CalledProcessError as e:
         print("An error occurred:", e.stderr)
+    count('command_failures')
     return 1
+
+
+_RSYNC_STATS = {'Number of files': 'files',
+                'Number of regular files transferred': 'files_transferred',
+                'Number of deleted files': 'files_deleted',
+                'Total file size': 'total_bytes',
+                'Total transferred file size': 'transferred_bytes',
+                'Total bytes sent': 'bytes_sent',
+                'Total bytes received': 'bytes_received'}
+_UNITS = {'': 1, 'B': 1, 'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12}   # rsync -h, powers of 1000
+
+
+def rsync_stats(output: str) -> dict:
+    """ {'files_transferred': int, 'bytes_sent': int, ...} parsed from rsync --stats output
+    human readable sizes, 1.23M, are approximate
+    """
+    out = {}
+    for match in re.finditer(r'^([A-Za-z ]+): ([\d,.]+)([BKMGT]?)', output, re.MULTILINE):
+        name = _RSYNC_STATS.get(match.group(1).strip())
+        if name is not None:
+            out[name] = round(float(match.group(2).replace(',', '')) * _UNITS[match.group(3)])
+    return out